@@ -1,8 +1,10 @@
 from django.shortcuts import render, get_object_or_404
 
 from about.models import About
+from core.page_cache import cache_public_page
 
 
+@cache_public_page(About)
 def about(request, pk):
     """
     Render the about page with static content.
@@ -222,6 +222,31 @@ CROSSREF_DEPOSIT_EMAIL = os.environ.get("CROSSREF_DEPOSIT_EMAIL", "")
 # so production must be opted into explicitly.
 CROSSREF_ENVIRONMENT = os.environ.get("CROSSREF_ENVIRONMENT", "sandbox")
 
+# Send every Crossref request to this base URL instead, e.g. a local stub
+# server mimicking /servlet/deposit and /servlet/submissionDownload. Leave
+# empty in real deployments.
+CROSSREF_BASE_URL = os.environ.get("CROSSREF_BASE_URL", "")
+
+# Submitted batches check_doi_deposits polls at the same time.
+CROSSREF_POLL_WORKERS = int(os.environ.get("CROSSREF_POLL_WORKERS", "8"))
+
+# Retries for Crossref HTTP calls (timeouts, connection errors, 5xx), with
+# exponential backoff starting at CROSSREF_BACKOFF seconds. Deposits are only
+# retried when the upload cannot have reached Crossref.
+CROSSREF_RETRIES = int(os.environ.get("CROSSREF_RETRIES", "3"))
+CROSSREF_BACKOFF = float(os.environ.get("CROSSREF_BACKOFF", "1.0"))
+
+# Largest deposit file crossref.deposit_xml.split_deposit produces. Crossref
+# limits upload size, and a rejected record fails its whole file.
+CROSSREF_MAX_DEPOSIT_BYTES = int(os.environ.get("CROSSREF_MAX_DEPOSIT_BYTES", str(5 * 1024 * 1024)))
+
+# The admin only queues Crossref deposits and result checks; the
+# run_crossref_jobs worker carries them out. It looks for new jobs every
+# CROSSREF_JOB_POLL_INTERVAL seconds and hands a job that has been running
+# longer than CROSSREF_JOB_STALE_AFTER seconds (its worker died) to another.
+CROSSREF_JOB_POLL_INTERVAL = float(os.environ.get("CROSSREF_JOB_POLL_INTERVAL", "5"))
+CROSSREF_JOB_STALE_AFTER = int(os.environ.get("CROSSREF_JOB_STALE_AFTER", "900"))
+
 # How author names are written in JournalIssue.authors. Uzbek names are
 # surname-first ("Axmedova Aziza Komilovna"); set to "given-first" for the
 # western order ("Aziza Axmedova").
@@ -230,3 +255,78 @@ CROSSREF_AUTHOR_NAME_ORDER = os.environ.get("CROSSREF_AUTHOR_NAME_ORDER", "surna
 # Public base URL used to build the DOI landing-page links sent to Crossref.
 # Cron has no HttpRequest, so this cannot be derived from the request.
 SITE_BASE_URL = os.environ.get("SITE_BASE_URL", "https://jurnal-komparativistika.uz")
+
+# The site config read by every page is cached under a version read from the
+# database (Default and About), re-read at most every SITE_CONFIG_VERSION_TTL
+# seconds: other workers see an edit within that time. SITE_CONFIG_CACHE_ALIAS
+# optionally names a cache shared by all workers (e.g. a Redis/Memcached entry
+# in CACHES) that holds the config too, so each worker does not read the table
+# after an edit. Empty = per-process only.
+SITE_CONFIG_CACHE_ALIAS = os.environ.get("SITE_CONFIG_CACHE_ALIAS", "")
+SITE_CONFIG_VERSION_TTL = float(os.environ.get("SITE_CONFIG_VERSION_TTL", "5"))
+
+# Article search backend: "fts5" (SQLite), "postgres" or "like" (the plain
+# icontains scan). Empty = pick the full-text index for the database in use.
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "")
+
+# Article view counting. "memory" buffers per worker and flushes every
+# VIEW_COUNT_FLUSH_INTERVAL seconds or VIEW_COUNT_FLUSH_THRESHOLD views, and at
+# worker exit; "cache" keeps shared counters in VIEW_COUNT_CACHE_ALIAS
+# (flushable by `manage.py flush_view_counts`); "direct" writes every view.
+VIEW_COUNT_STORE = os.environ.get("VIEW_COUNT_STORE", "memory")
+VIEW_COUNT_CACHE_ALIAS = os.environ.get("VIEW_COUNT_CACHE_ALIAS", "default")
+VIEW_COUNT_FLUSH_INTERVAL = int(os.environ.get("VIEW_COUNT_FLUSH_INTERVAL", "60"))
+VIEW_COUNT_FLUSH_THRESHOLD = int(os.environ.get("VIEW_COUNT_FLUSH_THRESHOLD", "200"))
+
+# Directory `manage.py generate_sitemaps` writes pre-built sitemap files to.
+# When they exist they are served instead of querying the database; delete
+# them (generate_sitemaps --clear) to go back to live sitemaps.
+SITEMAP_ROOT = os.environ.get("SITEMAP_ROOT", str(BASE_DIR / "sitemaps"))
+
+# Cache holding rendered sitemaps. Entries are keyed by a version read from
+# the database, so a per-process cache is never stale; a shared one only saves
+# each worker rendering its own copy.
+SITEMAP_CACHE_ALIAS = os.environ.get("SITEMAP_CACHE_ALIAS", "default")
+SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Response cache for the public pages (home, current/item issue, about,
+# subscribe). Entries are keyed by path, language, auth state and a version
+# read from the database for every model they show, so an edit in any process
+# expires them; staff always bypass it. `manage.py page_cache_stats` prints
+# per-page hit ratios when PAGE_CACHE_ALIAS is a cache shared by all workers.
+PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "1") == "1"
+PAGE_CACHE_ALIAS = os.environ.get("PAGE_CACHE_ALIAS", "default")
+PAGE_CACHE_TIMEOUT = int(os.environ.get("PAGE_CACHE_TIMEOUT", "600"))
+
+# Fragment cache for the header, navigation menus and footer in base.html
+# (`{% sitefragment %}`). Fragments are keyed by language and the site-config
+# version read from the database, so edits to Default Settings or About pages
+# show up in every worker within SITE_CONFIG_VERSION_TTL seconds.
+SITE_FRAGMENT_CACHE_ENABLED = os.environ.get("SITE_FRAGMENT_CACHE_ENABLED", "1") == "1"
+SITE_FRAGMENT_CACHE_ALIAS = os.environ.get("SITE_FRAGMENT_CACHE_ALIAS", "default")
+SITE_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Templates are served through Django's cached loader (the default for
+# DIRS + APP_DIRS). With this on, the WSGI/ASGI entry points also compile every
+# project template at startup instead of on first use. Off by default while
+# DEBUG is on, where the autoreloader throws the cache away on every edit.
+TEMPLATE_WARM_ON_STARTUP = os.environ.get("TEMPLATE_WARM_ON_STARTUP", "0" if DEBUG else "1") == "1"
+
+# Google Scholar sync (`manage.py sync_scholar`). Scholar has no API and
+# blocks fast clients: SCHOLAR_RATE is requests per second across all
+# SCHOLAR_WORKERS threads, and a block pauses every worker for SCHOLAR_BACKOFF
+# seconds, doubling per retry, up to SCHOLAR_MAX_RETRIES. SCHOLAR_BACKEND
+# "fake" is an offline stand-in for development.
+SCHOLAR_BACKEND = os.environ.get("SCHOLAR_BACKEND", "scholarly")
+SCHOLAR_WORKERS = int(os.environ.get("SCHOLAR_WORKERS", "4"))
+SCHOLAR_RATE = float(os.environ.get("SCHOLAR_RATE", "0.2"))
+SCHOLAR_BURST = int(os.environ.get("SCHOLAR_BURST", "2"))
+SCHOLAR_BACKOFF = int(os.environ.get("SCHOLAR_BACKOFF", "60"))
+SCHOLAR_MAX_RETRIES = int(os.environ.get("SCHOLAR_MAX_RETRIES", "5"))
+
+# Which articles sync_scholar refreshes: each is due every SCHOLAR_MIN_INTERVAL
+# (heavily read / fast-cited) to SCHOLAR_MAX_INTERVAL (dormant) days, most
+# overdue first, at most SCHOLAR_DAILY_BUDGET lookups per 24 hours.
+SCHOLAR_DAILY_BUDGET = int(os.environ.get("SCHOLAR_DAILY_BUDGET", "200"))
+SCHOLAR_MIN_INTERVAL = int(os.environ.get("SCHOLAR_MIN_INTERVAL", "3"))
+SCHOLAR_MAX_INTERVAL = int(os.environ.get("SCHOLAR_MAX_INTERVAL", "180"))
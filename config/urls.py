@@ -18,19 +18,14 @@ from django.urls import path, include
 from django.contrib import admin
 from django.conf.urls.i18n import i18n_patterns
 from django.views.generic import RedirectView, TemplateView
-from django.contrib.sitemaps.views import sitemap
-from issue.sitemaps import IssueSitemap, ArticleSitemap
-
-sitemaps = {
-    'issues': IssueSitemap,
-    'articles': ArticleSitemap,
-}
+from issue.views import sitemap_index, sitemap_section
 
 urlpatterns = [
     path('rosetta/', include('rosetta.urls')),  # Rosetta URLs first
     path('admin/', admin.site.urls),
     path('i18n/', include('django.conf.urls.i18n')),
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemap.xml', sitemap_index, name='sitemap_index'),
+    path('sitemap-<slug:section>.xml', sitemap_section, name='sitemap_section'),
     path('robots.txt', TemplateView.as_view(template_name='robots.txt', content_type='text/plain')),  # robots
 ]
 
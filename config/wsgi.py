@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# Compile the per-language URL templates and, in production, every template
+# now rather than on the first request.
+from django.conf import settings  # noqa: E402
+
+from core import template_warmup, url_map  # noqa: E402
+
+url_map.warm()
+if settings.TEMPLATE_WARM_ON_STARTUP:
+    template_warmup.warm()
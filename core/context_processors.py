@@ -1,106 +1,141 @@
+from collections import Counter
+from functools import partial
+
 from about.models import About
 from core.site_config import clean_value, extract_issn, load_site_config
-from django.utils.html import strip_tags
+from django.conf import settings
+
+# Plain settings copied straight from the Default table, with their fallbacks.
+CONFIG_DEFAULTS = {
+    'site_title': 'Comparative Critical Studies',
+    'publisher': 'Edinburgh University Press',
+    'contact_email': 'journals@eup.ed.ac.uk',
+    'current_volume': '21',
+    'publication_frequency': '3 issues per year',
+    # Society and organizational info
+    'society_name': 'British Comparative Literature Association (BCLA)',
+    'journal_abbreviation': 'CCS',
+    'established_year': '2004',
+    # Editorial information
+    'editor_in_chief': '',
+    'manuscript_submission_url': '',
+    # Additional site configuration
+    'site_keywords': 'comparative literature, critical studies, academic journal',
+    'social_twitter': '',
+    'social_linkedin': '',
+    'google_analytics_id': '',
+}
+
+DEFAULT_DESCRIPTION = 'A leading journal for comparative literature and critical studies research'
+
+
+class LazySiteContext:
+    """
+    Site-wide template values, each computed the first time a template asks.
+
+    Redirects, downloads and pages that never touch the header pay nothing.
+    The context processor hands templates a callable per key; Django calls it
+    on lookup, and the value is memoized for the rest of the request.
+    `evaluated` counts which keys were actually used.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._config_failed = False
+        self.evaluated = Counter()
+
+    def get(self, key):
+        self.evaluated[key] += 1
+        return self._value(key)
+
+    def _value(self, key):
+        if key not in self._values:
+            builder = getattr(self, f'_build_{key}', None)
+            if builder is not None:
+                self._values[key] = builder()
+            else:
+                self._values[key] = self.site_config.get(key, CONFIG_DEFAULTS[key])
+        return self._values[key]
+
+    @property
+    def site_config(self):
+        if 'site_config' not in self._values:
+            try:
+                # Values keep their CKEditor markup here: several templates render
+                # them as rich text. Metadata uses the cleaned copies built below.
+                self._values['site_config'] = load_site_config()
+            except Exception as e:
+                # Fallback values if database is not available
+                self._values['site_config'] = {}
+                self._config_failed = True
+                if settings.DEBUG:
+                    print(f"Context processor error loading defaults: {e}")
+        return self._values['site_config']
+
+    def _build_site_config(self):
+        return self.site_config
+
+    def _build_about_pages(self):
+        # All about pages for navigation and footer
+        try:
+            return list(About.objects.all().order_by('title')[:10])
+        except Exception:
+            return []
+
+    def _build_site_description(self):
+        return self.site_config.get('site_description') or DEFAULT_DESCRIPTION
+
+    def _build_submission_email(self):
+        return self.site_config.get('submission_email', self._value('contact_email'))
+
+    # Journal metadata. No fallback for ISSN or journal title: these end up in
+    # citation_* meta tags, and a placeholder from another journal is far worse
+    # than an absent tag — Google Scholar would index this journal under
+    # someone else's ISSN.
+    def _build_issn_print(self):
+        return extract_issn(self.site_config.get('issn_print', ''))
+
+    def _build_issn_online(self):
+        return extract_issn(self.site_config.get('issn_online', ''))
+
+    def _build_journal_title_plain(self):
+        site_config = self.site_config
+        if self._config_failed:
+            return CONFIG_DEFAULTS['site_title']
+        return clean_value(site_config.get('site_title', ''))
+
+    # Debug information (only in development)
+    def _build_defaults_loaded(self):
+        return len(self.site_config)
+
+    def _build_available_defaults(self):
+        return list(self.site_config.keys())
+
+    def _build_site_context_evaluated(self):
+        # A live view of the counter, not a snapshot: whatever the template
+        # touches after this point still shows up.
+        return self.evaluated
+
+
+KEYS = (
+    ['about_pages', 'site_config', 'site_description', 'submission_email',
+     'issn_print', 'issn_online', 'journal_title_plain']
+    + list(CONFIG_DEFAULTS)
+)
+DEBUG_KEYS = ['defaults_loaded', 'available_defaults', 'site_context_evaluated']
 
 
 def site_context(request):
     """
-    Context processor to add site-wide data to all templates
+    Context processor to add site-wide data to all templates.
+
+    Every value is lazy (see LazySiteContext) and shared by all templates
+    rendered for the same request.
     """
-    context = {}
-
-    # Get About model data for header and site information
-    try:
-        # Get all about pages for navigation and footer
-        context['about_pages'] = About.objects.all().order_by('title')[:10]
-
-    except Exception:
-        context['site_about'] = None
-        context['about_pages'] = []
-        context['about_description'] = ''
-
-    # Get site configuration from Default model
-    try:
-        # Values keep their CKEditor markup here: several templates render them
-        # as rich text. Metadata callers use the cleaned copies added below.
-        site_config = load_site_config()
-
-        context['site_config'] = site_config
-
-        # Extract commonly used values with fallbacks
-        context['site_title'] = site_config.get('site_title', 'Comparative Critical Studies')
-
-        # Use site description from defaults, fallback to about description, then fallback text
-        context['site_description'] = (
-            site_config.get('site_description') or
-            context.get('about_description') or
-            'A leading journal for comparative literature and critical studies research'
-        )
-
-        # Core contact information
-        context['publisher'] = site_config.get('publisher', 'Edinburgh University Press')
-        context['contact_email'] = site_config.get('contact_email', 'journals@eup.ed.ac.uk')
-        context['submission_email'] = site_config.get('submission_email', site_config.get('contact_email', 'journals@eup.ed.ac.uk'))
-
-        # Journal metadata. No fallback for ISSN or journal title: these end up
-        # in citation_* meta tags, and a placeholder from another journal is far
-        # worse than an absent tag — Google Scholar would index this journal
-        # under someone else's ISSN.
-        context['issn_print'] = extract_issn(site_config.get('issn_print', ''))
-        context['issn_online'] = extract_issn(site_config.get('issn_online', ''))
-        context['journal_title_plain'] = clean_value(site_config.get('site_title', ''))
-        context['current_volume'] = site_config.get('current_volume', '21')
-        context['publication_frequency'] = site_config.get('publication_frequency', '3 issues per year')
-
-        # Society and organizational info
-        context['society_name'] = site_config.get('society_name', 'British Comparative Literature Association (BCLA)')
-        context['journal_abbreviation'] = site_config.get('journal_abbreviation', 'CCS')
-        context['established_year'] = site_config.get('established_year', '2004')
-
-        # Editorial information
-        context['editor_in_chief'] = site_config.get('editor_in_chief', '')
-        context['manuscript_submission_url'] = site_config.get('manuscript_submission_url', '')
-
-        # Additional site configuration
-        context['site_keywords'] = site_config.get('site_keywords', 'comparative literature, critical studies, academic journal')
-        context['social_twitter'] = site_config.get('social_twitter', '')
-        context['social_linkedin'] = site_config.get('social_linkedin', '')
-        context['google_analytics_id'] = site_config.get('google_analytics_id', '')
-
-        # Debug information (only in development)
-        from django.conf import settings
-        if settings.DEBUG:
-            context['defaults_loaded'] = len(site_config)
-            context['available_defaults'] = list(site_config.keys())
-
-    except Exception as e:
-        # Fallback values if database is not available
-        context['site_config'] = {}
-        context['site_title'] = 'Comparative Critical Studies'
-        context['site_description'] = (
-            context.get('about_description') or
-            'A leading journal for comparative literature and critical studies research'
-        )
-        context['publisher'] = 'Edinburgh University Press'
-        context['contact_email'] = 'journals@eup.ed.ac.uk'
-        context['submission_email'] = 'journals@eup.ed.ac.uk'
-        context['issn_print'] = ''
-        context['issn_online'] = ''
-        context['journal_title_plain'] = 'Comparative Critical Studies'
-        context['current_volume'] = '21'
-        context['publication_frequency'] = '3 issues per year'
-        context['society_name'] = 'British Comparative Literature Association (BCLA)'
-        context['journal_abbreviation'] = 'CCS'
-        context['established_year'] = '2004'
-        context['editor_in_chief'] = ''
-        context['manuscript_submission_url'] = ''
-        context['site_keywords'] = 'comparative literature, critical studies, academic journal'
-        context['social_twitter'] = ''
-        context['social_linkedin'] = ''
-        context['google_analytics_id'] = ''
-
-        # Log the error in development
-        from django.conf import settings
-        if settings.DEBUG:
-            print(f"Context processor error loading defaults: {e}")
-    return context
+    lazy = getattr(request, '_site_context', None)
+    if lazy is None:
+        lazy = LazySiteContext()
+        request._site_context = lazy
+
+    keys = KEYS + DEBUG_KEYS if settings.DEBUG else KEYS
+    return {key: partial(lazy.get, key) for key in keys}
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import template_warmup
+
+
+class Command(BaseCommand):
+    help = 'Parse every project template, reporting syntax errors (run before deploying)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--include-apps', action='store_true',
+            help='Also compile the templates shipped by installed apps (admin, ckeditor, …)',
+        )
+
+    def handle(self, *args, **options):
+        names = template_warmup.template_names(include_apps=options['include_apps'])
+        compiled, errors = template_warmup.warm(names)
+        for name, error in errors.items():
+            self.stderr.write(self.style.ERROR(f'{name}: {error}'))
+        if errors:
+            raise CommandError(f'{len(errors)} of {len(names)} template(s) failed to compile.')
+        self.stdout.write(self.style.SUCCESS(f'Compiled {compiled} template(s).'))
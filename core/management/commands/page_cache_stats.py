@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import get_resolver
+
+from core import page_cache
+
+
+class Command(BaseCommand):
+    help = 'Show the response cache hit ratio of each cached public page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        if not page_cache.is_shared():
+            # Each worker counts in its own memory; this process would only see its own zeros.
+            raise CommandError(
+                f"PAGE_CACHE_ALIAS ({settings.PAGE_CACHE_ALIAS!r}) is a per-process cache; "
+                "point it at a cache shared by all workers to collect hit ratios."
+            )
+        # Views register themselves when imported; loading the URLconf imports them all.
+        get_resolver().url_patterns
+        stats = page_cache.page_cache_stats()
+        if not stats:
+            self.stdout.write(self.style.WARNING('No cached views are registered.'))
+            return
+        width = max(len(name) for name in stats)
+        self.stdout.write(f"{'view':<{width}}  {'hits':>8}  {'misses':>8}  ratio")
+        for name, row in stats.items():
+            self.stdout.write(f"{name:<{width}}  {row['hits']:>8}  {row['misses']:>8}  {row['ratio']:.1%}")
+        if options['reset']:
+            page_cache.reset_page_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_default_name_en_default_name_ru_default_name_uz_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='default',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
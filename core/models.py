@@ -28,6 +28,7 @@ class Default(models.Model):
     """
     name = models.CharField(max_length=100, unique=True)
     value = RichTextField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
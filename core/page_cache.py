@@ -0,0 +1,171 @@
+"""
+Response cache for the public pages.
+
+Pages are cached per path, active language and auth state. Staff (who may see
+unpublished or admin-only bits) always get a fresh render, and so does anyone
+with a flash message waiting, since the message is part of the page.
+
+Every page carries the language-switcher form, so a cached page cannot hold a
+real CSRF token: the token is swapped for a placeholder before storing and
+the visitor's own token is put back on the way out.
+
+Nothing is invalidated by hand. Each cached view names the models it
+renders, and the key holds a version read from the database for each of them
+(the latest updated_at and the row count), so a save or a deletion in any
+process changes it. Default and About are on every page (header and
+navigation), so every key also holds the site config version.
+
+Hit/miss counters are kept in PAGE_CACHE_ALIAS. `page_cache_stats` only means
+something when that cache is shared by every worker, so it refuses otherwise.
+"""
+
+import hashlib
+import re
+from functools import wraps
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+
+from core.site_config import site_config_version
+
+# Covered by site_config_version().
+SITE_WIDE_MODELS = ('core.Default', 'about.About')
+
+CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = '__page_cache_csrf_token__'
+
+# Every view wrapped by cache_public_page, for the stats report.
+registered_views = []
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _cache():
+    return caches[_setting('PAGE_CACHE_ALIAS', 'default')]
+
+
+def is_shared():
+    """Whether PAGE_CACHE_ALIAS is seen by every worker (not a per-process cache)."""
+    return not isinstance(_cache(), (LocMemCache, DummyCache))
+
+
+def _model_version(label):
+    state = apps.get_model(label).objects.aggregate(latest=Max('updated_at'), total=Count('pk'))
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    return f"{latest}.{state['total']}"
+
+
+def _record(view_name, outcome):
+    cache = _cache()
+    key = f'page_cache:stats:{view_name}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def page_cache_stats():
+    """{view name: {'hits': n, 'misses': n, 'ratio': hits / (hits + misses)}}."""
+    cache = _cache()
+    keys = [f'page_cache:stats:{name}:{outcome}' for name in registered_views for outcome in ('hit', 'miss')]
+    counts = cache.get_many(keys)
+    stats = {}
+    for name in registered_views:
+        hits = counts.get(f'page_cache:stats:{name}:hit', 0)
+        misses = counts.get(f'page_cache:stats:{name}:miss', 0)
+        total = hits + misses
+        stats[name] = {'hits': hits, 'misses': misses, 'ratio': hits / total if total else 0.0}
+    return stats
+
+
+def reset_page_cache_stats():
+    _cache().delete_many(
+        [f'page_cache:stats:{name}:{outcome}' for name in registered_views for outcome in ('hit', 'miss')]
+    )
+
+
+def _bypass(request):
+    if not _setting('PAGE_CACHE_ENABLED', True):
+        return True
+    if request.method not in ('GET', 'HEAD'):
+        return True
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    # len() does not mark messages as read; iterating would.
+    return len(get_messages(request)) > 0
+
+
+def _cache_key(request, view_name, labels):
+    versions = [site_config_version()] + [_model_version(label) for label in labels]
+    stamp = hashlib.md5('-'.join(versions).encode()).hexdigest()
+    user = getattr(request, 'user', None)
+    auth = 'user' if user is not None and user.is_authenticated else 'anon'
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    language = translation.get_language() or settings.LANGUAGE_CODE
+    return f'page_cache:page:{view_name}:{language}:{auth}:{stamp}:{path}'
+
+
+def _freeze(request, response):
+    """What is stored for a response, or None if it must not be cached."""
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    if 'private' in response.get('Cache-Control', '') or 'no-store' in response.get('Cache-Control', ''):
+        return None
+    content = response.content.decode(response.charset)
+    content = CSRF_INPUT_RE.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', content)
+    return {'content': content, 'content_type': response['Content-Type']}
+
+
+def _thaw(request, frozen):
+    content = frozen['content']
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+    return HttpResponse(content, content_type=frozen['content_type'])
+
+
+def cache_public_page(*models, timeout=None):
+    """
+    Cache a public view's response until any of `models` (classes or
+    "app.Model" labels, each with an auto_now updated_at), Default or About
+    changes.
+    """
+    labels = [m if isinstance(m, str) else m._meta.label for m in models]
+    labels = [label for label in labels if label not in SITE_WIDE_MODELS]
+
+    def decorator(view):
+        view_name = f'{view.__module__}.{view.__name__}'
+        registered_views.append(view_name)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if _bypass(request):
+                return view(request, *args, **kwargs)
+
+            cache = _cache()
+            key = _cache_key(request, view_name, labels)
+            frozen = cache.get(key)
+            if frozen is not None:
+                _record(view_name, 'hit')
+                return _thaw(request, frozen)
+
+            _record(view_name, 'miss')
+            response = view(request, *args, **kwargs)
+            frozen = _freeze(request, response)
+            if frozen is not None:
+                cache.set(key, frozen, timeout=timeout or _setting('PAGE_CACHE_TIMEOUT', 600))
+            return response
+
+        return wrapped
+    return decorator
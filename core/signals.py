@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from about.models import About
+
+from .models import Default
+from .site_config import invalidate_site_config
+
+
+@receiver([post_save, post_delete], sender=Default, dispatch_uid='core.default_changed')
+def default_changed(sender, **kwargs):
+    """Any edit to Default Settings makes every cached site config stale."""
+    invalidate_site_config()
+
+
+@receiver([post_save, post_delete], sender=About, dispatch_uid='core.about_changed')
+def about_changed(sender, **kwargs):
+    """The About menu is part of the cached header fragments, keyed by the same version."""
+    invalidate_site_config()
@@ -11,14 +11,32 @@ Two things make this less trivial than a dict comprehension:
   templates want that markup; anything used as metadata (ISSN, email, titles in
   meta tags) wants plain text. Hence `clean_value`, applied at the point of use
   rather than to the whole dict.
+
+The table is read on every rendered page (the context processor), so the
+result is cached per process, per language and per variant (raw / cleaned),
+under a version read from the database: the latest updated_at and the row
+count of Default and About. An edit or a deletion in any process changes it.
+Reading the version is itself cached for SITE_CONFIG_VERSION_TTL seconds, so
+other workers see an edit within that time; the process that made it drops
+its copy at once through the signals in `core.signals`. With
+SITE_CONFIG_CACHE_ALIAS set, a shared Django cache also holds the config, so
+the workers do not each read the table after an edit.
 """
 
 import html
 import re
+import threading
+import time
 
 from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import translation
 from django.utils.html import strip_tags
 
+from about.models import About
+
 from .models import Default
 
 ISSN_RE = re.compile(r'\d{4}-\d{3}[\dXx]')
@@ -50,16 +68,127 @@ def config_key(row):
     return ''
 
 
+_lock = threading.Lock()
+# (language, clean) -> (version, config)
+_local = {}
+# (monotonic time it expires, version)
+_version = None
+_stats = {'hits': 0, 'shared_hits': 0, 'misses': 0}
+
+
+def _shared_cache():
+    alias = getattr(settings, 'SITE_CONFIG_CACHE_ALIAS', '') or ''
+    return caches[alias] if alias else None
+
+
+def _read_version():
+    parts = []
+    for model in (Default, About):
+        state = model.objects.aggregate(latest=Max('updated_at'), total=Count('pk'))
+        latest = state['latest'].timestamp() if state['latest'] else 0
+        parts.append(f"{latest}.{state['total']}")
+    return '-'.join(parts)
+
+
+def site_config_version():
+    """
+    Current version of the Default and About tables, read from the database.
+
+    Anything derived from the site config (cached fragments, cached pages) can
+    put this in its key and needs no invalidation of its own.
+    """
+    global _version
+    now = time.monotonic()
+    with _lock:
+        if _version is not None and _version[0] > now:
+            return _version[1]
+    version = _read_version()
+    with _lock:
+        _version = (now + getattr(settings, 'SITE_CONFIG_VERSION_TTL', 5), version)
+    return version
+
+
+def _forget_version():
+    global _version
+    with _lock:
+        _version = None
+
+
+def invalidate_site_config():
+    """
+    Read the version from the database again on the next lookup.
+
+    Called from the Default and About save/delete signals. It runs once straight
+    away, so the writing request sees its own change, and once more on commit,
+    so a version read while the transaction was open is not kept. Other
+    processes notice within SITE_CONFIG_VERSION_TTL seconds. A queryset.update()
+    on Default must set updated_at as well, or nobody notices.
+    """
+    _forget_version()
+    transaction.on_commit(_forget_version)
+
+
+def site_config_stats():
+    """Hit/miss counters since process start (or the last reset)."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_site_config_stats():
+    with _lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _read_table():
+    """One pass over Default, producing both the raw and the cleaned variant."""
+    raw, cleaned = {}, {}
+    for row in Default.objects.all():
+        key = config_key(row)
+        if key:
+            raw[key] = row.value
+            cleaned[key] = clean_value(row.value)
+    return raw, cleaned
+
+
 def load_site_config(clean=False):
     """
     Return {key: value} for every Default row that has a usable key.
 
     `clean=False` keeps the CKEditor markup, which the templates that render
     rich text depend on. `clean=True` strips it, for metadata use.
+
+    `Default.value` is translated, so the result depends on the active language
+    and is cached per language. The caller gets its own copy and may modify it.
     """
-    config = {}
-    for row in Default.objects.all():
-        key = config_key(row)
-        if key:
-            config[key] = clean_value(row.value) if clean else row.value
-    return config
+    language = translation.get_language() or settings.LANGUAGE_CODE
+    version = site_config_version()
+
+    with _lock:
+        entry = _local.get((language, clean))
+        if entry is not None and entry[0] == version:
+            _stats['hits'] += 1
+            return dict(entry[1])
+
+    shared = _shared_cache()
+    shared_key = f'site_config:{version}:{language}:{"clean" if clean else "raw"}'
+    config = shared.get(shared_key) if shared is not None else None
+    if config is not None:
+        with _lock:
+            _stats['shared_hits'] += 1
+            _local[(language, clean)] = (version, config)
+        return dict(config)
+
+    raw, cleaned = _read_table()
+    if shared is not None:
+        shared.set_many({
+            f'site_config:{version}:{language}:raw': raw,
+            f'site_config:{version}:{language}:clean': cleaned,
+        })
+    with _lock:
+        _stats['misses'] += 1
+        # Tagged with the version read before the query: if the table changed
+        # meanwhile, the next lookup sees a newer version and rebuilds.
+        _local[(language, False)] = (version, raw)
+        _local[(language, True)] = (version, cleaned)
+    return dict(cleaned if clean else raw)
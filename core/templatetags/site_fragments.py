@@ -0,0 +1,63 @@
+"""
+Fragment caching for the site-wide chrome in base.html.
+
+    {% load site_fragments %}
+    {% sitefragment "footer" %} … {% endsitefragment %}
+    {% sitefragment "about_menu" request.resolver_match.url_name %} … {% endsitefragment %}
+
+A fragment is rendered once per language, site-config version and extra
+vary-on values, then served from SITE_FRAGMENT_CACHE_ALIAS. The version is
+read from the Default and About tables, so an edit in any process reaches
+every worker within SITE_CONFIG_VERSION_TTL seconds with nothing to
+invalidate by hand.
+Only wrap markup that depends on nothing else: no CSRF tokens, no request
+path, no query string.
+"""
+
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+from core.site_config import site_config_version
+
+register = template.Library()
+
+
+def fragment_key(name, vary_on=()):
+    language = translation.get_language() or settings.LANGUAGE_CODE
+    vary = hashlib.md5(':'.join(str(value) for value in vary_on).encode()).hexdigest()
+    return f'site_fragment:{name}:{language}:{site_config_version()}:{vary}'
+
+
+class SiteFragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        if not getattr(settings, 'SITE_FRAGMENT_CACHE_ENABLED', True):
+            return self.nodelist.render(context)
+        cache = caches[getattr(settings, 'SITE_FRAGMENT_CACHE_ALIAS', 'default')]
+        key = fragment_key(self.name.resolve(context), [var.resolve(context) for var in self.vary_on])
+        value = cache.get(key)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(key, value, timeout=getattr(settings, 'SITE_FRAGMENT_CACHE_TIMEOUT', None))
+        return mark_safe(value)
+
+
+@register.tag('sitefragment')
+def do_sitefragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name.")
+    nodelist = parser.parse(('endsitefragment',))
+    parser.delete_first_token()
+    return SiteFragmentNode(
+        nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]],
+    )
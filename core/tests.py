@@ -1,3 +1,84 @@
-from django.test import TestCase
+import datetime
+import io
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from issue.models import Issue
+
+from . import page_cache, site_config
+from .models import Default
+
+
+@override_settings(SITE_CONFIG_VERSION_TTL=5)
+class SiteConfigTests(TestCase):
+    def setUp(self):
+        site_config._forget_version()
+        site_config._local.clear()
+
+    def load(self, at):
+        with mock.patch('core.site_config.time.monotonic', return_value=at):
+            return site_config.load_site_config()
+
+    def test_edits_made_by_other_processes_show_up_within_the_ttl(self):
+        row = Default.objects.create(name='site_title', value='Old')
+        self.assertEqual(self.load(100)['site_title'], 'Old')
+
+        # No signal reaches this process; only the database changes.
+        Default.objects.filter(pk=row.pk).update(value='New', updated_at=timezone.now())
+        self.assertEqual(self.load(104)['site_title'], 'Old')
+        self.assertEqual(self.load(106)['site_title'], 'New')
+
+    def test_own_edits_show_up_at_once(self):
+        row = Default.objects.create(name='site_title', value='Old')
+        self.assertEqual(self.load(100)['site_title'], 'Old')
+        row.value = 'New'
+        row.save()
+        self.assertEqual(self.load(101)['site_title'], 'New')
+
+
+TWO_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'web-1'},
+    'other': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'web-2'},
+}
+
+
+@override_settings(CACHES=TWO_CACHES, PAGE_CACHE_ENABLED=True, PAGE_CACHE_ALIAS='default')
+class PageCacheTests(TestCase):
+    def setUp(self):
+        page_cache.reset_page_cache_stats()
+
+    def test_edit_made_by_another_worker_expires_the_page(self):
+        issue = Issue.objects.create(
+            title='Spring', volume='1', issue_number='1', publication_date=datetime.date(2024, 5, 1),
+        )
+        url = f'/en/issue/{issue.pk}/'
+        self.assertContains(self.client.get(url), 'Spring')
+        self.assertContains(self.client.get(url), 'Spring')
+        self.assertEqual(page_cache.page_cache_stats()['issue.views.item_issue']['hits'], 1)
+
+        # Another worker, with its own per-process cache, saves the issue.
+        with override_settings(PAGE_CACHE_ALIAS='other'):
+            issue.title = 'Autumn'
+            issue.save()
+        self.assertContains(self.client.get(url), 'Autumn')
+
+    def test_stats_command_refuses_a_per_process_cache(self):
+        with self.assertRaisesMessage(CommandError, 'per-process cache'):
+            call_command('page_cache_stats', stdout=io.StringIO())
+
+
+@override_settings(PAGE_CACHE_ENABLED=False, SITE_CONFIG_VERSION_TTL=0)
+class SiteFragmentTests(TestCase):
+    def test_fragments_follow_edits_made_by_other_processes(self):
+        cache.clear()
+        row = Default.objects.create(name='site_title', value='<p>First title</p>')
+        self.assertContains(self.client.get('/en/issue/all/'), 'First title')
+        # No signal reaches this process; only the database changes.
+        Default.objects.filter(pk=row.pk).update(value='<p>Second title</p>', updated_at=timezone.now())
+        response = self.client.get('/en/issue/all/')
+        self.assertContains(response, 'Second title')
+        self.assertNotContains(response, 'First title')
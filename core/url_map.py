@@ -0,0 +1,76 @@
+"""
+Precompiled URL templates for the i18n_patterns views.
+
+Every public page exists once per language (/uz/…, /en/…, /ru/…), and pages
+emit canonical and hreflang links for all of them. `reverse()` walks the
+resolver and `translation.override` swaps catalogs for each one. Instead,
+each (view name, kwarg names, language, script prefix) is reversed once with
+sentinel values and kept as a format string, so later lookups are a
+`str.format`.
+
+Only integer kwargs are templated — that is all the public URLs take. Any
+other value falls back to a real `reverse()`.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import get_script_prefix, reverse
+from django.utils import translation
+
+# Large enough never to collide with a real pk appearing elsewhere in a URL.
+SENTINEL_BASE = 987654320
+
+_templates = {}
+_lock = threading.Lock()
+
+
+def _compile(name, kwarg_names, language):
+    sentinels = {kwarg: SENTINEL_BASE + i for i, kwarg in enumerate(kwarg_names)}
+    with translation.override(language):
+        url = reverse(name, kwargs=sentinels)
+    template = url.replace('{', '{{').replace('}', '}}')
+    for kwarg, sentinel in sentinels.items():
+        if template.count(str(sentinel)) != 1:
+            return None
+        template = template.replace(str(sentinel), f'{{{kwarg}}}')
+    return template
+
+
+def localized_path(name, language=None, **kwargs):
+    """`reverse(name, kwargs=kwargs)` as it would be under `language` (default: active)."""
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    if not all(type(value) is int for value in kwargs.values()):
+        with translation.override(language):
+            return reverse(name, kwargs=kwargs)
+
+    key = (name, tuple(sorted(kwargs)), language, get_script_prefix())
+    template = _templates.get(key)
+    if template is None:
+        template = _compile(name, key[1], language) or ''
+        with _lock:
+            _templates[key] = template
+    if not template:
+        with translation.override(language):
+            return reverse(name, kwargs=kwargs)
+    return template.format(**kwargs)
+
+
+def language_paths(name, **kwargs):
+    """{language code: path} for every language in settings.LANGUAGES."""
+    return {code: localized_path(name, code, **kwargs) for code, _ in settings.LANGUAGES}
+
+
+def warm(names=('article_detail', 'item_issue', 'about')):
+    """Compile the templates the hot pages need, e.g. from a startup hook."""
+    for name in names:
+        language_paths(name, pk=1)
+
+
+@receiver(setting_changed)
+def _urlconf_changed(setting, **kwargs):
+    if setting in ('ROOT_URLCONF', 'LANGUAGES', 'LANGUAGE_CODE', 'FORCE_SCRIPT_NAME'):
+        with _lock:
+            _templates.clear()
@@ -3,6 +3,7 @@ from django.views.decorators.http import require_POST
 from django.contrib import messages
 
 from core.models import Joining
+from core.page_cache import cache_public_page
 from issue.models import JournalIssue, Issue
 
 
@@ -26,6 +27,7 @@ def join(request):
 
     return redirect('index')  # Redirect to the home page after successful join
 
+@cache_public_page(Issue, JournalIssue)
 def index(request):
     # Dynamic home page: fetch articles for each tab and sidebar flags
     latest_articles = JournalIssue.objects.order_by('-publication_date')[:10]
@@ -2,14 +2,18 @@ import xml.etree.ElementTree as ET
 
 from django.contrib import admin, messages
 from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.http import HttpResponse
 from django.utils import timezone
 from django.utils.html import format_html
 
 from issue.models import JournalIssue
 
-from .models import DepositBatch, DepositItem
-from .services import submit_batch
+from . import jobs
+from .deposit_xml import rerender_batch
+from .models import CrossrefJob, DepositBatch, DepositItem
+from .services import CrossrefError, release_dois
 
 
 class DepositItemInline(admin.TabularInline):
@@ -22,6 +26,9 @@ class DepositItemInline(admin.TabularInline):
     def has_add_permission(self, request, obj=None):
         return False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('article')
+
     @admin.display(description='Article')
     def article_link(self, obj):
         return format_html(
@@ -32,22 +39,51 @@ class DepositItemInline(admin.TabularInline):
 
 @admin.register(DepositBatch)
 class DepositBatchAdmin(admin.ModelAdmin):
-    list_display = ('batch_id', 'status', 'environment', 'item_count', 'created_at', 'submitted_at', 'approved_by')
-    list_filter = ('status', 'environment', 'created_at')
+    list_display = ('batch_id', 'status', 'job', 'kind', 'environment', 'item_count', 'created_at', 'submitted_at', 'approved_by')
+    list_filter = ('status', 'kind', 'environment', 'created_at')
     search_fields = ('batch_id', 'log', 'items__proposed_doi')
     readonly_fields = (
-        'batch_id', 'environment', 'status', 'created_at', 'approved_at', 'approved_by',
+        'batch_id', 'environment', 'status', 'job', 'kind', 'created_at', 'approved_at', 'approved_by',
         'submitted_at', 'checked_at', 'log', 'xml_preview',
     )
     exclude = ('xml',)
     inlines = [DepositItemInline]
     ordering = ('-created_at',)
-    actions = ['approve_and_deposit', 'cancel_batches', 'download_xml']
+    list_select_related = ('approved_by',)
+    actions = [
+        'approve_and_deposit', 'requeue_deposits', 'check_results', 'rerender_xml', 'cancel_batches', 'download_xml',
+    ]
 
     def has_add_permission(self, request):
         # Batches are created by the queue_doi_deposits cron command only.
         return False
 
+    def get_queryset(self, request):
+        # A subquery rather than Count('items'): searching by items__proposed_doi
+        # joins the items again, which would multiply a joined count.
+        counts = (
+            DepositItem.objects.filter(batch=OuterRef('pk')).order_by()
+            .values('batch').annotate(total=Count('pk')).values('total')
+        )
+        latest_job = CrossrefJob.objects.filter(batch=OuterRef('pk')).order_by('-created_at', '-pk')
+        return super().get_queryset(request).annotate(
+            item_total=Coalesce(Subquery(counts), 0),
+            job_kind=Subquery(latest_job.values('kind')[:1]),
+            job_status=Subquery(latest_job.values('status')[:1]),
+        )
+
+    @admin.display(description='Items', ordering='item_total')
+    def item_count(self, obj):
+        return obj.item_count
+
+    @admin.display(description='Job')
+    def job(self, obj):
+        """The latest Crossref job for the batch."""
+        if not obj.job_kind:
+            return '—'
+        kinds, statuses = dict(CrossrefJob.KIND_CHOICES), dict(CrossrefJob.STATUS_CHOICES)
+        return f"{kinds[obj.job_kind]}: {statuses[obj.job_status].lower()}"
+
     @admin.display(description='Deposit XML (exactly what will be sent)')
     def xml_preview(self, obj):
         return format_html(
@@ -73,41 +109,89 @@ class DepositBatchAdmin(admin.ModelAdmin):
                 self.message_user(request, f"{batch.batch_id}: {problem}", level=messages.ERROR)
                 continue
 
-            ok, message = submit_batch(batch)
-            batch.approved_at = timezone.now()
-            batch.approved_by = request.user
-            batch.append_log(f"Approved by {request.user}. {message}")
-
-            if not ok:
-                batch.status = DepositBatch.FAILED
-                batch.items.update(status=DepositItem.FAILED)
+            with transaction.atomic():
+                batch.status = DepositBatch.APPROVED
+                batch.approved_at = timezone.now()
+                batch.approved_by = request.user
+                batch.append_log(f"Approved by {request.user}. Deposit queued for the Crossref worker.")
                 batch.save(update_fields=['status', 'approved_at', 'approved_by', 'log'])
-                self.message_user(request, f"{batch.batch_id}: deposit failed — {message[:300]}", level=messages.ERROR)
+                jobs.enqueue(CrossrefJob.DEPOSIT, batch, request.user)
+
+            self.message_user(
+                request,
+                f"{batch.batch_id}: approved and queued for deposit to Crossref ({batch.environment}). "
+                "The run_crossref_jobs worker sends it; its progress shows in the Job column.",
+                level=messages.SUCCESS,
+            )
+
+    @admin.action(description="Queue the deposit of selected approved batches again")
+    def requeue_deposits(self, request, queryset):
+        """For an approved batch whose deposit job failed without sending it."""
+        queued = 0
+        for batch in queryset:
+            if not jobs.stranded(batch):
+                self.message_user(
+                    request,
+                    f"{batch.batch_id}: skipped — only approved batches with no deposit job "
+                    "queued or running can be queued again.",
+                    level=messages.WARNING,
+                )
                 continue
+            batch.append_log(f"Deposit queued again by {request.user}.")
+            batch.save(update_fields=['log'])
+            jobs.enqueue(CrossrefJob.DEPOSIT, batch, request.user)
+            queued += 1
+        if queued:
+            self.message_user(request, f"Deposit queued again for {queued} batch(es).")
 
-            with transaction.atomic():
-                for item in batch.items.select_related('article'):
-                    item.article.doi = item.proposed_doi
-                    item.article.save(update_fields=['doi'])
-                    item.status = DepositItem.DEPOSITED
-                    item.save(update_fields=['status'])
-                batch.status = DepositBatch.SUBMITTED
-                batch.submitted_at = timezone.now()
-                batch.save(update_fields=['status', 'submitted_at', 'approved_at', 'approved_by', 'log'])
+    @admin.action(description="Check Crossref result of selected batches now")
+    def check_results(self, request, queryset):
+        queued = 0
+        for batch in queryset:
+            if batch.status != DepositBatch.SUBMITTED:
+                self.message_user(
+                    request,
+                    f"{batch.batch_id}: skipped — only submitted batches have a result to check.",
+                    level=messages.WARNING,
+                )
+                continue
+            if jobs.active_job(batch, CrossrefJob.POLL):
+                continue
+            jobs.enqueue(CrossrefJob.POLL, batch, request.user)
+            queued += 1
+        if queued:
+            self.message_user(request, f"Result check queued for {queued} batch(es).")
 
+    @admin.action(description="Re-render XML of selected batches from current article data")
+    def rerender_xml(self, request, queryset):
+        for batch in queryset:
+            if not batch.is_editable:
+                self.message_user(
+                    request,
+                    f"{batch.batch_id}: skipped — status is '{batch.get_status_display()}', only pending batches can be re-rendered.",
+                    level=messages.WARNING,
+                )
+                continue
+            try:
+                store, dropped = rerender_batch(batch)
+            except CrossrefError as exc:
+                self.message_user(request, f"{batch.batch_id}: {exc}", level=messages.ERROR)
+                continue
+            level = messages.WARNING if dropped else messages.SUCCESS
             self.message_user(
                 request,
-                f"{batch.batch_id}: submitted to Crossref ({batch.environment}); "
-                f"{batch.item_count} DOI(s) written to their articles. "
-                "Crossref processes deposits asynchronously — run check_doi_deposits later to confirm registration.",
-                level=messages.SUCCESS,
+                f"{batch.batch_id}: XML re-rendered — {store.rendered} changed article(s) rendered, "
+                f"{store.reused} reused, {len(dropped)} dropped (see the batch log)."
+                + (" No articles were left, so the batch was cancelled." if batch.status == DepositBatch.CANCELLED else ''),
+                level=level,
             )
 
     @admin.action(description="Cancel selected batches (do not deposit)")
     def cancel_batches(self, request, queryset):
         cancelled = 0
         for batch in queryset:
-            if not batch.is_editable:
+            # An approved batch whose deposit job failed can be cancelled too.
+            if not (batch.is_editable or jobs.stranded(batch)):
                 self.message_user(
                     request,
                     f"{batch.batch_id}: cannot cancel — already {batch.get_status_display()}.",
@@ -118,6 +202,8 @@ class DepositBatchAdmin(admin.ModelAdmin):
             batch.append_log(f"Cancelled by {request.user}.")
             batch.save(update_fields=['status', 'log'])
             batch.items.update(status=DepositItem.CANCELLED)
+            if batch.mints_dois:
+                release_dois(batch.items.values_list('proposed_doi', flat=True))
             cancelled += 1
         if cancelled:
             self.message_user(request, f"{cancelled} batch(es) cancelled. Their articles will be re-queued on the next cron run.")
@@ -141,12 +227,21 @@ class DepositBatchAdmin(admin.ModelAdmin):
         if not items:
             return "batch has no articles."
 
-        already = [i for i in items if i.article.doi]
-        if already:
-            return (
-                f"{len(already)} article(s) already have a DOI (e.g. #{already[0].article_id} = "
-                f"{already[0].article.doi}). Cancel this batch and re-run queue_doi_deposits."
-            )
+        if batch.mints_dois:
+            already = [i for i in items if i.article.doi]
+            if already:
+                return (
+                    f"{len(already)} article(s) already have a DOI (e.g. #{already[0].article_id} = "
+                    f"{already[0].article.doi}). Re-render the batch XML (admin action) and approve again."
+                )
+        else:
+            moved = [i for i in items if i.article.doi != i.proposed_doi]
+            if moved:
+                return (
+                    f"{len(moved)} article(s) no longer have the DOI this update is for (e.g. "
+                    f"#{moved[0].article_id} = {moved[0].article.doi or 'none'}, batch has "
+                    f"{moved[0].proposed_doi}). Re-render the batch XML (admin action) and approve again."
+                )
 
         proposed = [i.proposed_doi for i in items]
         if len(set(proposed)) != len(proposed):
@@ -158,7 +253,10 @@ class DepositBatchAdmin(admin.ModelAdmin):
             .values_list('doi', flat=True)
         )
         if clash:
-            return f"proposed DOI(s) already used by other articles: {', '.join(clash)}."
+            return (
+                f"proposed DOI(s) already used by other articles: {', '.join(clash)}. "
+                "Re-render the batch XML (admin action) to drop them, then approve again."
+            )
 
         # The XML is frozen at queue time but the items are not: deleting an
         # article cascades its item away and leaves the DOI stranded in the XML,
@@ -166,7 +264,7 @@ class DepositBatchAdmin(admin.ModelAdmin):
         try:
             root = ET.fromstring(batch.xml)
         except ET.ParseError as exc:
-            return f"stored XML is not parseable ({exc}). Cancel this batch and re-run queue_doi_deposits."
+            return f"stored XML is not parseable ({exc}). Re-render the batch XML (admin action) and approve again."
         # iterfind, not iter: the {*} namespace wildcard is an ElementPath
         # feature and iter() would match nothing at all here.
         in_xml = {node.text.strip() for node in root.iterfind('.//{*}doi') if node.text}
@@ -175,17 +273,42 @@ class DepositBatchAdmin(admin.ModelAdmin):
             detail = f" Stale entries: {', '.join(sorted(orphaned))}." if orphaned else ''
             return (
                 "the XML no longer matches this batch's articles — it was rendered before the "
-                f"articles changed.{detail} Cancel this batch and re-run queue_doi_deposits."
+                f"articles changed.{detail} Re-render the batch XML (admin action) and approve again."
             )
         return None
 
 
 @admin.register(DepositItem)
 class DepositItemAdmin(admin.ModelAdmin):
-    list_display = ('proposed_doi', 'article', 'batch', 'status')
+    list_display = ('proposed_doi', 'article', 'batch_label', 'status')
     list_filter = ('status', 'batch__environment')
+    list_select_related = ('article__issue', 'batch')
     search_fields = ('proposed_doi', 'article__title', 'batch__batch_id')
     readonly_fields = ('batch', 'article', 'proposed_doi', 'resource_url', 'status', 'note')
 
     def has_add_permission(self, request):
         return False
+
+    # Not the batch itself: DepositBatch.__str__ counts its items, once per row.
+    @admin.display(description='Batch', ordering='batch__batch_id')
+    def batch_label(self, obj):
+        return obj.batch.batch_id
+
+
+@admin.register(CrossrefJob)
+class CrossrefJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'batch_label', 'status', 'requested_by', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind', 'created_at')
+    list_select_related = ('batch', 'requested_by')
+    search_fields = ('batch__batch_id', 'message')
+    readonly_fields = (
+        'kind', 'batch', 'status', 'requested_by', 'attempts', 'created_at', 'started_at', 'finished_at', 'message',
+    )
+
+    def has_add_permission(self, request):
+        # Jobs are queued by the DepositBatch admin actions only.
+        return False
+
+    @admin.display(description='Batch', ordering='batch__batch_id')
+    def batch_label(self, obj):
+        return obj.batch.batch_id
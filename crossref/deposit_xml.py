@@ -0,0 +1,322 @@
+"""
+Streaming deposit XML for large deposits.
+
+`build_deposit_xml` renders a whole deposit into one string, which is fine for
+an issue's worth of articles but not for a back-catalogue deposit of
+thousands. Here the same templates are rendered one issue group at a time —
+crossref/deposit_head.xml, crossref/deposit_journal.xml per group, then the
+closing tags — and written straight to a stream, so memory is bounded by the
+largest issue, not by the deposit.
+
+Entries should arrive ordered by issue: each run of consecutive articles from
+one issue becomes one <journal> element. An issue that reappears later gets a
+second <journal> element, which Crossref accepts.
+
+`split_deposit` also cuts the deposit into several documents of at most
+CROSSREF_MAX_DEPOSIT_BYTES each (and optionally at most `max_articles`).
+Crossref limits upload size, and one invalid record rejects its whole file.
+
+Each article is rendered on its own (crossref/deposit_article.xml), and a
+FragmentStore keeps those fragments in the database keyed by a hash of what
+they were rendered from. `rerender_batch` uses it to bring a stale pending
+batch up to date: only the articles that changed since it was queued are
+rendered again, the rest of the XML is reassembled from stored fragments.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from issue.models import JournalIssue
+
+from .models import DepositFragment, DepositItem
+from .services import (
+    article_fingerprint, article_problem, build_resource_url, deposit_article, deposit_context,
+    get_site_base_url, make_batch_id, release_dois, render_article,
+)
+
+# Part of every fragment key: bump it when crossref/deposit_article.xml
+# changes, so fragments rendered from the old template are not reused.
+FRAGMENT_VERSION = 1
+
+# Rows per IN (...) lookup; SQLite caps the number of query parameters.
+LOOKUP_CHUNK = 500
+
+# Closes what crossref/deposit_head.xml opens; matches crossref/deposit.xml.
+DEPOSIT_TAIL = '  </body>\n</doi_batch>\n'
+
+
+def max_deposit_bytes():
+    return getattr(settings, 'CROSSREF_MAX_DEPOSIT_BYTES', 5 * 1024 * 1024)
+
+
+def render_head(context):
+    return render_to_string('crossref/deposit_head.xml', context)
+
+
+def fragment_key(data):
+    """Content hash of a deposit_article() dict: equal keys render equal XML."""
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{FRAGMENT_VERSION}:{payload}'.encode()).hexdigest()
+
+
+class FragmentStore:
+    """
+    Article fragments by content key, for one deposit run.
+
+    Stored fragments are loaded when the store is created and new ones are
+    written by save(); render() only touches memory.
+    """
+
+    def __init__(self, entries=()):
+        self._xml = {}
+        self._new = {}
+        self._reused = set()
+        keys = [fragment_key(deposit_article(*entry)) for entry in entries]
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            self._xml.update(
+                DepositFragment.objects.filter(key__in=keys[start:start + LOOKUP_CHUNK])
+                .values_list('key', 'xml')
+            )
+
+    @property
+    def reused(self):
+        return len(self._reused)
+
+    @property
+    def rendered(self):
+        return len(self._new)
+
+    def render(self, entry):
+        """The fragment for an (article, doi, resource_url) entry, rendered only if not stored."""
+        data = deposit_article(*entry)
+        key = fragment_key(data)
+        xml = self._xml.get(key)
+        if xml is not None:
+            if key not in self._new:
+                self._reused.add(key)
+            return mark_safe(xml)
+        xml = render_article(data)
+        self._xml[key] = xml
+        self._new[key] = entry[0].pk
+        return xml
+
+    def save(self):
+        """Store the fragments rendered by this run, replacing the articles' older ones."""
+        if not self._new:
+            return
+        DepositFragment.objects.bulk_create(
+            [DepositFragment(key=key, article_id=article_id, xml=str(self._xml[key]))
+             for key, article_id in self._new.items()],
+            batch_size=LOOKUP_CHUNK, ignore_conflicts=True,
+        )
+        article_ids = list(set(self._new.values()))
+        for start in range(0, len(article_ids), LOOKUP_CHUNK):
+            DepositFragment.objects.filter(
+                article_id__in=article_ids[start:start + LOOKUP_CHUNK],
+            ).exclude(key__in=self._new).delete()
+
+
+def render_group(context, issue, entries, store=None):
+    if store is None:
+        fragments = [render_article(deposit_article(*entry)) for entry in entries]
+    else:
+        fragments = [store.render(entry) for entry in entries]
+    group = {'issue': issue, 'fragments': fragments}
+    return render_to_string('crossref/deposit_journal.xml', {**context, 'group': group})
+
+
+def iter_groups(entries):
+    """Yield (issue, [entry, …]) for each run of consecutive entries from the same issue."""
+    issue_id, issue, run = None, None, []
+    for entry in entries:
+        article = entry[0]
+        if run and article.issue_id != issue_id:
+            yield issue, run
+            run = []
+        issue_id, issue = article.issue_id, article.issue
+        run.append(entry)
+    if run:
+        yield issue, run
+
+
+class DepositWriter:
+    """Writes one deposit document to a text stream, an issue group at a time."""
+
+    def __init__(self, stream, batch_id=None, site_config=None, context=None):
+        self.stream = stream
+        self.context = context if context is not None else deposit_context(batch_id, site_config)
+        self.batch_id = self.context['batch_id']
+        self.bytes_written = 0
+        self.article_count = 0
+        self._write(render_head(self.context))
+
+    def _write(self, text):
+        self.stream.write(text)
+        self.bytes_written += len(text.encode('utf-8'))
+
+    def write_group(self, issue, entries):
+        self._write(render_group(self.context, issue, entries))
+        self.article_count += len(entries)
+
+    def close(self):
+        self._write(DEPOSIT_TAIL)
+
+
+def write_deposit_xml(stream, entries, batch_id=None, site_config=None):
+    """
+    Stream the deposit for `entries` (any iterable of (article, doi,
+    resource_url)) to `stream`. Returns the finished DepositWriter.
+    """
+    writer = DepositWriter(stream, batch_id, site_config)
+    for issue, run in iter_groups(entries):
+        writer.write_group(issue, run)
+    writer.close()
+    return writer
+
+
+class DepositPart:
+    """One document of a split deposit: its entries and rendered fragments."""
+
+    def __init__(self, context):
+        self.context = context
+        self.batch_id = context['batch_id']
+        self.head = render_head(context)
+        self.entries = []
+        self.fragments = []
+        self.size = len(self.head.encode('utf-8')) + len(DEPOSIT_TAIL.encode('utf-8'))
+
+    def add(self, entries, fragment, size):
+        self.entries.extend(entries)
+        self.fragments.append(fragment)
+        self.size += size
+
+    def write(self, stream):
+        stream.write(self.head)
+        for fragment in self.fragments:
+            stream.write(fragment)
+        stream.write(DEPOSIT_TAIL)
+
+    @property
+    def xml(self):
+        return ''.join([self.head, *self.fragments, DEPOSIT_TAIL])
+
+
+def _chunks(context, issue, entries, max_bytes, max_articles, store):
+    """
+    Render an issue group, halving it until each piece fits. A single article
+    too large on its own is yielded anyway; it cannot be split further.
+    """
+    if max_articles and len(entries) > max_articles:
+        pieces = [entries[i:i + max_articles] for i in range(0, len(entries), max_articles)]
+        for piece in pieces:
+            yield from _chunks(context, issue, piece, max_bytes, max_articles, store)
+        return
+    fragment = render_group(context, issue, entries, store)
+    size = len(fragment.encode('utf-8'))
+    if size <= max_bytes or len(entries) == 1:
+        yield entries, fragment, size
+        return
+    middle = len(entries) // 2
+    yield from _chunks(context, issue, entries[:middle], max_bytes, max_articles, store)
+    yield from _chunks(context, issue, entries[middle:], max_bytes, max_articles, store)
+
+
+def split_deposit(entries, max_bytes=None, max_articles=None, site_config=None, store=None):
+    """
+    Yield DepositParts, each at most `max_bytes` of UTF-8 XML (default
+    CROSSREF_MAX_DEPOSIT_BYTES) and `max_articles` articles. Each part has its
+    own batch id. Only one part is held in memory at a time. Article fragments
+    come from `store` when one is given.
+    """
+    max_bytes = max_bytes or max_deposit_bytes()
+    shared = deposit_context(site_config=site_config)
+
+    def new_part():
+        return DepositPart({**shared, 'batch_id': make_batch_id()})
+
+    part = new_part()
+    # Room left for journal fragments once the head and tail are accounted for.
+    room = max_bytes - part.size
+    for issue, run in iter_groups(entries):
+        for chunk, fragment, size in _chunks(shared, issue, run, room, max_articles, store):
+            too_big = part.size + size > max_bytes
+            too_many = max_articles and len(part.entries) + len(chunk) > max_articles
+            if part.entries and (too_big or too_many):
+                yield part
+                part = new_part()
+            part.add(chunk, fragment, size)
+    if part.entries:
+        yield part
+
+
+def rerender_batch(batch, site_config=None, base_url=None):
+    """
+    Bring a pending batch's XML up to date with the live database, keeping
+    its batch id and DOIs.
+
+    Items whose article now has a DOI (for a metadata update: no longer has
+    the batch's DOI), can no longer be deposited, or whose proposed DOI was
+    since given to another article by hand are dropped from the batch (their
+    articles go back to the queue). Everything else is reassembled,
+    re-rendering only the articles whose content changed. A batch left with
+    no articles is cancelled. Returns (store, dropped) with dropped a list of
+    (item, reason).
+    """
+    base_url = base_url or get_site_base_url()
+    items = list(
+        batch.items.select_related('article__issue').order_by('article__issue_id', 'article_id')
+    )
+    taken = dict(
+        JournalIssue.objects.filter(doi__in=[item.proposed_doi for item in items])
+        .exclude(pk__in=[item.article_id for item in items])
+        .values_list('doi', 'pk')
+    )
+    keep, dropped = [], []
+    for item in items:
+        article = item.article
+        if batch.mints_dois and article.doi:
+            problem = f"article already has DOI {article.doi}"
+        elif not batch.mints_dois and article.doi != item.proposed_doi:
+            problem = f"article now has DOI {article.doi or 'none'}"
+        elif item.proposed_doi in taken:
+            problem = f"{item.proposed_doi} is now used by article #{taken[item.proposed_doi]}"
+        else:
+            problem = article_problem(article)
+        if problem:
+            dropped.append((item, problem))
+            continue
+        item.resource_url = build_resource_url(article, base_url)
+        item.fingerprint = article_fingerprint(article, item.resource_url)
+        keep.append(item)
+
+    entries = [(item.article, item.proposed_doi, item.resource_url) for item in keep]
+    store = FragmentStore(entries)
+    part = DepositPart(deposit_context(batch.batch_id, site_config))
+    for issue, run in iter_groups(entries):
+        fragment = render_group(part.context, issue, run, store)
+        part.add(run, fragment, len(fragment.encode('utf-8')))
+
+    with transaction.atomic():
+        store.save()
+        if dropped:
+            DepositItem.objects.filter(pk__in=[item.pk for item, _ in dropped]).delete()
+            if batch.mints_dois:
+                release_dois(item.proposed_doi for item, _ in dropped)
+        DepositItem.objects.bulk_update(keep, ['resource_url', 'fingerprint'], batch_size=LOOKUP_CHUNK)
+        batch.xml = part.xml
+        batch.append_log(
+            f"XML re-rendered against the live database: {len(keep)} article(s) kept "
+            f"({store.rendered} re-rendered, {store.reused} reused), {len(dropped)} dropped."
+        )
+        for item, reason in dropped:
+            batch.append_log(f"  dropped #{item.article_id} {item.proposed_doi}: {reason}")
+        if not keep:
+            batch.status = batch.CANCELLED
+            batch.append_log("Cancelled: no articles left to deposit.")
+        batch.save(update_fields=['xml', 'log', 'status'])
+    return store, dropped
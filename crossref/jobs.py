@@ -0,0 +1,227 @@
+"""
+A small database-backed job queue for the admin's Crossref actions.
+
+Approving a batch used to POST it to Crossref inside the admin request, with
+a 60 s timeout per batch, so approving a few batches could hold a web worker
+for minutes. The admin now only records a CrossrefJob; the run_crossref_jobs
+worker claims jobs one at a time and does the HTTP work out of band.
+
+A job is claimed with a conditional UPDATE, so several workers can share the
+table without two of them running the same job. A job left `running` for
+CROSSREF_JOB_STALE_AFTER seconds belongs to a worker that died and is queued
+again. A deposit is saved as submitted as soon as Crossref has it, so only a
+worker that dies between those two steps can send a batch twice.
+
+A deposit job that crashes leaves the batch pending review if nothing was
+sent, or submitted if it was. An approved batch whose job failed without
+either can be queued again or cancelled from the admin.
+"""
+
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CrossrefJob, DepositBatch, DepositItem
+from .services import (
+    FAILED_STATUSES, REGISTERED_STATUSES, assign_batch_dois, check_batch, clear_batch_dois,
+    record_fingerprints, release_dois, submit_batch,
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(kind, batch, user=None):
+    return CrossrefJob.objects.create(kind=kind, batch=batch, requested_by=user)
+
+
+def active_job(batch, kind=None):
+    """The batch's queued or running job (of `kind`), if any."""
+    jobs = batch.jobs.filter(status__in=[CrossrefJob.QUEUED, CrossrefJob.RUNNING])
+    if kind:
+        jobs = jobs.filter(kind=kind)
+    return jobs.first()
+
+
+def deposit(batch, client=None):
+    """
+    Send an approved batch to Crossref and record the outcome on it.
+    Returns (ok, message).
+    """
+    ok, message = submit_batch(batch, client=client)
+    batch.append_log(message)
+
+    if not ok:
+        batch.status = DepositBatch.FAILED
+        batch.items.update(status=DepositItem.FAILED)
+        if batch.mints_dois:
+            release_dois(batch.items.values_list('proposed_doi', flat=True))
+        batch.save(update_fields=['status', 'log'])
+        return False, message
+
+    # Crossref holds the upload now. Record that before anything else can
+    # fail, so a crash below never leaves the batch looking unsent.
+    batch.status = DepositBatch.SUBMITTED
+    batch.submitted_at = timezone.now()
+    batch.save(update_fields=['status', 'submitted_at', 'log'])
+    return True, f"submitted to Crossref ({batch.environment}); {write_dois(batch)}"
+
+
+def write_dois(batch):
+    """
+    Mark a sent batch's items deposited and, for new registrations, write
+    their DOIs to the articles. Returns a summary for the log.
+    """
+    with transaction.atomic():
+        if batch.mints_dois:
+            written = assign_batch_dois(batch)
+            return f"{written} DOI(s) written to their articles."
+        # The articles already carry these DOIs; only the metadata changes.
+        written = batch.items.update(status=DepositItem.DEPOSITED)
+        return f"new metadata sent for {written} registered DOI(s)."
+
+
+def record_result(batch, state, message, diagnostics=None):
+    """
+    Apply a check_batch() outcome to the batch and its items.
+
+    With per-DOI `diagnostics` every item gets its own status and Crossref's
+    note, so one rejected record no longer fails the articles Crossref did
+    register; items the result does not mention follow the overall state.
+    A batch with both outcomes is marked partly registered.
+    """
+    batch.checked_at = timezone.now()
+    batch.append_log(f"Result check: {state} — {message}")
+
+    if state in ('registered', 'failed'):
+        overall = DepositItem.REGISTERED if state == 'registered' else DepositItem.FAILED
+        if diagnostics:
+            _apply_diagnostics(batch, overall, diagnostics)
+        else:
+            batch.items.update(status=overall)
+        registered = batch.items.filter(status=DepositItem.REGISTERED).exists()
+        failed = batch.items.filter(status=DepositItem.FAILED).exists()
+        if registered and failed:
+            batch.status = DepositBatch.PARTIAL
+        elif registered or failed:
+            batch.status = DepositBatch.REGISTERED if registered else DepositBatch.FAILED
+        else:
+            batch.status = DepositBatch.REGISTERED if state == 'registered' else DepositBatch.FAILED
+        if registered:
+            record_fingerprints(batch)
+        if failed and batch.mints_dois:
+            # The DOI is written to the article at approval time, but Crossref
+            # only registers it later. A rejected DOI resolves nowhere and makes
+            # the article look done, so the next cron run would skip it forever:
+            # take it back so the article returns to the queue. A rejected
+            # metadata update leaves the already registered DOIs alone.
+            released = clear_batch_dois(batch)
+            if released:
+                batch.append_log(f"Cleared {released} unregistered DOI(s) from their articles.")
+
+    batch.save(update_fields=['status', 'checked_at', 'log'])
+
+
+def _apply_diagnostics(batch, overall, diagnostics):
+    items = list(batch.items.only('pk', 'proposed_doi', 'status', 'note'))
+    for item in items:
+        status, note = diagnostics.get(item.proposed_doi, ('', ''))
+        if status in REGISTERED_STATUSES:
+            item.status = DepositItem.REGISTERED
+        elif status in FAILED_STATUSES:
+            item.status = DepositItem.FAILED
+        else:
+            item.status = overall
+        item.note = note or item.note
+    DepositItem.objects.bulk_update(items, ['status', 'note'], batch_size=500)
+
+
+def poll(batch, client=None):
+    """Ask Crossref for a submitted batch's result and record it. Returns (state, message)."""
+    if batch.items.filter(status=DepositItem.PENDING).exists():
+        # The deposit job crashed after sending, before its DOIs were written.
+        batch.append_log(f"DOIs written after the deposit job failed: {write_dois(batch)}")
+    state, message, diagnostics = check_batch(batch, client=client)
+    record_result(batch, state, message, diagnostics)
+    return state, message
+
+
+def requeue_stale(now=None):
+    """Queue again the jobs whose worker stopped without finishing them."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=_setting('CROSSREF_JOB_STALE_AFTER', 900))
+    return CrossrefJob.objects.filter(status=CrossrefJob.RUNNING, started_at__lt=cutoff).update(
+        status=CrossrefJob.QUEUED, message='Requeued: the worker running it stopped.',
+    )
+
+
+def claim_next():
+    """Take the oldest queued job for this worker, or None if there is none."""
+    while True:
+        job = CrossrefJob.objects.filter(status=CrossrefJob.QUEUED).order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+        claimed = CrossrefJob.objects.filter(pk=job.pk, status=CrossrefJob.QUEUED).update(
+            status=CrossrefJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # Another worker got there first; try the next one.
+
+
+def _deposit_crashed(batch):
+    # deposit() moves the batch to SUBMITTED in memory once Crossref has the
+    # upload; the row may still say APPROVED if saving that failed.
+    sent = batch.status == DepositBatch.SUBMITTED
+    batch.refresh_from_db()
+    if batch.status == DepositBatch.APPROVED and not sent:
+        # Nothing was sent; let an editor approve it again.
+        batch.status = DepositBatch.PENDING
+        batch.append_log("Deposit job crashed before sending (see Crossref jobs); back to pending review.")
+        batch.save(update_fields=['status', 'log'])
+        return
+    if batch.status == DepositBatch.APPROVED:
+        batch.status = DepositBatch.SUBMITTED
+        batch.submitted_at = timezone.now()
+    if batch.status == DepositBatch.SUBMITTED:
+        batch.append_log(
+            "Deposit job crashed after sending (see Crossref jobs). Any DOIs not written yet are "
+            "written by the next result check; do not send the batch again."
+        )
+        batch.save(update_fields=['status', 'submitted_at', 'log'])
+
+
+def stranded(batch):
+    """Whether an approved batch has no deposit job left that will send it."""
+    return batch.status == DepositBatch.APPROVED and active_job(batch, CrossrefJob.DEPOSIT) is None
+
+
+def run(job, client=None):
+    """Carry out a claimed job and record how it went on the job."""
+    batch = job.batch
+    try:
+        if job.kind == CrossrefJob.DEPOSIT and batch.status != DepositBatch.APPROVED:
+            ok, message = False, f"Not sent: the batch is {batch.get_status_display().lower()}, not approved."
+        elif job.kind == CrossrefJob.DEPOSIT:
+            ok, message = deposit(batch, client)
+        elif batch.status != DepositBatch.SUBMITTED:
+            ok, message = True, f"Nothing to check: the batch is {batch.get_status_display().lower()}."
+        else:
+            state, message = poll(batch, client)
+            ok = state != 'unknown'
+            message = f"{state}: {message}"
+    except Exception:
+        ok, message = False, traceback.format_exc()
+        if job.kind == CrossrefJob.DEPOSIT:
+            _deposit_crashed(batch)
+    job.status = CrossrefJob.DONE if ok else CrossrefJob.FAILED
+    job.message = message
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'message', 'finished_at'])
+    return job
@@ -0,0 +1,72 @@
+"""
+Compare peak memory of building deposit XML in one string against streaming it.
+
+Articles are generated in memory and never saved, so this touches neither the
+database nor Crossref.
+"""
+
+import time
+import tracemalloc
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from crossref.deposit_xml import split_deposit, write_deposit_xml
+from crossref.services import build_deposit_xml
+from issue.models import Issue, JournalIssue
+
+SITE_CONFIG = {'site_title': 'Benchmark Journal', 'issn_print': '1234-5678', 'contact_email': 'bench@example.org'}
+
+
+class _Sink:
+    """A text stream that only counts what is written to it."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+
+def _entries(count, per_issue=50):
+    issue = None
+    for n in range(count):
+        if n % per_issue == 0:
+            issue = Issue(pk=n // per_issue + 1, title=f'Issue {n // per_issue + 1}', volume='1',
+                          issue_number=str(n // per_issue + 1), publication_date=date(2024, 1, 1))
+        article = JournalIssue(
+            pk=n + 1, issue=issue, title_uz=f'Qiyosiy adabiyotshunoslik masalalari {n}',
+            authors=f'Axmedova Aziza Komilovna, Karimov Bobur {n % 100}', publication_date=date(2024, 1, 2),
+        )
+        yield article, f'10.5555/bench.{n}', f'https://example.org/uz/issue/article/{n + 1}/'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark deposit XML memory use: render_to_string vs. streaming writer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 5000, 20000],
+            help='Article counts to benchmark at (default: 1000 5000 20000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'articles':>9} {'string peak MB':>15} {'stream peak MB':>15} "
+                          f"{'string s':>9} {'stream s':>9} {'parts':>6}")
+        for size in options['sizes']:
+            string_peak, string_s = self._measure(
+                lambda: build_deposit_xml(list(_entries(size)), site_config=SITE_CONFIG))
+            stream_peak, stream_s = self._measure(
+                lambda: write_deposit_xml(_Sink(), _entries(size), site_config=SITE_CONFIG))
+            parts = sum(1 for _ in split_deposit(_entries(size), site_config=SITE_CONFIG))
+            self.stdout.write(f"{size:>9} {string_peak:>15.1f} {stream_peak:>15.1f} "
+                              f"{string_s:>9.2f} {stream_s:>9.2f} {parts:>6}")
+
+    def _measure(self, work):
+        tracemalloc.start()
+        started = time.perf_counter()
+        work()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak / (1024 * 1024), elapsed
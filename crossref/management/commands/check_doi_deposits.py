@@ -4,14 +4,22 @@ Cron entry point: poll Crossref for the result of already-submitted batches.
 Crossref processes deposits asynchronously, so a successful submission only
 means "received". This command moves batches from `submitted` to `registered`
 or `failed` once Crossref publishes a result.
+
+Batches are polled concurrently through one pooled CrossrefClient; the database is only
+touched from the main thread, as each result comes in.
 """
 
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 
 from crossref.console import force_utf8
-from crossref.models import DepositBatch, DepositItem
-from crossref.services import check_batch
+from crossref.jobs import record_result
+from crossref.models import DepositBatch
+from crossref.services import CrossrefClient, check_batch
 
 
 class Command(BaseCommand):
@@ -20,6 +28,11 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--batch', type=str, default=None,
                             help="Only check this batch_id.")
+        parser.add_argument('--workers', type=int,
+                            default=getattr(settings, 'CROSSREF_POLL_WORKERS', 8),
+                            help="Batches polled at once (default: CROSSREF_POLL_WORKERS).")
+        parser.add_argument('--timeout', type=float, default=60,
+                            help="Seconds allowed per batch, both lookups included (default: 60).")
 
     def handle(self, *args, **options):
         force_utf8(self.stdout, self.stderr)
@@ -31,43 +44,40 @@ class Command(BaseCommand):
             self.stdout.write("No submitted batches are waiting for a result.")
             return
 
-        for batch in batches:
-            state, message = check_batch(batch)
-            batch.checked_at = timezone.now()
-            batch.append_log(f"Result check: {state} — {message}")
-
-            if state == 'registered':
-                batch.status = DepositBatch.REGISTERED
-                batch.items.update(status=DepositItem.REGISTERED)
-                style = self.style.SUCCESS
-            elif state == 'failed':
-                batch.status = DepositBatch.FAILED
-                batch.items.update(status=DepositItem.FAILED)
-                released = self._release_dois(batch)
-                if released:
-                    batch.append_log(f"Cleared {released} unregistered DOI(s) from their articles.")
-                style = self.style.ERROR
-            else:
-                style = self.style.NOTICE
-
-            batch.save(update_fields=['status', 'checked_at', 'log'])
-            self.stdout.write(style(f"{batch.batch_id}: {state} - {message[:200]}"))
+        batches = list(batches)
+        workers = max(1, min(options['workers'], len(batches)))
+        started = time.monotonic()
+        summary = Counter()
+        client = CrossrefClient(pool_size=workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(check_batch, batch, options['timeout'], client): batch
+                    for batch in batches
+                }
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        state, message, diagnostics = future.result()
+                    except Exception as exc:
+                        state, message, diagnostics = 'unknown', f"Check crashed: {exc}", {}
+                    self._record(batch, state, message, diagnostics)
+                    summary[state] += 1
+        finally:
+            client.close()
 
-    def _release_dois(self, batch):
-        """
-        Take back the DOIs of a rejected batch.
+        elapsed = time.monotonic() - started
+        counts = ', '.join(f"{summary[state]} {state}" for state in
+                           ('registered', 'failed', 'pending', 'unknown') if summary[state])
+        self.stdout.write(f"Checked {len(batches)} batch(es) in {elapsed:.1f}s with {workers} worker(s): {counts}.")
+        for endpoint, stats in client.report().items():
+            self.stdout.write(f"  {endpoint}: {stats}")
 
-        The DOI is written to the article at approval time, but Crossref only
-        registers it later. When registration fails, that DOI resolves nowhere
-        and — worse — makes the article look done, so the next cron run skips
-        it forever. Clear it so the article returns to the queue.
-        """
-        released = 0
-        for item in batch.items.select_related('article'):
-            # Only take back the DOI this batch proposed: an editor may have
-            # set a different one by hand in the meantime.
-            if item.article.doi == item.proposed_doi:
-                item.article.doi = None
-                item.article.save(update_fields=['doi'])
-                released += 1
-        return released
+    def _record(self, batch, state, message, diagnostics=None):
+        record_result(batch, state, message, diagnostics)
+        style = {
+            'registered': self.style.SUCCESS, 'failed': self.style.ERROR,
+        }.get(state, self.style.NOTICE)
+        if batch.status == DepositBatch.PARTIAL:
+            style = self.style.WARNING
+        self.stdout.write(style(f"{batch.batch_id}: {state} - {message[:200]}"))
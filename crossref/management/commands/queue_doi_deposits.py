@@ -4,6 +4,10 @@ Cron entry point: queue a DOI deposit batch for review.
 This command NEVER contacts Crossref. It finds articles that still have no DOI,
 mints one for each, renders the deposit XML and parks it in the admin under
 Crossref DOI → DOI deposit batches. A human approves it there.
+
+Large runs are split into several batches — at most --max-bytes of XML and
+--max-articles articles each, or one per issue with --per-issue — so one bad
+record only holds back its own batch. Each batch is approved on its own.
 """
 
 from django.core.management.base import BaseCommand, CommandError
@@ -11,11 +15,11 @@ from django.db import transaction
 from django.db.models import Q
 
 from crossref.console import force_utf8
+from crossref.deposit_xml import FragmentStore, iter_groups, max_deposit_bytes, split_deposit
 from crossref.models import DepositBatch, DepositItem
 from crossref.services import (
-    CrossrefError, article_title, author_problems, build_deposit_xml, build_doi,
-    build_resource_url, get_doi_prefix, get_environment, get_site_base_url,
-    get_site_config, make_batch_id,
+    CrossrefError, article_fingerprint, article_problem, article_title, build_resource_url,
+    get_doi_prefix, get_environment, get_site_base_url, get_site_config, release_dois, reserve_doi,
 )
 from issue.models import JournalIssue
 
@@ -30,6 +34,12 @@ class Command(BaseCommand):
                             help="Only articles belonging to this Issue id.")
         parser.add_argument('--dry-run', action='store_true',
                             help="Print what would be queued without creating a batch.")
+        parser.add_argument('--max-articles', type=int, default=0,
+                            help="At most N articles per batch (0 = no limit).")
+        parser.add_argument('--max-bytes', type=int, default=0,
+                            help="At most N bytes of XML per batch (default: CROSSREF_MAX_DEPOSIT_BYTES).")
+        parser.add_argument('--per-issue', action='store_true',
+                            help="One batch (or more, if over the limits) per issue.")
 
     def handle(self, *args, **options):
         force_utf8(self.stdout, self.stderr)
@@ -48,7 +58,7 @@ class Command(BaseCommand):
         # Articles already sitting in a batch that is pending or in flight must
         # not be queued a second time.
         in_flight = DepositItem.objects.filter(
-            batch__status__in=[DepositBatch.PENDING, DepositBatch.SUBMITTED],
+            batch__status__in=[DepositBatch.PENDING, DepositBatch.APPROVED, DepositBatch.SUBMITTED],
             status__in=[DepositItem.PENDING, DepositItem.DEPOSITED],
         ).values_list('article_id', flat=True)
 
@@ -71,32 +81,14 @@ class Command(BaseCommand):
             self.stdout.write("No articles are waiting for a DOI. Nothing queued.")
             return
 
-        taken = set(
-            JournalIssue.objects.exclude(doi__isnull=True).exclude(doi__exact='')
-            .values_list('doi', flat=True)
-        )
-        taken |= set(
-            DepositItem.objects
-            .exclude(batch__status__in=[DepositBatch.FAILED, DepositBatch.CANCELLED])
-            .values_list('proposed_doi', flat=True)
-        )
-
         entries, skipped = [], []
         for article in articles:
-            if not article.publication_date:
-                skipped.append((article, "no publication date"))
-                continue
-            # Crossref rejects an empty <title>, and a DOI is permanent — better
-            # to leave the article un-deposited than to register it untitled.
-            if not article_title(article):
-                skipped.append((article, "no title in any language"))
-                continue
-            problems = author_problems(article.authors)
-            if problems:
-                skipped.append((article, '; '.join(problems)))
+            problem = article_problem(article)
+            if problem:
+                skipped.append((article, problem))
                 continue
-            doi = build_doi(article, prefix, taken)
-            taken.add(doi)
+            # Dry runs only look; a real run reserves each DOI as it is minted.
+            doi = reserve_doi(article, prefix, commit=not options['dry_run'])
             entries.append((article, doi, build_resource_url(article, base_url)))
 
         for article, reason in skipped:
@@ -108,36 +100,82 @@ class Command(BaseCommand):
             return
 
         environment = get_environment()
-        batch_id = make_batch_id()
-        xml = build_deposit_xml(entries, batch_id=batch_id, site_config=site_config)
-
+        # Fragments are stored with the batches, so a batch that goes stale
+        # before approval can be re-rendered article by article.
+        store = FragmentStore(entries)
+        parts = self._split(entries, site_config, options, store)
         if options['dry_run']:
-            self.stdout.write(self.style.NOTICE(f"[dry-run] would queue batch {batch_id} ({environment}):"))
-            for article, doi, url in entries:
-                self.stdout.write(f"  {doi}  ->  {url}   {article.title[:60]}")
+            for number, part in enumerate(parts, 1):
+                self.stdout.write(self.style.NOTICE(
+                    f"[dry-run] would queue batch {number} {part.batch_id} ({environment}, "
+                    f"{len(part.entries)} article(s), {part.size} bytes):"
+                ))
+                for article, doi, url in part.entries:
+                    self.stdout.write(f"  {doi}  ->  {url}   {article.title[:60]}")
             return
 
-        with transaction.atomic():
-            batch = DepositBatch.objects.create(
-                batch_id=batch_id, environment=environment, xml=xml,
-                status=DepositBatch.PENDING,
-            )
-            batch.append_log(
-                f"Queued by queue_doi_deposits with {len(entries)} article(s) for {environment}. "
-                "Awaiting approval in the admin."
-            )
-            if skipped:
-                batch.append_log(f"{len(skipped)} article(s) skipped: " +
-                                 "; ".join(f"#{a.pk} ({r})" for a, r in skipped))
-            batch.save(update_fields=['log'])
-            DepositItem.objects.bulk_create([
-                DepositItem(batch=batch, article=article, proposed_doi=doi, resource_url=url)
-                for article, doi, url in entries
-            ])
+        try:
+            queued = self._create_batches(parts, environment, skipped, store)
+        except Exception:
+            # Nothing was queued, so nothing may keep these DOIs.
+            release_dois(doi for _, doi, _ in entries)
+            raise
 
         # Keep console output pure ASCII: cron on Windows writes through a cp1252
         # console that raises UnicodeEncodeError on arrows and dashes.
-        self.stdout.write(self.style.SUCCESS(
-            f"Queued batch {batch_id} with {len(entries)} article(s) for {environment}. "
-            "Open the admin (Crossref DOI -> DOI deposit batches) to review and approve."
-        ))
+        for batch_id, count in queued:
+            self.stdout.write(self.style.SUCCESS(
+                f"Queued batch {batch_id} with {count} article(s) for {environment}."
+            ))
+        self.stdout.write(
+            f"{len(queued)} batch(es), {len(entries)} article(s) in total. Open the admin "
+            "(Crossref DOI -> DOI deposit batches) to review and approve each batch."
+        )
+
+    def _create_batches(self, parts, environment, skipped, store):
+        """
+        Save each part as a pending batch as soon as it is produced, so only
+        one part is held at a time. Returns [(batch id, article count)].
+        """
+        queued = []
+        with transaction.atomic():
+            for number, part in enumerate(parts, 1):
+                batch = DepositBatch.objects.create(
+                    batch_id=part.batch_id, environment=environment, xml=part.xml,
+                    status=DepositBatch.PENDING,
+                )
+                batch.append_log(
+                    f"Queued by queue_doi_deposits with {len(part.entries)} article(s) for {environment}"
+                    f" (batch {number} from this run). Awaiting approval in the admin."
+                )
+                if skipped:
+                    batch.append_log(f"{len(skipped)} article(s) skipped: " +
+                                     "; ".join(f"#{a.pk} ({r})" for a, r in skipped))
+                batch.save(update_fields=['log'])
+                DepositItem.objects.bulk_create([
+                    DepositItem(
+                        batch=batch, article=article, proposed_doi=doi, resource_url=url,
+                        fingerprint=article_fingerprint(article, url),
+                    )
+                    for article, doi, url in part.entries
+                ])
+                queued.append((part.batch_id, len(part.entries)))
+            # Only now has every part been rendered.
+            store.save()
+        return queued
+
+    def _split(self, entries, site_config, options, store):
+        """
+        Partition the entries (per issue, or all together), then cut every
+        partition to the size limits, yielding each part as split_deposit
+        produces it. Rendering is CPU-bound, so partitions are rendered one
+        after another: threads would only contend for the GIL.
+        """
+        if options['per_issue']:
+            partitions = [run for _, run in iter_groups(entries)]
+        else:
+            partitions = [entries]
+        max_bytes = options['max_bytes'] or max_deposit_bytes()
+
+        for partition in partitions:
+            yield from split_deposit(partition, max_bytes, options['max_articles'] or None, site_config, store)
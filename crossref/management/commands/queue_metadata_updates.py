@@ -0,0 +1,157 @@
+"""
+Cron entry point: queue metadata-update batches for articles whose title,
+authors, publication date or landing page changed since Crossref registered
+them.
+
+An article with a DOI never re-enters queue_doi_deposits, so corrections made
+afterwards would otherwise never reach Crossref. Each registered deposit
+records a fingerprint of the metadata it carried (ArticleFingerprint); this
+command compares it with the article's current fingerprint, which is a hash
+and not a render, and only renders the articles that differ.
+
+Like queue_doi_deposits it never contacts Crossref: the update batches wait in
+the admin for approval. DOIs registered before fingerprints were recorded have
+nothing to compare against; --baseline records their current metadata as
+deposited.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from crossref.console import force_utf8
+from crossref.deposit_xml import FragmentStore, split_deposit
+from crossref.models import ArticleFingerprint, DepositBatch, DepositItem
+from crossref.services import (
+    CrossrefError, article_fingerprint, article_problem, article_title, build_resource_url,
+    get_environment, get_site_base_url, get_site_config,
+)
+from issue.models import JournalIssue
+
+
+class Command(BaseCommand):
+    help = "Queue Crossref metadata updates for registered articles that changed since their deposit."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=0,
+                            help="Queue at most N changed articles (0 = no limit).")
+        parser.add_argument('--issue', type=int, default=None,
+                            help="Only articles belonging to this Issue id.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Print what would be queued without creating a batch.")
+        parser.add_argument('--baseline', action='store_true',
+                            help="Record the current metadata of articles with no fingerprint as deposited.")
+        parser.add_argument('--max-articles', type=int, default=0,
+                            help="At most N articles per batch (0 = no limit).")
+        parser.add_argument('--max-bytes', type=int, default=0,
+                            help="At most N bytes of XML per batch (default: CROSSREF_MAX_DEPOSIT_BYTES).")
+
+    def handle(self, *args, **options):
+        force_utf8(self.stdout, self.stderr)
+        try:
+            self._queue(**options)
+        except CrossrefError as exc:
+            raise CommandError(str(exc))
+
+    def _queue(self, **options):
+        site_config = get_site_config()
+        base_url = get_site_base_url()
+
+        in_flight = DepositItem.objects.filter(
+            batch__status__in=[DepositBatch.PENDING, DepositBatch.APPROVED, DepositBatch.SUBMITTED],
+            status__in=[DepositItem.PENDING, DepositItem.DEPOSITED],
+        ).values_list('article_id', flat=True)
+        articles = (
+            JournalIssue.objects
+            .exclude(Q(doi__isnull=True) | Q(doi__exact=''))
+            .exclude(pk__in=in_flight)
+            .select_related('issue', 'crossref_fingerprint')
+            .order_by('issue_id', 'pk')
+        )
+        if options['issue']:
+            articles = articles.filter(issue_id=options['issue'])
+
+        changed, unknown, skipped = [], [], []
+        fingerprints = {}
+        for article in articles.iterator(chunk_size=1000):
+            url = build_resource_url(article, base_url)
+            current = article_fingerprint(article, url)
+            try:
+                deposited = article.crossref_fingerprint.fingerprint
+            except ArticleFingerprint.DoesNotExist:
+                unknown.append(ArticleFingerprint(article=article, fingerprint=current))
+                continue
+            if deposited == current:
+                continue
+            problem = article_problem(article)
+            if problem:
+                skipped.append((article, problem))
+                continue
+            fingerprints[article.pk] = current
+            changed.append((article, article.doi, url))
+
+        if unknown:
+            if options['baseline'] and not options['dry_run']:
+                ArticleFingerprint.objects.bulk_create(unknown, batch_size=500, ignore_conflicts=True)
+                self.stdout.write(f"Recorded the current metadata of {len(unknown)} article(s) as deposited.")
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"{len(unknown)} article(s) have a DOI but no deposited fingerprint; "
+                    "run with --baseline to record their current metadata as deposited."
+                ))
+        for article, reason in skipped:
+            label = article_title(article) or '(untitled)'
+            self.stdout.write(self.style.WARNING(f"  skipped #{article.pk} {label[:60]} - {reason}"))
+
+        if options['limit']:
+            changed = changed[:options['limit']]
+        if not changed:
+            self.stdout.write("No registered article changed since its deposit. Nothing queued.")
+            return
+
+        environment = get_environment()
+        store = FragmentStore(changed)
+        parts = list(split_deposit(
+            changed, options['max_bytes'] or None, options['max_articles'] or None, site_config, store,
+        ))
+
+        if options['dry_run']:
+            for number, part in enumerate(parts, 1):
+                self.stdout.write(self.style.NOTICE(
+                    f"[dry-run] would queue update batch {number}/{len(parts)} {part.batch_id} "
+                    f"({environment}, {len(part.entries)} article(s), {part.size} bytes):"
+                ))
+                for article, doi, url in part.entries:
+                    self.stdout.write(f"  {doi}  ->  {url}   {article.title[:60]}")
+            return
+
+        with transaction.atomic():
+            store.save()
+            for number, part in enumerate(parts, 1):
+                batch = DepositBatch.objects.create(
+                    batch_id=part.batch_id, environment=environment, xml=part.xml,
+                    status=DepositBatch.PENDING, kind=DepositBatch.UPDATE,
+                )
+                batch.append_log(
+                    f"Queued by queue_metadata_updates with {len(part.entries)} changed article(s) "
+                    f"for {environment}"
+                    + (f" (batch {number} of {len(parts)} from this run)" if len(parts) > 1 else '')
+                    + ". Awaiting approval in the admin."
+                )
+                batch.save(update_fields=['log'])
+                DepositItem.objects.bulk_create([
+                    DepositItem(
+                        batch=batch, article=article, proposed_doi=doi, resource_url=url,
+                        fingerprint=fingerprints[article.pk],
+                    )
+                    for article, doi, url in part.entries
+                ])
+
+        for part in parts:
+            self.stdout.write(self.style.SUCCESS(
+                f"Queued update batch {part.batch_id} with {len(part.entries)} article(s) for {environment}."
+            ))
+        self.stdout.write(
+            f"{len(parts)} batch(es), {len(changed)} changed article(s) in total. Open the admin "
+            "(Crossref DOI -> DOI deposit batches) to review and approve each batch."
+        )
@@ -0,0 +1,63 @@
+"""
+Worker: carry out the Crossref deposits and result checks queued from the admin.
+
+Run it under a process supervisor next to the web server:
+
+    python manage.py run_crossref_jobs
+
+or from cron with --once, which works through the queue and exits. Several
+workers may run at once; each job is claimed by exactly one of them.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from crossref import jobs
+from crossref.console import force_utf8
+from crossref.models import CrossrefJob
+from crossref.services import CrossrefClient
+
+
+class Command(BaseCommand):
+    help = "Run the Crossref deposits and result checks queued from the admin."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Exit when the queue is empty instead of waiting for new jobs.")
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help="Exit after N jobs (0 = no limit).")
+        parser.add_argument('--interval', type=float,
+                            default=getattr(settings, 'CROSSREF_JOB_POLL_INTERVAL', 5),
+                            help="Seconds between looks at an empty queue (default: CROSSREF_JOB_POLL_INTERVAL).")
+
+    def handle(self, *args, **options):
+        force_utf8(self.stdout, self.stderr)
+        client = CrossrefClient(pool_size=1)
+        done = 0
+        try:
+            while not options['max_jobs'] or done < options['max_jobs']:
+                # A long-lived process gets no request cycle to drop a broken
+                # or expired connection (CONN_MAX_AGE); do it between jobs.
+                close_old_connections()
+                requeued = jobs.requeue_stale()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f"Requeued {requeued} job(s) left running by a stopped worker."))
+                job = jobs.claim_next()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                job = jobs.run(job, client)
+                done += 1
+                style = self.style.SUCCESS if job.status == CrossrefJob.DONE else self.style.ERROR
+                summary = job.message.strip().splitlines()[-1] if job.message.strip() else ''
+                self.stdout.write(style(f"{job.get_kind_display()} {job.batch.batch_id}: {job.status} - {summary[:200]}"))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            client.close()
+        self.stdout.write(f"Ran {done} job(s).")
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def reserve_existing_dois(apps, schema_editor):
+    """Reserve every DOI already on an article or proposed by a live batch."""
+    JournalIssue = apps.get_model('issue', 'JournalIssue')
+    DepositItem = apps.get_model('crossref', 'DepositItem')
+    DoiReservation = apps.get_model('crossref', 'DoiReservation')
+
+    reserved = {}
+    for item in (
+        DepositItem.objects.exclude(batch__status__in=['failed', 'cancelled'])
+        .order_by('pk').values('proposed_doi', 'article_id')
+    ):
+        reserved.setdefault(item['proposed_doi'], item['article_id'])
+    for article in JournalIssue.objects.exclude(doi__isnull=True).exclude(doi__exact='').values('doi', 'pk'):
+        reserved[article['doi']] = article['pk']
+    DoiReservation.objects.bulk_create(
+        [DoiReservation(doi=doi, article_id=article_id) for doi, article_id in reserved.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issue', '0008_journalissue_citation_velocity'),
+        ('crossref', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoiReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doi', models.CharField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('article', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='doi_reservations', to='issue.journalissue')),
+            ],
+            options={
+                'verbose_name': 'DOI reservation',
+                'verbose_name_plural': 'DOI reservations',
+                'db_table': 'crossref_doi_reservation',
+            },
+        ),
+        migrations.RunPython(reserve_existing_dois, migrations.RunPython.noop),
+    ]
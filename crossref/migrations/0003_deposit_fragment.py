@@ -0,0 +1,30 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issue', '0008_journalissue_citation_velocity'),
+        ('crossref', '0002_doi_reservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepositFragment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('xml', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deposit_fragments', to='issue.journalissue')),
+            ],
+            options={
+                'verbose_name': 'deposit XML fragment',
+                'verbose_name_plural': 'deposit XML fragments',
+                'db_table': 'crossref_deposit_fragment',
+            },
+        ),
+    ]
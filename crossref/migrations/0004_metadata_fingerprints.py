@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issue', '0008_journalissue_citation_velocity'),
+        ('crossref', '0003_deposit_fragment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleFingerprint',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='crossref_fingerprint', serialize=False, to='issue.journalissue')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('deposited_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'deposited metadata fingerprint',
+                'verbose_name_plural': 'deposited metadata fingerprints',
+                'db_table': 'crossref_article_fingerprint',
+            },
+        ),
+        migrations.AddField(
+            model_name='depositbatch',
+            name='kind',
+            field=models.CharField(choices=[('new', 'New DOIs'), ('update', 'Metadata update')], default='new', help_text='A metadata update re-deposits DOIs that are already registered.', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='deposititem',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', help_text='article_fingerprint() of the metadata in this deposit.', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crossref', '0005_crossref_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='depositbatch',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending review'), ('approved', 'Approved, waiting to be sent'), ('submitted', 'Submitted to Crossref'), ('registered', 'Registered'), ('partial', 'Partly registered'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='pending', max_length=20),
+        ),
+    ]
@@ -12,18 +12,29 @@ class DepositBatch(models.Model):
     """
 
     PENDING = 'pending'
+    APPROVED = 'approved'
     SUBMITTED = 'submitted'
     REGISTERED = 'registered'
+    PARTIAL = 'partial'
     FAILED = 'failed'
     CANCELLED = 'cancelled'
     STATUS_CHOICES = [
         (PENDING, 'Pending review'),
+        (APPROVED, 'Approved, waiting to be sent'),
         (SUBMITTED, 'Submitted to Crossref'),
         (REGISTERED, 'Registered'),
+        (PARTIAL, 'Partly registered'),
         (FAILED, 'Failed'),
         (CANCELLED, 'Cancelled'),
     ]
 
+    NEW = 'new'
+    UPDATE = 'update'
+    KIND_CHOICES = [
+        (NEW, 'New DOIs'),
+        (UPDATE, 'Metadata update'),
+    ]
+
     batch_id = models.CharField(
         max_length=100, unique=True,
         help_text="doi_batch_id sent to Crossref; also the key used to poll for results."
@@ -34,6 +45,10 @@ class DepositBatch(models.Model):
         default='sandbox',
     )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    kind = models.CharField(
+        max_length=20, choices=KIND_CHOICES, default=NEW,
+        help_text="A metadata update re-deposits DOIs that are already registered.",
+    )
     xml = models.TextField(help_text="Exact deposit XML that will be sent to Crossref.")
     log = models.TextField(blank=True, default='')
 
@@ -57,7 +72,14 @@ class DepositBatch(models.Model):
 
     @property
     def item_count(self):
-        return self.items.count()
+        # The admin annotates item_total on its querysets; no need to count again.
+        total = getattr(self, 'item_total', None)
+        return self.items.count() if total is None else total
+
+    @property
+    def mints_dois(self):
+        """Whether this batch registers new DOIs (rather than updating registered ones)."""
+        return self.kind == self.NEW
 
     @property
     def is_editable(self):
@@ -97,6 +119,10 @@ class DepositItem(models.Model):
     )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     note = models.TextField(blank=True, default='')
+    fingerprint = models.CharField(
+        max_length=64, blank=True, default='',
+        help_text="article_fingerprint() of the metadata in this deposit.",
+    )
 
     class Meta:
         verbose_name = 'DOI deposit item'
@@ -109,3 +135,128 @@ class DepositItem(models.Model):
 
     def __str__(self):
         return f"{self.proposed_doi} — {self.article_id}"
+
+
+class DoiReservation(models.Model):
+    """
+    A DOI that has been handed out and must not be minted again.
+
+    The unique index on `doi` is what makes allocation safe: two runs racing
+    for the same DOI cannot both insert it. A reservation is only released
+    when the batch that proposed the DOI is cancelled or rejected; deleting
+    the article keeps it, since a registered DOI can never be reused.
+    """
+
+    doi = models.CharField(max_length=100, unique=True)
+    article = models.ForeignKey(
+        'issue.JournalIssue', on_delete=models.SET_NULL, blank=True, null=True,
+        related_name='doi_reservations',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'DOI reservation'
+        verbose_name_plural = 'DOI reservations'
+        db_table = 'crossref_doi_reservation'
+
+    def __str__(self):
+        return self.doi
+
+
+class DepositFragment(models.Model):
+    """
+    The rendered <journal_article> XML of one article, keyed by a hash of
+    everything it was rendered from (see crossref.deposit_xml.FragmentStore).
+
+    Kept in the database rather than the cache: batches are queued by cron
+    and re-rendered from the admin, two processes that share no local cache.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    article = models.ForeignKey(
+        'issue.JournalIssue', on_delete=models.CASCADE, related_name='deposit_fragments',
+    )
+    xml = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'deposit XML fragment'
+        verbose_name_plural = 'deposit XML fragments'
+        db_table = 'crossref_deposit_fragment'
+
+    def __str__(self):
+        return f"{self.article_id} ({self.key[:12]})"
+
+
+class ArticleFingerprint(models.Model):
+    """
+    Fingerprint of the metadata Crossref last registered for an article.
+
+    Written when a batch is registered. `queue_metadata_updates` compares it
+    with the article's current fingerprint to find corrections that have not
+    reached Crossref yet, without rendering anything.
+    """
+
+    article = models.OneToOneField(
+        'issue.JournalIssue', on_delete=models.CASCADE, primary_key=True,
+        related_name='crossref_fingerprint',
+    )
+    fingerprint = models.CharField(max_length=64)
+    deposited_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'deposited metadata fingerprint'
+        verbose_name_plural = 'deposited metadata fingerprints'
+        db_table = 'crossref_article_fingerprint'
+
+    def __str__(self):
+        return f"{self.article_id} ({self.fingerprint[:12]})"
+
+
+class CrossrefJob(models.Model):
+    """
+    A Crossref call the admin asked for, carried out by the run_crossref_jobs
+    worker so that no web request waits on Crossref.
+    """
+
+    DEPOSIT = 'deposit'
+    POLL = 'poll'
+    KIND_CHOICES = [
+        (DEPOSIT, 'Deposit'),
+        (POLL, 'Result check'),
+    ]
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    batch = models.ForeignKey(DepositBatch, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True,
+        related_name='crossref_jobs',
+    )
+    message = models.TextField(blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Crossref job'
+        verbose_name_plural = 'Crossref jobs'
+        ordering = ['-created_at']
+        db_table = 'crossref_job'
+        indexes = [models.Index(fields=['status', 'created_at'], name='crossref_job_status_idx')]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.batch_id} ({self.get_status_display()})"
@@ -2,17 +2,28 @@
 Crossref deposit helpers.
 
 Nothing in here talks to Crossref on its own — `submit_batch` is only ever
-called from the admin approval action, never from the cron command.
+called for a batch approved in the admin (by the run_crossref_jobs worker),
+never from the cron commands.
 """
 
+import hashlib
+import itertools
+import json
+import random
 import re
+import threading
+import time
 import uuid
 import xml.etree.ElementTree as ET
+from functools import lru_cache
 from urllib.parse import urlparse
 
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Subquery
 from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.safestring import mark_safe
 
 from core.site_config import ISSN_RE, clean_value, load_site_config
 
@@ -44,7 +55,168 @@ def get_environment():
 
 
 def get_base_url(environment=None):
-    return BASE_URLS[environment or get_environment()]
+    # CROSSREF_BASE_URL points every environment elsewhere, e.g. at a local
+    # stub server in development.
+    override = getattr(settings, 'CROSSREF_BASE_URL', '') or ''
+    return override.rstrip('/') or BASE_URLS[environment or get_environment()]
+
+
+class EndpointStats:
+    """Call counts and latency for one Crossref endpoint."""
+
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @property
+    def mean_seconds(self):
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.calls} call(s), {self.retries} retried, {self.errors} failed, "
+            f"mean {self.mean_seconds * 1000:.0f} ms, max {self.max_seconds * 1000:.0f} ms"
+        )
+
+
+class CrossrefClient:
+    """
+    HTTP access to Crossref over one keep-alive session.
+
+    Result polls are retried with exponential backoff on timeouts, connection
+    errors and 5xx. Deposits are not idempotent from our side: a second copy
+    of an upload that had in fact arrived carries the same doi_batch_id and
+    timestamp, Crossref rejects it as not newer, and a later poll by batch
+    id can then report the batch as failed. So a deposit is only retried
+    when the request provably never left this machine (no connection could
+    be made). Any response, 502/503/504 from the gateway included, means the
+    upload may have been forwarded, and is returned as it is.
+
+    Thread-safe; `metrics` holds an EndpointStats per endpoint ('deposit',
+    'result').
+    """
+
+    def __init__(self, pool_size=10, retries=None, backoff=None, sleep=time.sleep):
+        self.pool_size = pool_size
+        self.retries = getattr(settings, 'CROSSREF_RETRIES', 3) if retries is None else retries
+        self.backoff = getattr(settings, 'CROSSREF_BACKOFF', 1.0) if backoff is None else backoff
+        self._sleep = sleep
+        self._session = None
+        self._lock = threading.Lock()
+        self.metrics = {}
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _stats(self, endpoint):
+        with self._lock:
+            return self.metrics.setdefault(endpoint, EndpointStats())
+
+    def request(self, endpoint, method, url, idempotent=True, timeout=60, deadline=None, **kwargs):
+        """
+        Send one request, retrying as described above. Raises the last
+        network error, or returns the last response (whatever its status).
+        """
+        import requests
+
+        stats = self._stats(endpoint)
+        for attempt in range(self.retries + 1):
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    raise requests.Timeout(f"Gave up on {url}: time allowed for this call ran out")
+            started = time.monotonic()
+            error = response = None
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as exc:
+                error = exc
+            elapsed = time.monotonic() - started
+            with self._lock:
+                stats.calls += 1
+                stats.total_seconds += elapsed
+                stats.max_seconds = max(stats.max_seconds, elapsed)
+
+            if error is not None:
+                retriable = isinstance(error, (requests.ConnectionError, requests.Timeout))
+                if not idempotent:
+                    retriable = _never_sent(error)
+            else:
+                retriable = idempotent and response.status_code >= 500
+            if not retriable or attempt == self.retries:
+                if error is not None or response.status_code >= 500:
+                    with self._lock:
+                        stats.errors += 1
+                if error is not None:
+                    raise error
+                return response
+
+            with self._lock:
+                stats.retries += 1
+            self._sleep(self.backoff * 2 ** attempt * (1 + random.random() / 4))
+
+    def deposit(self, batch, user, password, timeout=60):
+        url = f"{get_base_url(batch.environment)}{DEPOSIT_PATH}"
+        return self.request(
+            'deposit', 'POST', url, idempotent=False, timeout=timeout,
+            data={'operation': 'doMDUpload', 'login_id': user, 'login_passwd': password},
+            files={'fname': (f"{batch.batch_id}.xml", batch.xml.encode('utf-8'), 'application/xml')},
+        )
+
+    def result(self, batch, user, password, lookup, deadline, stream=False):
+        url = f"{get_base_url(batch.environment)}{RESULT_PATH}"
+        return self.request(
+            'result', 'GET', url, deadline=deadline, stream=stream,
+            params={'usr': user, 'pwd': password, 'type': 'result', **lookup},
+        )
+
+    def report(self):
+        with self._lock:
+            return {endpoint: str(stats) for endpoint, stats in self.metrics.items()}
+
+
+def _never_sent(error):
+    """Whether a requests error happened before any byte of the request went out."""
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client, so every call reuses its pooled connections."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = CrossrefClient()
+        return _client
 
 
 def get_credentials():
@@ -149,21 +321,96 @@ def build_resource_url(article, base_url=None):
     return f"{base_url or get_site_base_url()}{article.get_absolute_url()}"
 
 
-def build_doi(article, prefix, taken):
+def doi_candidates(article, prefix):
     """
-    Mint a stable DOI for an article: <prefix>/comp.<year>.<zero-padded id>.
-
-    `taken` is the set of DOIs already in use (existing articles + DOIs proposed
-    earlier in this same run); a collision gets a -2, -3, … suffix.
+    DOIs an article may get, best first: <prefix>/comp.<year>.<zero-padded id>,
+    then the same with a -2, -3, … suffix.
     """
     year = article.publication_date.year if article.publication_date else timezone.now().year
     candidate = f"{prefix}/comp.{year}.{article.pk:04d}"
-    if candidate not in taken:
-        return candidate
+    yield candidate
     n = 2
-    while f"{candidate}-{n}" in taken:
+    while True:
+        yield f"{candidate}-{n}"
         n += 1
-    return f"{candidate}-{n}"
+
+
+def reserve_doi(article, prefix, commit=True):
+    """
+    Mint the first free candidate DOI for `article` and reserve it.
+
+    Each candidate costs a lookup on two unique indexes (reservations and
+    article DOIs), never a scan of every DOI ever issued, so queueing cost
+    grows with the number of new articles only. The reservation insert is what
+    settles a race: if another run got there first, the unique index rejects
+    ours and the next candidate is tried. A reservation this article already
+    holds (left by a run that died before creating its batch) is reused.
+    With commit=False nothing is reserved, for dry runs.
+    """
+    from issue.models import JournalIssue
+
+    from .models import DoiReservation
+
+    for candidate in doi_candidates(article, prefix):
+        holders = list(DoiReservation.objects.filter(doi=candidate).values_list('article_id', flat=True))
+        if holders:
+            if holders[0] == article.pk:
+                return candidate
+            continue
+        if JournalIssue.objects.filter(doi=candidate).exists():
+            continue
+        if not commit:
+            return candidate
+        try:
+            with transaction.atomic():
+                DoiReservation.objects.create(doi=candidate, article=article)
+        except IntegrityError:
+            continue
+        return candidate
+
+
+def release_dois(dois):
+    """Free reservations whose batch was cancelled or rejected before registration."""
+    from .models import DoiReservation
+
+    return DoiReservation.objects.filter(doi__in=list(dois)).delete()[0]
+
+
+def assign_batch_dois(batch):
+    """
+    Write every item's proposed DOI to its article and mark the items
+    deposited. Two UPDATE statements, whatever the size of the batch.
+    Returns the number of items.
+    """
+    from issue.models import JournalIssue
+
+    from .models import DepositItem
+
+    proposed = DepositItem.objects.filter(batch=batch, article=OuterRef('pk')).values('proposed_doi')[:1]
+    # update() skips auto_now; updated_at is what expires the cached pages.
+    JournalIssue.objects.filter(doi_deposits__batch=batch).update(
+        doi=Subquery(proposed), updated_at=timezone.now(),
+    )
+    return batch.items.update(status=DepositItem.DEPOSITED)
+
+
+def clear_batch_dois(batch):
+    """
+    Take the DOIs of a batch's failed items back off their articles and free
+    their reservations. Only a DOI equal to what the batch proposed is
+    cleared: an editor may have set a different one by hand in the meantime.
+    A fixed number of statements, whatever the size of the batch. Returns the
+    number of articles cleared.
+    """
+    from issue.models import JournalIssue
+
+    from .models import DepositItem, DoiReservation
+
+    failed = DepositItem.objects.filter(batch=batch, status=DepositItem.FAILED)
+    written = failed.filter(article=OuterRef('pk'), proposed_doi=OuterRef('doi'))
+    released = JournalIssue.objects.filter(Exists(written)).update(doi=None, updated_at=timezone.now())
+    DoiReservation.objects.filter(doi__in=failed.values('proposed_doi')).delete()
+    return released
 
 
 def article_title(article):
@@ -183,6 +430,37 @@ def article_title(article):
     return clean_value(getattr(article, 'title', '') or '')
 
 
+def article_fingerprint(article, resource_url):
+    """
+    Hash of the metadata a deposit carries for `article`: its title in every
+    language, its authors as split for Crossref, its publication date and
+    landing page. Two equal fingerprints mean nothing Crossref sees changed.
+    """
+    payload = json.dumps({
+        'titles': [clean_value(getattr(article, f'title_{code}', '') or '') for code, _ in settings.LANGUAGES],
+        'authors': split_authors(article.authors),
+        'publication_date': article.publication_date.isoformat() if article.publication_date else None,
+        'resource_url': resource_url,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def record_fingerprints(batch):
+    """Remember what a batch told Crossref about each of its registered articles."""
+    from .models import ArticleFingerprint, DepositItem
+
+    registered = batch.items.filter(status=DepositItem.REGISTERED).exclude(fingerprint='')
+    fingerprints = [
+        ArticleFingerprint(article_id=article_id, fingerprint=fingerprint)
+        for article_id, fingerprint in registered.values_list('article_id', 'fingerprint')
+    ]
+    ArticleFingerprint.objects.bulk_create(
+        fingerprints, batch_size=500,
+        update_conflicts=True, unique_fields=['article'], update_fields=['fingerprint', 'deposited_at'],
+    )
+    return len(fingerprints)
+
+
 # Stripped before splitting: an honorific is not a surname, and surname-first
 # splitting would otherwise deposit "Dr." as the author's family name.
 HONORIFICS = {'dr', 'prof', 'mr', 'mrs', 'ms', 'phd', 'assoc', 'akad', 'prof.dr'}
@@ -203,6 +481,18 @@ def split_authors(raw, surname_first=None):
 
     if not raw:
         return []
+    # Fresh dicts every call: the parse is shared, the result is the caller's.
+    return [{'given': given, 'surname': surname} for given, surname in _parse_authors(raw, bool(surname_first))]
+
+
+@lru_cache(maxsize=4096)
+def _parse_authors(raw, surname_first):
+    """
+    The parse behind split_authors, memoized on (raw string, name order).
+
+    The same authors string is split on every article page, again when the
+    article is checked for queueing and again when its deposit is built.
+    """
     # Authors are hand-entered and separated inconsistently — commas, semicolons
     # and line breaks all occur. Missing a separator silently merges several
     # people into one name, which Crossref rejects for exceeding 60 characters.
@@ -217,12 +507,12 @@ def split_authors(raw, surname_first=None):
             bits = bits[1:]
         name = ' '.join(bits)
         if len(bits) < 2:
-            result.append({'given': '', 'surname': name})
+            result.append(('', name))
         elif surname_first:
-            result.append({'given': ' '.join(bits[1:]), 'surname': bits[0]})
+            result.append((' '.join(bits[1:]), bits[0]))
         else:
-            result.append({'given': ' '.join(bits[:-1]), 'surname': bits[-1]})
-    return result
+            result.append((' '.join(bits[:-1]), bits[-1]))
+    return tuple(result)
 
 
 # Crossref's schema caps given_name and surname at 60 characters each.
@@ -252,37 +542,32 @@ def author_problems(raw):
     return problems
 
 
+def article_problem(article):
+    """Why `article` cannot be deposited as it stands, or None if it can."""
+    if not article.publication_date:
+        return "no publication date"
+    # Crossref rejects an empty <title>, and a DOI is permanent — better
+    # to leave the article un-deposited than to register it untitled.
+    if not article_title(article):
+        return "no title in any language"
+    problems = author_problems(article.authors)
+    if problems:
+        return '; '.join(problems)
+    return None
+
+
 def make_batch_id():
     return f"{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
 
 
-def build_deposit_xml(entries, batch_id=None, site_config=None):
-    """
-    Render the Crossref deposit XML.
-
-    `entries` is a list of (article, doi, resource_url) tuples. Articles are
-    grouped by their parent Issue, which is what the Crossref schema expects.
-    """
+def deposit_context(batch_id=None, site_config=None):
+    """Template context shared by every part of a deposit: head, journals, issns."""
     # Re-clean even a caller-supplied config: nothing with markup in it may
     # reach the deposit, and clean_value is a no-op on already-plain text.
     site_config = {k: clean_value(v) for k, v in (
         site_config if site_config is not None else get_site_config()
     ).items()}
-
-    groups, order = {}, []
-    for article, doi, resource_url in entries:
-        if article.issue_id not in groups:
-            groups[article.issue_id] = {'issue': article.issue, 'articles': []}
-            order.append(article.issue_id)
-        groups[article.issue_id]['articles'].append({
-            'title': article_title(article),
-            'doi': doi,
-            'publication_date': article.publication_date,
-            'absolute_url': resource_url,
-            'authors_list': split_authors(article.authors),
-        })
-
-    context = {
+    return {
         'issns': get_issns(site_config),
         'batch_id': batch_id or make_batch_id(),
         'timestamp': f"{timezone.now():%Y%m%d%H%M%S}",
@@ -296,18 +581,52 @@ def build_deposit_xml(entries, batch_id=None, site_config=None):
             or site_config.get('site_title') or 'Journal Publisher'
         ),
         'journal_title': site_config.get('site_title') or 'Journal',
-        'issue_groups': [groups[k] for k in order],
     }
+
+
+def deposit_article(article, doi, resource_url):
+    """What crossref/deposit_article.xml needs to render one article."""
+    return {
+        'title': article_title(article),
+        'doi': doi,
+        'publication_date': article.publication_date,
+        'absolute_url': resource_url,
+        'authors_list': split_authors(article.authors),
+    }
+
+
+def render_article(data):
+    """One <journal_article> element from a deposit_article() dict, ready to include."""
+    return mark_safe(render_to_string('crossref/deposit_article.xml', {'article': data}))
+
+
+def build_deposit_xml(entries, batch_id=None, site_config=None):
+    """
+    Render the Crossref deposit XML.
+
+    `entries` is a list of (article, doi, resource_url) tuples. Articles are
+    grouped by their parent Issue, which is what the Crossref schema expects.
+    For large deposits see `crossref.deposit_xml`, which streams the same
+    document instead of building it in memory.
+    """
+    context = deposit_context(batch_id, site_config)
+
+    groups, order = {}, []
+    for article, doi, resource_url in entries:
+        if article.issue_id not in groups:
+            groups[article.issue_id] = {'issue': article.issue, 'fragments': []}
+            order.append(article.issue_id)
+        groups[article.issue_id]['fragments'].append(render_article(deposit_article(article, doi, resource_url)))
+
+    context['issue_groups'] = [groups[k] for k in order]
     return render_to_string('crossref/deposit.xml', context)
 
 
-def submit_batch(batch, timeout=60):
+def submit_batch(batch, timeout=60, client=None):
     """
     POST a batch to Crossref. Returns (ok, message) and never raises on a
     network error — the caller records the message on the batch instead.
     """
-    import requests
-
     try:
         user, password = get_credentials()
     except CrossrefError as exc:
@@ -315,12 +634,7 @@ def submit_batch(batch, timeout=60):
 
     url = f"{get_base_url(batch.environment)}{DEPOSIT_PATH}"
     try:
-        response = requests.post(
-            url,
-            data={'operation': 'doMDUpload', 'login_id': user, 'login_passwd': password},
-            files={'fname': (f"{batch.batch_id}.xml", batch.xml.encode('utf-8'), 'application/xml')},
-            timeout=timeout,
-        )
+        response = (client or get_client()).deposit(batch, user, password, timeout=timeout)
     except Exception as exc:
         return False, f"Network error contacting {url}: {exc}"
 
@@ -333,19 +647,93 @@ def submit_batch(batch, timeout=60):
     return True, f"Submitted to {url}. Response: {snippet}"
 
 
-def check_batch(batch, timeout=60):
+# Bytes read from a result response at a time.
+RESULT_CHUNK = 64 * 1024
+
+# record_diagnostic statuses: "Warning" records are registered, with a note.
+REGISTERED_STATUSES = ('success', 'warning')
+FAILED_STATUSES = ('failure', 'error')
+
+
+class ResultReport:
+    """What a submissionDownload result says: counts and per-DOI diagnostics."""
+
+    def __init__(self):
+        self.status = ''
+        self.batch_counts = None
+        self.success = 0
+        self.failure = 0
+        # {doi: (status, message)}, status lower-cased.
+        self.diagnostics = {}
+
+    @property
+    def counts(self):
+        """(registered, failed): Crossref's own batch totals when it sent them."""
+        return self.batch_counts or (self.success, self.failure)
+
+
+def parse_result(chunks):
+    """
+    Read a result document from an iterable of byte chunks.
+
+    The document is parsed incrementally (XMLPullParser, the feed-driven form
+    of iterparse) and every record_diagnostic is dropped from the tree as
+    soon as it has been read, so memory stays flat however many records the
+    batch had. Raises ET.ParseError on a malformed or truncated document.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    report = ResultReport()
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, node in parser.read_events():
+            if event == 'start':
+                if root is None:
+                    root = node
+                    report.status = (node.get('status') or '').lower()
+                continue
+            tag = node.tag.rsplit('}', 1)[-1]
+            if tag == 'batch_data':
+                # Warning records are registered too, but counted apart.
+                report.batch_counts = (
+                    int(node.findtext('{*}success_count') or 0) + int(node.findtext('{*}warning_count') or 0),
+                    int(node.findtext('{*}failure_count') or 0),
+                )
+            elif tag == 'record_diagnostic':
+                status = (node.get('status') or '').lower()
+                if status in REGISTERED_STATUSES:
+                    report.success += 1
+                elif status in FAILED_STATUSES:
+                    report.failure += 1
+                doi = (node.findtext('{*}doi') or '').strip()
+                if doi:
+                    report.diagnostics[doi] = (status, (node.findtext('{*}msg') or '').strip())
+            else:
+                continue
+            # Both are direct children of the root: nothing still open is lost.
+            root.clear()
+    parser.close()
+    return report
+
+
+def check_batch(batch, timeout=60, client=None):
     """
     Poll Crossref for a submitted batch's result.
 
-    Returns (state, message) where state is one of 'registered', 'failed',
-    'pending' (still processing) or 'unknown'.
+    Returns (state, message, diagnostics) where state is one of 'registered',
+    'failed', 'pending' (still processing) or 'unknown', and diagnostics maps
+    each DOI Crossref reported on to (status, message). `timeout` covers the
+    whole check, both lookups and any retries included. The response is
+    streamed and parsed as it arrives rather than read into memory first.
     """
     import requests
 
+    client = client or get_client()
+    deadline = time.monotonic() + timeout
     try:
         user, password = get_credentials()
     except CrossrefError as exc:
-        return 'unknown', str(exc)
+        return 'unknown', str(exc), {}
 
     url = f"{get_base_url(batch.environment)}{RESULT_PATH}"
     # Crossref indexes a submission both by the doi_batch_id in the XML head and
@@ -356,51 +744,53 @@ def check_batch(batch, timeout=60):
         {'doi_batch_id': batch.batch_id},
         {'file_name': f"{batch.batch_id}.xml"},
     ]
-    body = ''
+    head, report = '', None
     for lookup in lookups:
         try:
-            response = requests.get(
-                url,
-                params={'usr': user, 'pwd': password, 'type': 'result', **lookup},
-                timeout=timeout,
-            )
+            response = client.result(batch, user, password, lookup, deadline, stream=True)
         except Exception as exc:
-            return 'unknown', f"Network error contacting {url}: {exc}"
-
-        body = (response.text or '').strip()
-        if response.status_code != 200:
-            return 'unknown', f"HTTP {response.status_code}: {body[:1000]}"
-        if body and 'unknown_submission' not in body:
-            break
-
-    if not body or 'not found' in body.lower():
-        return 'pending', "Crossref has no result for this batch yet."
-    if 'unknown_submission' in body:
-        return 'pending', (
-            "Crossref does not recognise this batch yet under either its batch id or its "
-            "file name. It is normally still queued; if this persists for hours, check the "
-            "submission queue at doi.crossref.org and the report emailed to the depositor."
-        )
-
-    try:
-        root = ET.fromstring(body)
-    except ET.ParseError:
-        return 'unknown', f"Could not parse Crossref response: {body[:1000]}"
-
-    success = failure = 0
-    for node in root.iter():
-        tag = node.tag.rsplit('}', 1)[-1]
-        if tag == 'batch_data':
-            success = int(node.findtext('.//{*}success_count') or 0)
-            failure = int(node.findtext('.//{*}failure_count') or 0)
-        elif tag == 'record_diagnostic':
-            if (node.get('status') or '').lower() == 'success':
-                success += 1
-            elif (node.get('status') or '').lower() in ('failure', 'error'):
-                failure += 1
-
+            return 'unknown', f"Network error contacting {url}: {exc}", {}
+
+        with response:
+            if response.status_code != 200:
+                return 'unknown', f"HTTP {response.status_code}: {response.text.strip()[:1000]}", {}
+            try:
+                chunks = response.iter_content(RESULT_CHUNK)
+                first = next(chunks, b'')
+                head = first.decode('utf-8', 'replace').strip()
+                if not head or 'unknown_submission' in head:
+                    continue
+                if head.startswith('<'):
+                    report = parse_result(itertools.chain([first], chunks))
+            except ET.ParseError as exc:
+                return 'unknown', f"Could not parse Crossref response ({exc}): {head[:1000]}", {}
+            except requests.RequestException as exc:
+                return 'unknown', f"Network error reading the result from {url}: {exc}", {}
+        break
+
+    if report is None:
+        if not head or 'not found' in head.lower():
+            return 'pending', "Crossref has no result for this batch yet.", {}
+        if 'unknown_submission' in head:
+            return 'pending', (
+                "Crossref does not recognise this batch yet under either its batch id or its "
+                "file name. It is normally still queued; if this persists for hours, check the "
+                "submission queue at doi.crossref.org and the report emailed to the depositor."
+            ), {}
+        return 'unknown', f"Could not parse Crossref response: {head[:1000]}", {}
+    if report.status == 'unknown_submission':
+        return 'pending', "Crossref does not recognise this batch yet.", {}
+
+    success, failure = report.counts
     if failure:
-        return 'failed', f"{failure} record(s) failed, {success} succeeded. Response: {body[:2000]}"
+        rejected = [
+            f"{doi}: {note or status}" for doi, (status, note) in report.diagnostics.items()
+            if status in FAILED_STATUSES
+        ]
+        detail = ''
+        if rejected:
+            detail = f" Rejected: {'; '.join(rejected[:5])}" + (' …' if len(rejected) > 5 else '')
+        return 'failed', f"{failure} record(s) failed, {success} succeeded.{detail}", report.diagnostics
     if success:
-        return 'registered', f"{success} record(s) registered. Response: {body[:2000]}"
-    return 'pending', f"No counts in response yet: {body[:1000]}"
+        return 'registered', f"{success} record(s) registered.", report.diagnostics
+    return 'pending', f"No counts in response yet: {head[:1000]}", {}
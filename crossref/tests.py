@@ -0,0 +1,612 @@
+import datetime
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import page_cache
+from core.models import Default
+from issue.models import Issue, JournalIssue
+
+from . import jobs
+from .admin import DepositBatchAdmin
+from .deposit_xml import rerender_batch, split_deposit
+from .management.commands.check_doi_deposits import Command as CheckCommand
+from .models import ArticleFingerprint, CrossrefJob, DepositBatch, DepositFragment, DepositItem, DoiReservation
+from .services import CrossrefClient, check_batch, parse_result, reserve_doi
+
+
+def make_batch(size, status=DepositBatch.PENDING):
+    """A batch of `size` fresh articles, with its XML and DOI reservations."""
+    issue = Issue.objects.create(
+        title='Issue', volume='1', issue_number='1', publication_date=datetime.date(2024, 5, 1),
+    )
+    batch = DepositBatch.objects.create(batch_id=f'test-{issue.pk}', status=status, xml='')
+    dois = []
+    for n in range(size):
+        article = JournalIssue.objects.create(
+            issue=issue, title=f'Article {n}', volume='1', issue_number='1',
+            authors='Axmedova Aziza', publication_date=datetime.date(2024, 5, 2),
+        )
+        doi = f'10.5555/comp.2024.{article.pk:04d}'
+        DepositItem.objects.create(
+            batch=batch, article=article, proposed_doi=doi, resource_url=f'https://example.org/{article.pk}/',
+        )
+        DoiReservation.objects.create(doi=doi, article=article)
+        dois.append(doi)
+    batch.xml = '<doi_batch><body>' + ''.join(f'<doi>{doi}</doi>' for doi in dois) + '</body></doi_batch>'
+    batch.save(update_fields=['xml'])
+    return batch
+
+
+class ApproveAndDepositTests(TestCase):
+    def setUp(self):
+        self.admin = DepositBatchAdmin(DepositBatch, AdminSite())
+        self.user = get_user_model().objects.create_superuser('editor', 'editor@example.org', 'x')
+
+    def approve(self, batch):
+        request = self.request()
+        with mock.patch('crossref.jobs.submit_batch') as submit:
+            self.admin.approve_and_deposit(request, DepositBatch.objects.filter(pk=batch.pk))
+        submit.assert_not_called()
+        return CrossrefJob.objects.get(batch=batch)
+
+    def deposit(self, job):
+        """Run a claimed deposit job; returns the number of queries it took."""
+        with mock.patch('crossref.jobs.submit_batch', return_value=(True, 'received')):
+            with CaptureQueriesContext(connection) as queries:
+                jobs.run(job)
+        return len(queries)
+
+    def test_approval_only_queues_the_deposit(self):
+        batch = make_batch(3)
+        job = self.approve(batch)
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, DepositBatch.APPROVED)
+        self.assertEqual((job.kind, job.status), (CrossrefJob.DEPOSIT, CrossrefJob.QUEUED))
+        self.assertFalse(JournalIssue.objects.exclude(doi=None).exists())
+
+    def test_worker_writes_dois_and_item_statuses(self):
+        batch = make_batch(3)
+        self.approve(batch)
+        self.deposit(jobs.claim_next())
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, DepositBatch.SUBMITTED)
+        self.assertEqual(CrossrefJob.objects.get().status, CrossrefJob.DONE)
+        for item in batch.items.select_related('article'):
+            self.assertEqual(item.status, DepositItem.DEPOSITED)
+            self.assertEqual(item.article.doi, item.proposed_doi)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        self.approve(make_batch(2))
+        small = self.deposit(jobs.claim_next())
+        self.approve(make_batch(40))
+        large = self.deposit(jobs.claim_next())
+        self.assertEqual(small, large)
+
+    def request(self):
+        request = RequestFactory().post('/')
+        request.user = self.user
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def test_crash_before_sending_returns_the_batch_to_review(self):
+        batch = make_batch(2)
+        self.approve(batch)
+        with mock.patch('crossref.jobs.submit_batch', side_effect=RuntimeError('boom')):
+            job = jobs.run(jobs.claim_next())
+        batch.refresh_from_db()
+        self.assertEqual((job.status, batch.status), (CrossrefJob.FAILED, DepositBatch.PENDING))
+
+    def test_crash_after_sending_keeps_the_batch_submitted(self):
+        batch = make_batch(2)
+        self.approve(batch)
+        with mock.patch('crossref.jobs.submit_batch', return_value=(True, 'received')), \
+                mock.patch('crossref.jobs.assign_batch_dois', side_effect=RuntimeError('boom')):
+            job = jobs.run(jobs.claim_next())
+        batch.refresh_from_db()
+        self.assertEqual((job.status, batch.status), (CrossrefJob.FAILED, DepositBatch.SUBMITTED))
+        self.assertIn('crashed after sending', batch.log)
+        self.assertFalse(JournalIssue.objects.exclude(doi=None).exists())
+
+        # The result check writes the DOIs the crashed job did not.
+        with mock.patch('crossref.jobs.check_batch', return_value=('registered', 'all good', {})):
+            jobs.poll(batch)
+        for item in batch.items.select_related('article'):
+            self.assertEqual(item.status, DepositItem.REGISTERED)
+            self.assertEqual(item.article.doi, item.proposed_doi)
+
+    def test_sent_batch_is_recorded_even_if_saving_it_failed(self):
+        batch = make_batch(1)
+        self.approve(batch)
+        save = DepositBatch.save
+        calls = []
+
+        def failing_once(instance, *args, **kwargs):
+            calls.append(instance.status)
+            if len(calls) == 1:
+                raise DatabaseError('connection lost')
+            return save(instance, *args, **kwargs)
+
+        with mock.patch('crossref.jobs.submit_batch', return_value=(True, 'received')), \
+                mock.patch.object(DepositBatch, 'save', failing_once):
+            jobs.run(jobs.claim_next())
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, DepositBatch.SUBMITTED)
+
+    def test_stranded_approved_batch_can_be_requeued_or_cancelled(self):
+        batch = make_batch(2)
+        job = self.approve(batch)
+        CrossrefJob.objects.filter(pk=job.pk).update(status=CrossrefJob.FAILED)
+        queryset = DepositBatch.objects.filter(pk=batch.pk)
+
+        self.admin.requeue_deposits(self.request(), queryset)
+        self.assertEqual(jobs.active_job(batch, CrossrefJob.DEPOSIT).status, CrossrefJob.QUEUED)
+        self.admin.cancel_batches(self.request(), queryset)
+        self.assertEqual(DepositBatch.objects.get(pk=batch.pk).status, DepositBatch.APPROVED)
+
+        CrossrefJob.objects.update(status=CrossrefJob.FAILED)
+        self.admin.cancel_batches(self.request(), queryset)
+        self.assertEqual(DepositBatch.objects.get(pk=batch.pk).status, DepositBatch.CANCELLED)
+        self.assertFalse(DoiReservation.objects.exists())
+
+
+class JobQueueTests(TestCase):
+    def test_each_job_is_claimed_once(self):
+        job = jobs.enqueue(CrossrefJob.POLL, make_batch(1))
+        self.assertEqual(jobs.claim_next(), job)
+        self.assertIsNone(jobs.claim_next())
+
+    def test_stale_jobs_are_requeued(self):
+        job = jobs.enqueue(CrossrefJob.POLL, make_batch(1))
+        jobs.claim_next()
+        with override_settings(CROSSREF_JOB_STALE_AFTER=60):
+            self.assertEqual(jobs.requeue_stale(timezone.now()), 0)
+            self.assertEqual(jobs.requeue_stale(timezone.now() + datetime.timedelta(minutes=2)), 1)
+        self.assertEqual(jobs.claim_next(), job)
+
+    def test_deposit_of_unapproved_batch_is_refused(self):
+        batch = make_batch(1)
+        jobs.enqueue(CrossrefJob.DEPOSIT, batch)
+        with mock.patch('crossref.jobs.submit_batch') as submit:
+            job = jobs.run(jobs.claim_next())
+        submit.assert_not_called()
+        self.assertEqual(job.status, CrossrefJob.FAILED)
+
+    def test_worker_polls_submitted_batches(self):
+        batch = make_batch(2, status=DepositBatch.SUBMITTED)
+        jobs.enqueue(CrossrefJob.POLL, batch)
+        with mock.patch('crossref.jobs.check_batch', return_value=('registered', 'all good', {})):
+            call_command('run_crossref_jobs', once=True, stdout=StringIO())
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, DepositBatch.REGISTERED)
+        self.assertEqual(CrossrefJob.objects.get().status, CrossrefJob.DONE)
+
+
+def result_xml(outcomes):
+    """A submissionDownload result with one record_diagnostic per (doi, status)."""
+    records = ''.join(
+        f'<record_diagnostic status="{status}"><doi>{doi}</doi><msg>{status} for {doi}</msg></record_diagnostic>'
+        for doi, status in outcomes
+    )
+    failed = sum(status == 'Failure' for _, status in outcomes)
+    warned = sum(status == 'Warning' for _, status in outcomes)
+    return (
+        f'<doi_batch_diagnostic status="completed">{records}<batch_data>'
+        f'<record_count>{len(outcomes)}</record_count>'
+        f'<success_count>{len(outcomes) - failed - warned}</success_count>'
+        f'<warning_count>{warned}</warning_count><failure_count>{failed}</failure_count>'
+        f'</batch_data></doi_batch_diagnostic>'
+    ).encode()
+
+
+class ResultParsingTests(TestCase):
+    def test_parses_a_document_fed_in_small_chunks(self):
+        outcomes = [(f'10.5555/x.{n}', 'Failure' if n % 10 == 0 else 'Success') for n in range(500)]
+        body = result_xml(outcomes)
+        report = parse_result(body[i:i + 100] for i in range(0, len(body), 100))
+        self.assertEqual(report.counts, (450, 50))
+        self.assertEqual((report.success, report.failure), (450, 50))
+        self.assertEqual(report.diagnostics['10.5555/x.10'], ('failure', 'Failure for 10.5555/x.10'))
+
+    def test_warning_records_count_as_registered(self):
+        report = parse_result([result_xml([('10.5555/x.1', 'Warning'), ('10.5555/x.2', 'Warning')])])
+        self.assertEqual(report.counts, (2, 0))
+
+        batch = make_batch(2, status=DepositBatch.SUBMITTED)
+        outcomes = [(doi, 'Warning') for doi in batch.items.values_list('proposed_doi', flat=True)]
+        client = mock.MagicMock()
+        client.result.return_value.status_code = 200
+        client.result.return_value.iter_content.return_value = iter([result_xml(outcomes)])
+        with override_settings(CROSSREF_USERNAME='user', CROSSREF_PASSWORD='secret'):
+            state, message, _ = check_batch(batch, client=client)
+        self.assertEqual((state, message), ('registered', '2 record(s) registered.'))
+
+    def test_mixed_outcomes_are_recorded_per_item(self):
+        batch = make_batch(3, status=DepositBatch.SUBMITTED)
+        items = list(batch.items.select_related('article').order_by('pk'))
+        for item in items:
+            item.article.doi = item.proposed_doi
+            item.article.save(update_fields=['doi'])
+        rejected = items[1].proposed_doi
+        report = parse_result([result_xml([
+            (items[0].proposed_doi, 'Success'), (rejected, 'Failure'), (items[2].proposed_doi, 'Warning'),
+        ])])
+
+        jobs.record_result(batch, 'failed', '1 record(s) failed', report.diagnostics)
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, DepositBatch.PARTIAL)
+        statuses = dict(batch.items.values_list('proposed_doi', 'status'))
+        self.assertEqual(statuses[rejected], DepositItem.FAILED)
+        self.assertEqual(list(statuses.values()).count(DepositItem.REGISTERED), 2)
+        self.assertEqual(batch.items.get(proposed_doi=rejected).note, f'Failure for {rejected}')
+        self.assertEqual(list(JournalIssue.objects.filter(doi__isnull=True)), [items[1].article])
+        self.assertEqual(list(DoiReservation.objects.values_list('doi', flat=True).order_by('doi')),
+                         sorted([items[0].proposed_doi, items[2].proposed_doi]))
+
+
+class StubResultHandler(BaseHTTPRequestHandler):
+    """Answers /servlet/submissionDownload from `results`, keyed by doi_batch_id."""
+
+    results = {}
+    delay = 0.2
+    active = peak = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(self.delay)
+        with cls.lock:
+            cls.active -= 1
+        url = urlparse(self.path)
+        batch_id = parse_qs(url.query).get('doi_batch_id', [''])[0]
+        body = self.results.get(batch_id, b'<doi_batch_diagnostic status="unknown_submission"/>')
+        if url.path != '/servlet/submissionDownload':
+            self.send_response(404)
+            body = b''
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ClientRetryTests(TestCase):
+    def client_answering(self, *statuses):
+        client = CrossrefClient(retries=3, sleep=lambda seconds: None)
+        client._session = mock.Mock()
+        client._session.request.side_effect = [mock.Mock(status_code=status) for status in statuses]
+        return client
+
+    def test_deposit_is_not_resent_after_a_gateway_error(self):
+        for status in (502, 503, 504):
+            client = self.client_answering(status, 200)
+            response = client.request('deposit', 'POST', 'https://example.org', idempotent=False)
+            self.assertEqual(response.status_code, status)
+            self.assertEqual(client._session.request.call_count, 1)
+
+    def test_result_poll_is_retried_after_a_gateway_error(self):
+        client = self.client_answering(502, 504, 200)
+        self.assertEqual(client.request('result', 'GET', 'https://example.org').status_code, 200)
+        self.assertEqual(client.metrics['result'].retries, 2)
+
+
+class CheckDepositsTests(TestCase):
+    def setUp(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubResultHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        StubResultHandler.results, StubResultHandler.peak = {}, 0
+        stub = override_settings(
+            CROSSREF_BASE_URL=f'http://127.0.0.1:{server.server_port}',
+            CROSSREF_USERNAME='user', CROSSREF_PASSWORD='secret',
+        )
+        stub.enable()
+        self.addCleanup(stub.disable)
+
+    def batch(self, outcome):
+        batch = make_batch(2, status=DepositBatch.SUBMITTED)
+        dois = list(batch.items.order_by('pk').values_list('proposed_doi', flat=True))
+        if outcome == 'registered':
+            StubResultHandler.results[batch.batch_id] = result_xml([(doi, 'Success') for doi in dois])
+        elif outcome == 'partial':
+            StubResultHandler.results[batch.batch_id] = result_xml([(dois[0], 'Success'), (dois[1], 'Failure')])
+        return batch
+
+    def test_polls_batches_concurrently(self):
+        outcomes = ['registered', 'partial', 'pending'] * 2
+        batches = [self.batch(outcome) for outcome in outcomes]
+        out = StringIO()
+        call_command('check_doi_deposits', workers=6, stdout=out)
+
+        expected = {
+            'registered': DepositBatch.REGISTERED, 'partial': DepositBatch.PARTIAL,
+            'pending': DepositBatch.SUBMITTED,
+        }
+        for batch, outcome in zip(batches, outcomes):
+            batch.refresh_from_db()
+            self.assertEqual(batch.status, expected[outcome], batch.batch_id)
+        self.assertIn('Checked 6 batch(es)', out.getvalue())
+        self.assertIn('with 6 worker(s): 2 registered, 2 failed, 2 pending.', out.getvalue())
+        self.assertGreater(StubResultHandler.peak, 1)
+
+
+class ReserveDoiTests(TestCase):
+    def setUp(self):
+        issue = Issue.objects.create(
+            title='Issue', volume='1', issue_number='1', publication_date=datetime.date(2024, 5, 1),
+        )
+        self.article, self.other = [
+            JournalIssue.objects.create(
+                issue=issue, title=title, volume='1', issue_number='1',
+                authors='Axmedova Aziza', publication_date=datetime.date(2024, 5, 2),
+            )
+            for title in ('Article', 'Other')
+        ]
+        self.first = f'10.5555/comp.2024.{self.article.pk:04d}'
+
+    def holders(self):
+        return dict(DoiReservation.objects.values_list('doi', 'article_id'))
+
+    def test_reservation_left_by_a_dead_run_is_reused(self):
+        DoiReservation.objects.create(doi=self.first, article=self.article)
+        self.assertEqual(reserve_doi(self.article, '10.5555'), self.first)
+        self.assertEqual(self.holders(), {self.first: self.article.pk})
+
+    def test_doi_reserved_for_another_article_is_skipped(self):
+        DoiReservation.objects.create(doi=self.first, article=self.other)
+        self.assertEqual(reserve_doi(self.article, '10.5555'), f'{self.first}-2')
+        self.assertEqual(self.holders(), {self.first: self.other.pk, f'{self.first}-2': self.article.pk})
+
+    def test_losing_the_insert_race_moves_to_the_next_candidate(self):
+        create = DoiReservation.objects.create
+        raced = []
+
+        def racing_create(**fields):
+            if not raced:
+                # Another run reserved the same DOI between our lookup and our insert.
+                raced.append(fields['doi'])
+                raise IntegrityError('UNIQUE constraint failed: crossref_doi_reservation.doi')
+            return create(**fields)
+
+        with mock.patch.object(DoiReservation.objects, 'create', racing_create):
+            doi = reserve_doi(self.article, '10.5555')
+        self.assertEqual(raced, [self.first])
+        self.assertEqual(doi, f'{self.first}-2')
+        self.assertEqual(self.holders(), {f'{self.first}-2': self.article.pk})
+
+
+class ReleaseDoisTests(TestCase):
+    def record_failure(self, batch):
+        with CaptureQueriesContext(connection) as queries:
+            CheckCommand(stdout=StringIO())._record(batch, 'failed', 'rejected')
+        return len(queries)
+
+    def submitted_batch(self, size):
+        batch = make_batch(size, status=DepositBatch.SUBMITTED)
+        for item in batch.items.select_related('article'):
+            item.article.doi = item.proposed_doi
+            item.article.save(update_fields=['doi'])
+        return batch
+
+    def test_clears_only_the_proposed_dois(self):
+        batch = self.submitted_batch(3)
+        edited = batch.items.select_related('article').first().article
+        edited.doi = '10.5555/set-by-hand'
+        edited.save(update_fields=['doi'])
+
+        self.record_failure(batch)
+
+        self.assertEqual(JournalIssue.objects.filter(doi__isnull=True).count(), 2)
+        self.assertEqual(JournalIssue.objects.get(pk=edited.pk).doi, '10.5555/set-by-hand')
+        self.assertFalse(DoiReservation.objects.exists())
+        self.assertIn('Cleared 2 unregistered DOI(s)', DepositBatch.objects.get(pk=batch.pk).log)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        small = self.record_failure(self.submitted_batch(2))
+        large = self.record_failure(self.submitted_batch(40))
+        self.assertEqual(small, large)
+
+    def test_cleared_dois_expire_cached_pages(self):
+        batch = self.submitted_batch(2)
+        before = page_cache._model_version('issue.JournalIssue')
+        self.record_failure(batch)
+        self.assertNotEqual(page_cache._model_version('issue.JournalIssue'), before)
+
+
+class AdminQueryCountTests(TestCase):
+    """Changelists and the batch page must not query once per row."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('editor', 'editor@example.org', 'x')
+        self.client.force_login(user)
+
+    def queries_for(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_batch_changelist(self):
+        url = reverse('admin:crossref_depositbatch_changelist')
+        make_batch(2)
+        few = self.queries_for(url)
+        for _ in range(10):
+            make_batch(3)
+        self.assertEqual(self.queries_for(url), few)
+
+    def test_batch_changelist_counts_items(self):
+        make_batch(3)
+        response = self.client.get(reverse('admin:crossref_depositbatch_changelist'), {'q': '10.5555'})
+        self.assertContains(response, '<td class="field-item_count">3</td>', html=True)
+
+    def test_item_changelist(self):
+        url = reverse('admin:crossref_deposititem_changelist')
+        make_batch(2)
+        few = self.queries_for(url)
+        for _ in range(5):
+            make_batch(6)
+        self.assertEqual(self.queries_for(url), few)
+
+    def test_batch_change_page(self):
+        small = make_batch(2)
+        large = make_batch(40)
+        # The first admin page of the run also loads content types; not counted.
+        self.client.get(reverse('admin:crossref_depositbatch_change', args=[small.pk]))
+        self.assertEqual(
+            self.queries_for(reverse('admin:crossref_depositbatch_change', args=[small.pk])),
+            self.queries_for(reverse('admin:crossref_depositbatch_change', args=[large.pk])),
+        )
+
+
+@override_settings(SITE_BASE_URL='https://journal.example.org')
+class RerenderBatchTests(TestCase):
+    def setUp(self):
+        Default.objects.create(name='contact_email', value='editor@example.org')
+        Default.objects.create(name='issn_print', value='1234-5678')
+        self.batch = make_batch(5)
+        rerender_batch(self.batch)
+
+    def test_reuses_unchanged_articles(self):
+        store, dropped = rerender_batch(self.batch)
+        self.assertEqual((store.rendered, store.reused, dropped), (0, 5, []))
+
+    def test_renders_only_changed_articles(self):
+        article = self.batch.items.first().article
+        article.title = article.title_uz = 'Corrected title'
+        article.save()
+
+        store, _ = rerender_batch(self.batch)
+
+        self.assertEqual((store.rendered, store.reused), (1, 4))
+        self.assertIn('Corrected title', self.batch.xml)
+        self.assertEqual(DepositFragment.objects.filter(article=article).count(), 1)
+
+    def test_drops_articles_that_got_a_doi(self):
+        item = self.batch.items.first()
+        item.article.doi = '10.5555/set-by-hand'
+        item.article.save()
+
+        _, dropped = rerender_batch(self.batch)
+
+        self.assertEqual([i.pk for i, _ in dropped], [item.pk])
+        self.assertNotIn(item.proposed_doi, self.batch.xml)
+        self.assertFalse(DoiReservation.objects.filter(doi=item.proposed_doi).exists())
+        self.assertEqual(self.batch.items.count(), 4)
+
+
+@override_settings(SITE_BASE_URL='https://journal.example.org')
+class QueueDepositsTests(TestCase):
+    def setUp(self):
+        Default.objects.create(name='contact_email', value='editor@example.org')
+        Default.objects.create(name='issn_print', value='1234-5678')
+        Default.objects.create(name='doi_prefix', value='10.5555')
+        issue = Issue.objects.create(
+            title='Issue', volume='1', issue_number='1', publication_date=datetime.date(2024, 5, 1),
+        )
+        for n in range(5):
+            JournalIssue.objects.create(
+                issue=issue, title=f'Article {n}', title_uz=f'Article {n}', volume='1',
+                issue_number='1', authors='Axmedova Aziza', publication_date=datetime.date(2024, 5, 2),
+            )
+
+    def test_each_part_is_saved_before_the_next_is_rendered(self):
+        saved_before = []
+
+        def split(*args, **kwargs):
+            for part in split_deposit(*args, **kwargs):
+                saved_before.append(DepositBatch.objects.count())
+                yield part
+
+        with mock.patch('crossref.management.commands.queue_doi_deposits.split_deposit', split):
+            call_command('queue_doi_deposits', max_articles=2, stdout=StringIO())
+        self.assertEqual(saved_before, [0, 1, 2])
+        self.assertEqual(sorted(DepositBatch.objects.values_list('items__article', flat=True)),
+                         sorted(JournalIssue.objects.values_list('pk', flat=True)))
+        self.assertEqual(DepositFragment.objects.count(), 5)
+
+
+@override_settings(SITE_BASE_URL='https://journal.example.org')
+class MetadataUpdateTests(TestCase):
+    def setUp(self):
+        Default.objects.create(name='contact_email', value='editor@example.org')
+        Default.objects.create(name='issn_print', value='1234-5678')
+        Default.objects.create(name='doi_prefix', value='10.5555')
+        Issue.objects.create(title='Issue', volume='1', issue_number='1', publication_date=datetime.date(2024, 5, 1))
+        for n in range(3):
+            JournalIssue.objects.create(
+                issue=Issue.objects.get(), title=f'Article {n}', title_uz=f'Article {n}', volume='1',
+                issue_number='1', authors='Axmedova Aziza', publication_date=datetime.date(2024, 5, 2),
+            )
+        call_command('queue_doi_deposits', stdout=StringIO())
+        batch = DepositBatch.objects.get()
+        DepositItem.objects.filter(batch=batch).update(status=DepositItem.DEPOSITED)
+        for item in batch.items.select_related('article'):
+            item.article.doi = item.proposed_doi
+            item.article.save(update_fields=['doi'])
+        batch.status = DepositBatch.SUBMITTED
+        batch.save()
+        CheckCommand(stdout=StringIO())._record(batch, 'registered', 'ok')
+
+    def queue(self, **options):
+        call_command('queue_metadata_updates', stdout=StringIO(), **options)
+        return DepositBatch.objects.filter(kind=DepositBatch.UPDATE)
+
+    def test_registration_records_fingerprints(self):
+        self.assertEqual(ArticleFingerprint.objects.count(), 3)
+        self.assertFalse(self.queue().exists())
+
+    def test_queues_only_changed_articles(self):
+        article = JournalIssue.objects.order_by('pk').first()
+        article.title_en = 'Article 0 (English)'
+        article.save()
+
+        batch = self.queue().get()
+
+        self.assertEqual(list(batch.items.values_list('article_id', flat=True)), [article.pk])
+        self.assertEqual(batch.items.get().proposed_doi, article.doi)
+        self.assertIn(article.doi, batch.xml)
+
+    def test_cancelling_an_update_keeps_the_doi_reserved(self):
+        article = JournalIssue.objects.order_by('pk').first()
+        article.authors = 'Axmedova Aziza, Karimov Bobur'
+        article.save()
+        batch = self.queue().get()
+
+        admin = DepositBatchAdmin(DepositBatch, AdminSite())
+        request = RequestFactory().post('/')
+        request.user = get_user_model().objects.create_superuser('editor', 'editor@example.org', 'x')
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        admin.cancel_batches(request, DepositBatch.objects.filter(pk=batch.pk))
+
+        self.assertTrue(DoiReservation.objects.filter(doi=article.doi).exists())
+
+    def test_baseline_records_unknown_articles(self):
+        ArticleFingerprint.objects.all().delete()
+        self.assertFalse(self.queue().exists())
+        self.assertFalse(ArticleFingerprint.objects.exists())
+        self.queue(baseline=True)
+        self.assertEqual(ArticleFingerprint.objects.count(), 3)
@@ -0,0 +1,75 @@
+"""
+The issue archive behind the All Issues page, grouped by decade and year.
+
+Building it touches every Issue, so it is built once per language and cached
+under a version read from the database (the latest Issue.updated_at and the
+number of issues). A save or a deletion anywhere changes the version, so every
+worker moves to the new archive even with a per-process cache. The page receives
+only the decade/year navigation and the newest year inline; other years are
+fetched from the JSON endpoint as the reader selects them.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import translation
+
+from core.url_map import localized_path
+
+from .models import Issue
+
+CACHE_KEY = 'issue_archive:{language}:{version}'
+# Entries for superseded versions are never read again; let them expire.
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _build(language):
+    years, decades = {}, {}
+    issues = Issue.objects.only(
+        'pk', 'title', 'volume', 'issue_number', 'publication_date', 'cover_image',
+    ).order_by('publication_date')
+    for issue in issues:
+        year = issue.publication_date.year
+        decade = f"{(year // 10) * 10}s"
+        # Track years by decade for UI navigation
+        decade_years = decades.setdefault(decade, [])
+        if year not in decade_years:
+            decade_years.append(year)
+        years.setdefault(year, []).append({
+            'volume': issue.volume,
+            'issue': issue.issue_number,
+            # Format date as "Month Year"
+            'date': issue.publication_date.strftime('%B %Y'),
+            'title': issue.title or "",
+            'id': issue.id,
+            'url': localized_path('item_issue', language, pk=issue.pk),
+            'cover_image': issue.cover_image.url if issue.cover_image else None,
+        })
+    # Sort years within each decade, newest first
+    for decade in decades:
+        decades[decade].sort(reverse=True)
+    return {'decades': decades, 'years': years}
+
+
+def get_archive(language=None):
+    """{'decades': {'2020s': [2025, …]}, 'years': {2025: [issue, …]}} for `language`."""
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    key = CACHE_KEY.format(language=language, version=version())
+    archive = cache.get(key)
+    if archive is None:
+        with translation.override(language):
+            archive = _build(language)
+        cache.set(key, archive, timeout=CACHE_TIMEOUT)
+    return archive
+
+
+def version():
+    state = Issue.objects.aggregate(latest=Max('updated_at'), total=Count('pk'))
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    return f"{latest}.{state['total']}"
+
+
+def latest_year(archive):
+    years = archive['years']
+    return max(years) if years else None
+
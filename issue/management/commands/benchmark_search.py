@@ -0,0 +1,89 @@
+"""
+Compare search latency of the full-text index against the icontains fallback.
+
+Synthetic articles are created inside a transaction that is rolled back at the
+end, so the command is safe to run against a real database — but it does take
+write locks for its duration, so do not run it on a live site at peak time.
+"""
+
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from faker import Faker
+
+from issue.models import Issue, JournalIssue
+from issue.search import LikeBackend, get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Benchmark article search: full-text index vs. the old icontains search'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000, 100000],
+            help='Article counts to benchmark at (default: 10000 100000)',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Runs per query; the median is reported (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        if get_backend().name == 'like':
+            raise CommandError('No full-text index on this database; nothing to compare against.')
+
+        fake = Faker()
+        Faker.seed(4)
+        random.seed(4)
+        queries = ['house', 'network policy', 'Smith', 'pro', 'nonexistentword']
+
+        self.stdout.write(f"{'articles':>9} {'query':<20} {'icontains ms':>13} {'index ms':>9} {'hits':>7}")
+        with transaction.atomic():
+            issue = Issue.objects.create(
+                title='Benchmark issue', volume='1', issue_number='1', publication_date=date(2024, 1, 1),
+            )
+            created = 0
+            for size in sorted(options['sizes']):
+                self._grow(fake, issue, size - created)
+                created = size
+                rebuild_index()
+                for query in queries:
+                    like_ms, like_hits = self._time(LikeBackend(), query, options['repeat'])
+                    index_ms, index_hits = self._time(get_backend(), query, options['repeat'])
+                    self.stdout.write(
+                        f"{size:>9} {query:<20} {like_ms:>13.1f} {index_ms:>9.1f} {index_hits:>7}"
+                        + ('' if like_hits == index_hits else f"  (icontains: {like_hits})")
+                    )
+            transaction.set_rollback(True)
+
+    def _grow(self, fake, issue, count):
+        batch = []
+        for _ in range(count):
+            batch.append(JournalIssue(
+                issue=issue, volume='1', issue_number='1', publication_date=date(2024, 1, 1),
+                title_uz=fake.sentence(nb_words=8), title_en=fake.sentence(nb_words=8),
+                title_ru=fake.sentence(nb_words=8),
+                description_uz=f"<p>{fake.paragraph(nb_sentences=12)}</p>",
+                description_en=f"<p>{fake.paragraph(nb_sentences=12)}</p>",
+                description_ru=f"<p>{fake.paragraph(nb_sentences=12)}</p>",
+                authors=', '.join(fake.name() for _ in range(random.randint(1, 3))),
+            ))
+            if len(batch) == 1000:
+                JournalIssue.objects.bulk_create(batch)
+                batch = []
+        JournalIssue.objects.bulk_create(batch)
+
+    def _time(self, backend, query, repeat):
+        """Median wall time of what the view does: count plus the first page."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = backend.search(query)
+            hits = results.count()
+            list(results[:20])
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), hits
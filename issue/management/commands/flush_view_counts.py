@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from issue import view_counter
+
+
+class Command(BaseCommand):
+    help = 'Write buffered article view counts to the database'
+
+    def handle(self, *args, **options):
+        store = view_counter.get_store()
+        if store.name != 'cache':
+            # A per-process buffer lives in the web workers, not in this command.
+            self.stdout.write(self.style.WARNING(
+                f"VIEW_COUNT_STORE is '{store.name}'; only the 'cache' store can be flushed from "
+                "outside the web process. Nothing to do."
+            ))
+            return
+        written = view_counter.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {written} buffered view(s).'))
@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from issue.sitemaps import get_sections, iter_index_xml, iter_section_xml, section_filename
+
+
+class Command(BaseCommand):
+    help = 'Write the sitemap index and all section pages to SITEMAP_ROOT as static files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default=None,
+            help='Public site URL the sitemap links point at (default: SITE_BASE_URL)',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete the static files instead, so sitemaps are served live again',
+        )
+
+    def handle(self, *args, **options):
+        root = getattr(settings, 'SITEMAP_ROOT', '')
+        if not root:
+            raise CommandError('SITEMAP_ROOT is not set.')
+        root = Path(root)
+        existing = set(root.glob('sitemap*.xml')) if root.is_dir() else set()
+
+        if options['clear']:
+            for path in existing:
+                path.unlink()
+            self.stdout.write(self.style.SUCCESS(f'Removed {len(existing)} static sitemap file(s).'))
+            return
+
+        base_url = (options['base_url'] or getattr(settings, 'SITE_BASE_URL', '') or '').rstrip('/')
+        if not base_url:
+            raise CommandError('No base URL: pass --base-url or set SITE_BASE_URL.')
+        root.mkdir(parents=True, exist_ok=True)
+
+        sections = get_sections()
+        written = set()
+        for name, sitemap in sections.items():
+            for page in sitemap.paginator.page_range:
+                written.add(self._write(root / section_filename(name, page), iter_section_xml(sitemap, page, base_url)))
+        # The index last: until it is replaced, crawlers follow the old one,
+        # whose section files are all still in place.
+        written.add(self._write(root / 'sitemap.xml', iter_index_xml(base_url, sections)))
+
+        for path in existing - written:
+            path.unlink()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(written)} sitemap file(s) to {root}.'))
+
+    def _write(self, path, chunks):
+        """Stream to a temporary file, then swap it in so readers never see half a file."""
+        tmp = path.with_name(path.name + '.tmp')
+        with tmp.open('w', encoding='utf-8') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        os.replace(tmp, path)
+        return path
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from issue.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the article full-text search index from the database'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if backend.name == 'like':
+            self.stdout.write(self.style.WARNING(
+                'No search index on this database; search uses the icontains fallback. Nothing to do.'
+            ))
+            return
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} articles ({backend.name}).'))
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from issue import scholar_schedule, scholar_sync
+
+
+class Command(BaseCommand):
+    help = 'Sync Google Scholar citation counts, most overdue articles first (rate-limited, resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Concurrent lookups (default: SCHOLAR_WORKERS)')
+        parser.add_argument('--rate', type=float, help='Requests per second across all workers (default: SCHOLAR_RATE)')
+        parser.add_argument(
+            '--budget', type=int,
+            help="Lookups to spend (default: what is left of SCHOLAR_DAILY_BUDGET for the last 24 hours)",
+        )
+        parser.add_argument(
+            '--max-age', type=float,
+            help='Ignore the scheduler: sync every article not synced within this many hours',
+        )
+        parser.add_argument('--force', action='store_true', help='Ignore the scheduler and budget: sync every article')
+        parser.add_argument('--limit', type=int, help='Sync at most this many articles')
+        parser.add_argument('--dry-run', action='store_true', help='List what would be synced, and why, then stop')
+        parser.add_argument('--batch-size', type=int, default=50, help='Articles per database write (default: 50)')
+        parser.add_argument(
+            '--backend', choices=sorted(scholar_sync.BACKENDS),
+            help="Lookup backend (default: SCHOLAR_BACKEND); 'fake' never touches the network",
+        )
+
+    def handle(self, *args, **options):
+        if options['force'] or options['max_age'] is not None:
+            max_age = None if options['force'] else timedelta(hours=options['max_age'])
+            articles = list(scholar_sync.due_articles(max_age, options['limit']))
+            planned = [(None, article) for article in articles]
+        else:
+            budget = options['budget']
+            if options['limit'] is not None:
+                budget = min(options['limit'], scholar_schedule.remaining_budget() if budget is None else budget)
+            planned = scholar_schedule.plan(budget)
+            articles = [article for _, article in planned]
+
+        if options['dry_run']:
+            for score, article in planned:
+                overdue = '' if score is None else ('never synced' if score == float('inf') else f'{score:.1f}x overdue')
+                self.stdout.write(
+                    f'{article.pk:>6}  {overdue:<14} views={article.views} '
+                    f'velocity={article.citation_velocity:.1f}/yr  {article.title[:60]}'
+                )
+            self.stdout.write(f'{len(planned)} article(s) would be synced.')
+            return
+
+        if not articles:
+            self.stdout.write(self.style.SUCCESS('Nothing is due (or the daily budget is spent).'))
+            return
+
+        try:
+            backend = scholar_sync.get_backend(options['backend'])
+        except ImportError:
+            raise CommandError("The 'scholarly' package is not installed (pip install scholarly), "
+                               "or use --backend fake.")
+
+        total = len(articles)
+        self.stdout.write(f'Syncing {total} article(s) via {backend.name}…')
+
+        def progress(stats):
+            if stats.done % 25 == 0:
+                self.stdout.write(f'  {stats.done}/{total}: {stats}')
+
+        sync = scholar_sync.ScholarSync(
+            backend, workers=options['workers'], rate=options['rate'],
+            batch_size=options['batch_size'], progress=progress,
+        )
+        try:
+            stats = sync.run(articles)
+        except KeyboardInterrupt:
+            # Completed batches are already saved and no longer due.
+            self.stdout.write(self.style.WARNING(f'Interrupted: {sync.stats}'))
+            return
+        style = self.style.WARNING if stats.aborted or stats.failed else self.style.SUCCESS
+        self.stdout.write(style(f'Done: {stats}'))
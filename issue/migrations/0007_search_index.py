@@ -0,0 +1,95 @@
+import html
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# Frozen copies of what issue.search did when this migration was written, so
+# that later changes to the live search code cannot change or break it.
+TABLE = 'issue_search'
+LANGUAGES = ('uz', 'en', 'ru')
+
+
+def _clean(raw):
+    return html.unescape(strip_tags(raw or '')).replace('\xa0', ' ').strip()
+
+
+def _languages(obj, field):
+    values = []
+    for name in [field] + [f'{field}_{code}' for code in LANGUAGES]:
+        value = _clean(getattr(obj, name, '') or '')
+        if value and value not in values:
+            values.append(value)
+    return ' '.join(values)
+
+
+def _row(article):
+    meta = [article.volume or '', article.issue_number or '', _languages(article.issue, 'title')]
+    return (
+        article.pk,
+        _languages(article, 'title'),
+        _clean(article.authors),
+        _languages(article, 'description'),
+        ' '.join(m for m in meta if m),
+    )
+
+
+def _create_sqlite(cursor, articles_table):
+    try:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "title, authors, description, meta, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    except Exception:
+        # SQLite compiled without FTS5: search stays on the LIKE fallback.
+        return None
+    return (
+        f"INSERT INTO {TABLE} (rowid, title, authors, description, meta) VALUES (%s, %s, %s, %s, %s)"
+    )
+
+
+def _create_postgresql(cursor, articles_table):
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+        f"article_id bigint PRIMARY KEY REFERENCES {articles_table} (id) "
+        "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "document tsvector NOT NULL)"
+    )
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {TABLE}_document_idx ON {TABLE} USING GIN (document)")
+    vector = ' || '.join(f"setweight(to_tsvector('simple', %s), '{weight}')" for weight in 'ABCD')
+    return (
+        f"INSERT INTO {TABLE} (article_id, document) VALUES (%s, {vector}) "
+        "ON CONFLICT (article_id) DO UPDATE SET document = EXCLUDED.document"
+    )
+
+
+CREATE = {'sqlite': _create_sqlite, 'postgresql': _create_postgresql}
+
+
+def create_search_index(apps, schema_editor):
+    create = CREATE.get(schema_editor.connection.vendor)
+    if create is None:
+        return
+    JournalIssue = apps.get_model('issue', 'JournalIssue')
+    with schema_editor.connection.cursor() as cursor:
+        insert = create(cursor, JournalIssue._meta.db_table)
+        if insert is None:
+            return
+        articles = JournalIssue.objects.select_related('issue').order_by('pk')
+        for start in range(0, articles.count(), 500):
+            cursor.executemany(insert, [_row(article) for article in articles[start:start + 500]])
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issue', '0006_alter_journalissue_doi'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
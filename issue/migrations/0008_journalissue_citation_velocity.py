@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issue', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalissue',
+            name='citation_velocity',
+            field=models.FloatField(default=0, help_text='Citations gained per year, measured at the last Scholar sync'),
+        ),
+    ]
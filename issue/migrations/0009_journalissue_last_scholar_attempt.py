@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issue', '0008_journalissue_citation_velocity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalissue',
+            name='last_scholar_attempt',
+            field=models.DateTimeField(blank=True, help_text='Last Scholar lookup, including failed ones', null=True),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from ckeditor.fields import RichTextField
 from django.db import models
-from django.urls import reverse
 from django.utils import timezone
 
+from core.url_map import localized_path
+
 class Issue(models.Model):
     """
     Model to represent a journal issue.
@@ -54,46 +55,33 @@ class JournalIssue(models.Model):
     google_scholar_query = models.CharField(max_length=300, blank=True, null=True, help_text="Custom search query override; defaults to title + authors")
     citation_count = models.PositiveIntegerField(default=0)
     last_scholar_sync = models.DateTimeField(blank=True, null=True)
+    citation_velocity = models.FloatField(default=0, help_text="Citations gained per year, measured at the last Scholar sync")
+    last_scholar_attempt = models.DateTimeField(blank=True, null=True, help_text="Last Scholar lookup, including failed ones")
 
     def __str__(self):
         return f"{self.issue.title} - {self.title} (Volume {self.volume}, Issue {self.issue_number})"
 
     def get_absolute_url(self):
-        return reverse('article_detail', kwargs={'pk': self.pk})
+        return localized_path('article_detail', pk=self.pk)
 
     def update_scholar_metadata(self, force=False):
+        from issue import scholar_sync
         try:
-            from scholarly import scholarly
+            backend = scholar_sync.get_backend()
         except Exception:
             return False, "scholarly not installed"
         if not force and self.last_scholar_sync and (timezone.now() - self.last_scholar_sync).days < 1:
             return False, "recently updated"
-        query = self.google_scholar_query or f"{self.title} {self.authors}".strip()
-        if not query:
+        if not scholar_sync.query_for(self):
             return False, "no query"
         try:
-            search = scholarly.search_pubs(query)
-            best = None
-            for _ in range(3):
-                try:
-                    cand = next(search)
-                except StopIteration:
-                    break
-                title = (cand.get('bib', {}) or {}).get('title', '')
-                if title and self.title.lower().split(':')[0] in title.lower():
-                    best = cand
-                    break
-                if best is None:
-                    best = cand
-            if not best:
+            found = scholar_sync.lookup(self, backend)
+            if not found:
                 return False, "no result"
-            cited_by = best.get('num_citations') or best.get('citedby') or 0
-            cluster_id = best.get('pubid') or best.get('container_type', {}).get('source')
+            cited_by, cluster_id = found
             changed = cited_by != self.citation_count or cluster_id != self.scholar_cluster_id
-            self.citation_count = cited_by
-            self.scholar_cluster_id = cluster_id
-            self.last_scholar_sync = timezone.now()
-            self.save(update_fields=['citation_count', 'scholar_cluster_id', 'last_scholar_sync'])
+            scholar_sync.apply_result(self, cited_by, cluster_id, timezone.now())
+            self.save(update_fields=scholar_sync.SYNC_FIELDS)
             return changed, f"updated citations={cited_by}"
         except Exception as e:
             return False, f"error: {e}"
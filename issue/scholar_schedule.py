@@ -0,0 +1,78 @@
+"""
+Decide which articles the limited Scholar query budget is spent on.
+
+Each article gets a refresh interval: SCHOLAR_MAX_INTERVAL days for one
+nobody reads and nobody cites, shrinking towards SCHOLAR_MIN_INTERVAL as its
+citation velocity and views grow. An article's priority is how overdue it is
+(time since its last sync divided by its interval): a much-cited article
+three weeks out of date outranks a dormant one three months out of date.
+Never-synced articles come first, newest publications first.
+
+SCHOLAR_DAILY_BUDGET caps lookups per rolling 24 hours; every article looked
+up in that window counts against it, whether the lookup succeeded or failed
+and whichever process made it.
+"""
+
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import JournalIssue
+from .scholar_sync import due_articles
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def refresh_interval(article):
+    """Days between syncs this article deserves."""
+    shortest = _setting('SCHOLAR_MIN_INTERVAL', 3)
+    longest = _setting('SCHOLAR_MAX_INTERVAL', 180)
+    # Citations are per year: one a year adds as much heat as 20x more readers
+    # (the views term is log base 20).
+    heat = 1 + article.citation_velocity + math.log1p(article.views or 0) / math.log(20)
+    return min(longest, max(shortest, longest / heat))
+
+
+def priority(article, now=None):
+    """How overdue `article` is: >= 1 means due. Never-synced articles are infinitely so."""
+    if article.last_scholar_sync is None:
+        return math.inf
+    now = now or timezone.now()
+    stale_days = (now - article.last_scholar_sync).total_seconds() / 86400
+    return stale_days / refresh_interval(article)
+
+
+def remaining_budget(now=None):
+    """Lookups left in the last 24 hours' SCHOLAR_DAILY_BUDGET, failed ones included."""
+    budget = _setting('SCHOLAR_DAILY_BUDGET', 200)
+    since = (now or timezone.now()) - timedelta(days=1)
+    used = JournalIssue.objects.filter(
+        Q(last_scholar_attempt__gte=since) | Q(last_scholar_sync__gte=since)
+    ).count()
+    return max(0, budget - used)
+
+
+def plan(budget=None, now=None):
+    """
+    Articles to refresh now, most overdue first, at most `budget` of them
+    (default: what is left of today's SCHOLAR_DAILY_BUDGET).
+    Returns [(priority, article)].
+    """
+    now = now or timezone.now()
+    budget = remaining_budget(now) if budget is None else budget
+    if budget <= 0:
+        return []
+    # Anything synced within the minimum interval can never be due.
+    candidates = due_articles(timedelta(days=_setting('SCHOLAR_MIN_INTERVAL', 3)))
+    scored = []
+    for article in candidates.iterator(chunk_size=1000):
+        score = priority(article, now)
+        if score >= 1:
+            scored.append((score, article))
+    scored.sort(key=lambda item: (-item[0], -item[1].publication_date.toordinal()))
+    return scored[:budget]
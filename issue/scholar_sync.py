@@ -0,0 +1,334 @@
+"""
+Bulk Google Scholar sync for article citation counts.
+
+Scholar has no API and blocks clients that query too fast, so lookups go
+through a small thread pool that shares one token bucket: at most
+SCHOLAR_RATE requests per second (bursts of SCHOLAR_BURST) across all
+workers. A response that looks like a block pauses the whole bucket with
+exponential backoff instead of letting every worker hammer on; after
+SCHOLAR_MAX_RETRIES blocked attempts the run stops.
+
+Results are written with bulk_update every `batch_size` articles. Each
+written article gets a fresh `last_scholar_sync`, and runs skip anything
+synced within `max_age`, so an interrupted run resumes where it stopped.
+
+SCHOLAR_BACKEND picks where lookups go: 'scholarly' (the real site, needs
+the optional `scholarly` package) or 'fake', a deterministic local stand-in
+for development and tests.
+"""
+
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import JournalIssue
+
+SYNC_FIELDS = [
+    'citation_count', 'scholar_cluster_id', 'citation_velocity', 'last_scholar_sync', 'last_scholar_attempt',
+]
+
+# Candidates looked at per query; the first three are what Scholar ranks best.
+CANDIDATES = 3
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Blocked(Exception):
+    """Scholar refused the request (rate limit, CAPTCHA, proxy exhausted)."""
+
+
+def is_blocked(exc):
+    if isinstance(exc, Blocked):
+        return True
+    # scholarly raises MaxTriesExceededException once its retries run out,
+    # and plain exceptions carrying the HTTP status otherwise.
+    if type(exc).__name__ == 'MaxTriesExceededException':
+        return True
+    message = str(exc).lower()
+    return any(marker in message for marker in ('429', 'captcha', 'blocked', 'cannot fetch'))
+
+
+class ScholarlyBackend:
+    name = 'scholarly'
+
+    def __init__(self):
+        from scholarly import scholarly
+        self._scholarly = scholarly
+
+    def search_pubs(self, query):
+        return self._scholarly.search_pubs(query)
+
+
+class FakeScholarBackend:
+    """
+    Offline stand-in for `scholarly`.
+
+    Every query yields one publication whose title is the query and whose
+    citation count is derived from its hash, so results are stable between
+    runs. `latency` simulates the round trip; `block_rate` is the chance a
+    call raises Blocked.
+    """
+
+    name = 'fake'
+
+    def __init__(self, latency=0.0, block_rate=0.0, seed=None):
+        self.latency = latency
+        self.block_rate = block_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def search_pubs(self, query):
+        with self._lock:
+            self.calls += 1
+            blocked = self._random.random() < self.block_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if blocked:
+            raise Blocked('fake backend: 429 Too Many Requests')
+        digest = hashlib.sha1(query.encode()).hexdigest()
+        return iter([{
+            'bib': {'title': query},
+            'num_citations': int(digest[:4], 16) % 500,
+            'pubid': digest[:12],
+        }])
+
+
+BACKENDS = {'scholarly': ScholarlyBackend, 'fake': FakeScholarBackend}
+
+
+def get_backend(name=None):
+    """The configured backend. Raises ImportError if `scholarly` is missing."""
+    return BACKENDS[name or _setting('SCHOLAR_BACKEND', 'scholarly')]()
+
+
+def query_for(article):
+    return article.google_scholar_query or f"{article.title} {article.authors}".strip()
+
+
+def lookup(article, backend):
+    """
+    (citation count, cluster id) of the best Scholar match for `article`, or
+    None if nothing was found. Prefers the first of the top candidates whose
+    title contains the article's main title; otherwise takes the top hit.
+    """
+    query = query_for(article)
+    if not query:
+        return None
+    search = backend.search_pubs(query)
+    wanted = article.title.lower().split(':')[0]
+    best = None
+    for _ in range(CANDIDATES):
+        try:
+            candidate = next(search)
+        except StopIteration:
+            break
+        title = (candidate.get('bib', {}) or {}).get('title', '')
+        if title and wanted in title.lower():
+            best = candidate
+            break
+        if best is None:
+            best = candidate
+    if not best:
+        return None
+    cited_by = best.get('num_citations') or best.get('citedby') or 0
+    cluster_id = best.get('pubid') or (best.get('container_type', {}) or {}).get('source')
+    return cited_by, cluster_id
+
+
+def citation_velocity(article, cited_by, now):
+    """
+    Citations per year: the gain since the previous sync or, on the first
+    sync, the average since publication.
+    """
+    if article.last_scholar_sync is None:
+        published = article.publication_date
+        years = (now.date() - published).days / 365.25 if published else 0
+        return cited_by / max(years, 0.25)
+    years = (now - article.last_scholar_sync).total_seconds() / (365.25 * 86400)
+    if years < 1 / 365.25:
+        # Too short an interval to measure; keep the previous estimate.
+        return article.citation_velocity
+    return max(0, cited_by - article.citation_count) / years
+
+
+def apply_result(article, cited_by, cluster_id, now):
+    """Set the SYNC_FIELDS of `article` from a lookup result (not saved)."""
+    article.citation_velocity = citation_velocity(article, cited_by, now)
+    article.citation_count = cited_by
+    article.scholar_cluster_id = cluster_id
+    article.last_scholar_sync = article.last_scholar_attempt = now
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `pause()` holds every caller back for a while."""
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._paused_until:
+                    wait_for = self._paused_until - now
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait_for = (1 - self._tokens) / self.rate
+            self._sleep(wait_for)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            # Refill from the end of the pause, not across it: a burst right
+            # after a block would likely be blocked again.
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+
+class SyncStats:
+    def __init__(self):
+        self.updated = 0
+        self.unchanged = 0
+        self.not_found = 0
+        self.failed = 0
+        self.blocked = 0
+        self.aborted = False
+
+    @property
+    def done(self):
+        return self.updated + self.unchanged + self.not_found
+
+    def __str__(self):
+        return (
+            f"{self.updated} updated, {self.unchanged} unchanged, {self.not_found} not found, "
+            f"{self.failed} failed, {self.blocked} blocked attempt(s)"
+            + (' — stopped: Scholar kept blocking' if self.aborted else '')
+        )
+
+
+class ScholarSync:
+    """Runs lookups for many articles through a bounded, rate-limited pool."""
+
+    def __init__(self, backend=None, workers=None, rate=None, burst=None, max_retries=None,
+                 backoff=None, batch_size=50, sleep=time.sleep, progress=None):
+        self.backend = backend or get_backend()
+        self.workers = workers or _setting('SCHOLAR_WORKERS', 4)
+        self.bucket = TokenBucket(
+            rate or _setting('SCHOLAR_RATE', 0.2), burst or _setting('SCHOLAR_BURST', 2), sleep=sleep,
+        )
+        self.max_retries = _setting('SCHOLAR_MAX_RETRIES', 5) if max_retries is None else max_retries
+        self.backoff = _setting('SCHOLAR_BACKOFF', 60) if backoff is None else backoff
+        self.batch_size = batch_size
+        self.progress = progress
+        self.stats = SyncStats()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _fetch(self, article):
+        for attempt in range(self.max_retries + 1):
+            if self._stop.is_set():
+                return None
+            self.bucket.acquire()
+            try:
+                return lookup(article, self.backend)
+            except Exception as exc:
+                if not is_blocked(exc):
+                    raise
+                with self._stats_lock:
+                    self.stats.blocked += 1
+                if attempt == self.max_retries:
+                    self._stop.set()
+                    raise
+                # Everyone waits, not just this worker: the block is per client.
+                self.bucket.pause(self.backoff * 2 ** attempt * (1 + random.random() / 4))
+
+    def run(self, articles):
+        """Sync every article in `articles` (any iterable). Returns SyncStats."""
+        pending = []
+        articles = iter(articles)
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # Only a few lookups are queued at a time, so a large queryset
+            # is streamed rather than turned into thousands of futures.
+            while True:
+                while not self._stop.is_set() and len(in_flight) < self.workers * 2:
+                    article = next(articles, None)
+                    if article is None:
+                        break
+                    in_flight[pool.submit(self._fetch, article)] = article
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    article = in_flight.pop(future)
+                    self._collect(article, future, pending)
+                if len(pending) >= self.batch_size:
+                    self._write(pending)
+        self._write(pending)
+        self.stats.aborted = self._stop.is_set()
+        return self.stats
+
+    def _collect(self, article, future, pending):
+        try:
+            found = future.result()
+        except Exception:
+            self.stats.failed += 1
+            # Scholar still saw the request: it counts against the daily budget.
+            article.last_scholar_attempt = timezone.now()
+            pending.append(article)
+            return
+        if found is None:
+            if self._stop.is_set():
+                return
+            # Recorded as synced so the article is not re-queried every run.
+            self.stats.not_found += 1
+        else:
+            cited_by, cluster_id = found
+            if cited_by != article.citation_count or cluster_id != article.scholar_cluster_id:
+                self.stats.updated += 1
+            else:
+                self.stats.unchanged += 1
+            apply_result(article, cited_by, cluster_id, timezone.now())
+        article.last_scholar_sync = article.last_scholar_attempt = timezone.now()
+        pending.append(article)
+        if self.progress:
+            self.progress(self.stats)
+
+    def _write(self, pending):
+        if pending:
+            JournalIssue.objects.bulk_update(pending, SYNC_FIELDS, batch_size=500)
+            pending.clear()
+
+
+def due_articles(max_age=timedelta(days=1), limit=None):
+    """Articles not synced within `max_age` (all of them if max_age is None), oldest sync first."""
+    queryset = JournalIssue.objects.only(
+        'pk', 'title', 'authors', 'google_scholar_query', 'publication_date', 'views', *SYNC_FIELDS,
+    ).order_by(F('last_scholar_sync').asc(nulls_first=True), 'pk')
+    if max_age is not None:
+        cutoff = timezone.now() - max_age
+        queryset = queryset.exclude(last_scholar_sync__gte=cutoff)
+    if limit:
+        queryset = queryset[:limit]
+    return queryset
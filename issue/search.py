@@ -0,0 +1,306 @@
+"""
+Full-text search over articles.
+
+The original search OR-ed fifteen icontains lookups over every language
+column, i.e. a LIKE scan over rich-text HTML on every query. Here each article
+is flattened once — markup stripped, all languages joined — into an index that
+the signals in `issue.signals` keep current:
+
+* SQLite: an FTS5 virtual table, ranked with bm25.
+* PostgreSQL: a tsvector table with a GIN index, ranked with ts_rank.
+* Anything else, or SQLite built without FTS5: the old icontains search.
+
+SEARCH_BACKEND in settings forces 'fts5', 'postgres' or 'like'. The index
+tables are created and first filled by migration issue 0007.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from core.site_config import clean_value
+
+from .models import JournalIssue
+
+TABLE = 'issue_search'
+
+# Fields whose change makes an article's index entry stale. Saves that touch
+# only other columns (views, DOI, Scholar counts) skip re-indexing.
+INDEXED_FIELDS = {'title', 'description', 'authors', 'volume', 'issue_number', 'issue'}
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _languages(obj, field):
+    """Every distinct, markup-free value of a translated field, joined."""
+    values = []
+    for name in [field] + [f'{field}_{code}' for code, _ in settings.LANGUAGES]:
+        value = clean_value(getattr(obj, name, '') or '')
+        if value and value not in values:
+            values.append(value)
+    return ' '.join(values)
+
+
+def document_for(article):
+    """The four weighted columns an article is indexed under."""
+    issue = article.issue if article.issue_id else None
+    meta = [article.volume or '', article.issue_number or '']
+    if issue is not None:
+        meta.append(_languages(issue, 'title'))
+    return {
+        'title': _languages(article, 'title'),
+        'authors': clean_value(article.authors),
+        'description': _languages(article, 'description'),
+        'meta': ' '.join(m for m in meta if m),
+    }
+
+
+def touches_index(update_fields):
+    """Whether a save with these update_fields can change the indexed text."""
+    if update_fields is None:
+        return True
+    suffixes = tuple(f'_{code}' for code, _ in settings.LANGUAGES)
+    for field in update_fields:
+        base = field.rsplit('_', 1)[0] if field.endswith(suffixes) else field
+        if base in INDEXED_FIELDS:
+            return True
+    return False
+
+
+def query_terms(query):
+    return WORD_RE.findall(query or '')
+
+
+class RankedResults:
+    """
+    Lazy, sliceable result set for `Paginator`.
+
+    Only the requested page's ids are ranked out of the index; the articles
+    themselves are then loaded in one query.
+    """
+
+    def __init__(self, backend, terms):
+        self.backend = backend
+        self.terms = terms
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.terms)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        limit = (index.stop - start) if index.stop is not None else self.count() - start
+        ids = self.backend.ranked_ids(self.terms, limit, start)
+        found = JournalIssue.objects.select_related('issue').in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
+
+
+class LikeBackend:
+    """The original icontains search. Needs no index, so all writes are no-ops."""
+
+    name = 'like'
+
+    def index(self, articles):
+        pass
+
+    def remove(self, pks):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query):
+        # Search every translatable column (uz/en/ru) plus the non-translated fields.
+        lookups = Q()
+        for field in (
+            'title', 'title_uz', 'title_en', 'title_ru',
+            'description', 'description_uz', 'description_en', 'description_ru',
+            'authors', 'volume', 'issue_number',
+            'issue__title', 'issue__title_uz', 'issue__title_en', 'issue__title_ru',
+        ):
+            lookups |= Q(**{f'{field}__icontains': query})
+        return (
+            JournalIssue.objects.filter(lookups)
+            .select_related('issue')
+            .distinct()
+            .order_by('-publication_date')
+        )
+
+
+class FTS5Backend:
+    name = 'fts5'
+    # bm25 column weights, in table column order: title, authors, description, meta.
+    WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+    def index(self, articles):
+        rows = []
+        for article in articles:
+            doc = document_for(article)
+            rows.append((article.pk, doc['title'], doc['authors'], doc['description'], doc['meta']))
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            self._delete(cursor, [row[0] for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, title, authors, description, meta) VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+
+    def remove(self, pks):
+        with connection.cursor() as cursor:
+            self._delete(cursor, list(pks))
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+
+    def _delete(self, cursor, pks):
+        # SQLite caps bound parameters per statement; stay well under it.
+        for start in range(0, len(pks), 500):
+            chunk = pks[start:start + 500]
+            cursor.execute(
+                f"DELETE FROM {TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk,
+            )
+
+    @staticmethod
+    def match(terms):
+        # Each word quoted (so FTS5 operators in user input are inert) and
+        # prefix-matched, all of them required.
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def count(self, terms):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {TABLE} WHERE {TABLE} MATCH %s", [self.match(terms)])
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, terms, limit, offset):
+        weights = ', '.join(str(w) for w in self.WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s "
+                f"ORDER BY bm25({TABLE}, {weights}), rowid DESC LIMIT %s OFFSET %s",
+                [self.match(terms), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, query):
+        return RankedResults(self, query_terms(query))
+
+
+class PostgresBackend(FTS5Backend):
+    name = 'postgres'
+    # 'simple': no stemming. There is no Uzbek dictionary, and stemming only
+    # one of the three languages would rank them unevenly.
+    CONFIG = 'simple'
+
+    def index(self, articles):
+        rows = []
+        for article in articles:
+            doc = document_for(article)
+            rows.append((article.pk, doc['title'], doc['authors'], doc['description'], doc['meta']))
+        if not rows:
+            return
+        vector = ' || '.join(
+            f"setweight(to_tsvector('{self.CONFIG}', %s), '{weight}')" for weight in 'ABCD'
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (article_id, document) VALUES (%s, {vector}) "
+                "ON CONFLICT (article_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+    def _delete(self, cursor, pks):
+        if pks:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE article_id = ANY(%s)", [pks])
+
+    @staticmethod
+    def match(terms):
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def count(self, terms):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {TABLE} WHERE document @@ to_tsquery('{self.CONFIG}', %s)",
+                [self.match(terms)],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, terms, limit, offset):
+        query = f"to_tsquery('{self.CONFIG}', %s)"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT article_id FROM {TABLE} WHERE document @@ {query} "
+                f"ORDER BY ts_rank(document, {query}) DESC, article_id DESC LIMIT %s OFFSET %s",
+                [self.match(terms), self.match(terms), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {backend.name: backend for backend in (LikeBackend, FTS5Backend, PostgresBackend)}
+VENDOR_BACKENDS = {'sqlite': FTS5Backend, 'postgresql': PostgresBackend}
+
+_index_present = {}
+
+
+def _has_index():
+    """Whether the migration managed to create the index table on this database."""
+    key = (connection.vendor, str(connection.settings_dict.get('NAME')))
+    if key not in _index_present:
+        _index_present[key] = TABLE in connection.introspection.table_names()
+    return _index_present[key]
+
+
+def get_backend():
+    forced = getattr(settings, 'SEARCH_BACKEND', '') or ''
+    if forced:
+        return BACKENDS[forced]()
+    backend = VENDOR_BACKENDS.get(connection.vendor)
+    if backend is None or not _has_index():
+        return LikeBackend()
+    return backend()
+
+
+def index_articles(articles):
+    get_backend().index(articles)
+
+
+def remove_articles(pks):
+    get_backend().remove(pks)
+
+
+def rebuild_index(queryset=None, chunk_size=500):
+    """Re-index every article (or `queryset`) from scratch. Returns the count."""
+    backend = get_backend()
+    if queryset is None:
+        backend.clear()
+        queryset = JournalIssue.objects.all()
+    queryset = queryset.select_related('issue').order_by('pk')
+    done = 0
+    for start in range(0, queryset.count(), chunk_size):
+        chunk = list(queryset[start:start + chunk_size])
+        backend.index(chunk)
+        done += len(chunk)
+    return done
+
+
+def search_articles(query):
+    """
+    Articles matching `query`, best first, as something `Paginator` accepts.
+
+    An input with no searchable words matches nothing on the ranked backends;
+    the fallback keeps its old substring behaviour.
+    """
+    backend = get_backend()
+    if backend.name != 'like' and not query_terms(query):
+        return JournalIssue.objects.none()
+    return backend.search(query)
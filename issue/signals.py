@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search
+from .models import Issue, JournalIssue
+
+
+@receiver(post_save, sender=JournalIssue, dispatch_uid='issue.index_article')
+def index_article(sender, instance, update_fields=None, **kwargs):
+    if search.touches_index(update_fields):
+        search.index_articles([instance])
+
+
+@receiver(post_delete, sender=JournalIssue, dispatch_uid='issue.unindex_article')
+def unindex_article(sender, instance, **kwargs):
+    search.remove_articles([instance.pk])
+
+
+@receiver(post_save, sender=Issue, dispatch_uid='issue.reindex_issue_articles')
+def reindex_issue_articles(sender, instance, update_fields=None, **kwargs):
+    """The issue title is indexed with each of its articles."""
+    if search.touches_index(update_fields):
+        search.index_articles(instance.journal_issues.select_related('issue'))
+
@@ -1,30 +1,164 @@
+"""
+Sitemaps, served as an index of paginated per-language sections.
+
+Every page exists once per language, so each language gets its own sections
+(`issues-uz`, `articles-en`, …) instead of whichever language the crawler's
+Accept-Language happened to select. Sections read only pk and updated_at and
+are written out row by row, so neither the queryset nor the XML is ever held
+in memory whole. `manage.py generate_sitemaps` writes the same XML to
+SITEMAP_ROOT; when those files exist they are served as-is.
+
+Crawlers re-fetch sitemaps constantly, so the views also answer conditional
+GETs and cache each rendered page, both keyed by a version read from the
+database: the latest updated_at and the row count of issues and articles. Any
+save moves the former and any deletion changes the latter, so every worker
+sees the same version whatever cache it has, and nothing has to be
+invalidated. Responses also carry Last-Modified (the latest updated_at), but
+only If-None-Match can earn a 304: a deletion changes no updated_at, so a
+date alone cannot tell that the sitemap changed.
+"""
+
+from xml.sax.saxutils import escape
+
+from django.conf import settings
 from django.contrib.sitemaps import Sitemap
+from django.core.cache import caches
+from django.db.models import Count, Max
+
+from core.url_map import localized_path
+
 from .models import Issue, JournalIssue
 
-class IssueSitemap(Sitemap):
-    changefreq = "monthly"
-    priority = 0.6
+XML_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
 
-    def items(self):
-        return Issue.objects.all().order_by('-publication_date')
+
+class LanguageSitemap(Sitemap):
+    """A Sitemap pinned to one language, listing that language's URLs."""
+
+    # Well under the protocol's 50,000 URLs / 50 MB per file.
+    limit = 5000
+    url_name = None
+
+    def __init__(self, language):
+        self.language = language
 
     def lastmod(self, obj):
         return obj.updated_at
 
     def location(self, obj):
-        from django.urls import reverse
-        return reverse('item_issue', kwargs={'pk': obj.pk})
+        return localized_path(self.url_name, self.language, pk=obj.pk)
+
+    def page_items(self, page):
+        offset = (page - 1) * self.limit
+        return self.items()[offset:offset + self.limit].iterator(chunk_size=1000)
+
+
+class IssueSitemap(LanguageSitemap):
+    changefreq = "monthly"
+    priority = 0.6
+    url_name = 'item_issue'
+
+    def items(self):
+        return Issue.objects.only('pk', 'updated_at').order_by('-publication_date', 'pk')
 
-class ArticleSitemap(Sitemap):
+
+class ArticleSitemap(LanguageSitemap):
     changefreq = "weekly"
     priority = 0.8
+    url_name = 'article_detail'
 
     def items(self):
-        return JournalIssue.objects.all().order_by('-publication_date')
+        return JournalIssue.objects.only('pk', 'updated_at').order_by('-publication_date', 'pk')
 
-    def lastmod(self, obj):
-        return obj.updated_at
 
-    def location(self, obj):
-        return obj.get_absolute_url()
+def get_sections():
+    """{section name: sitemap}, one issues and one articles section per language."""
+    sections = {}
+    for code, _ in settings.LANGUAGES:
+        sections[f'issues-{code}'] = IssueSitemap(code)
+        sections[f'articles-{code}'] = ArticleSitemap(code)
+    return sections
+
+
+def section_path(section, page):
+    return f'/sitemap-{section}.xml' if page == 1 else f'/sitemap-{section}.xml?p={page}'
+
+
+def section_filename(section, page):
+    return f'sitemap-{section}-{page}.xml'
+
+
+def iter_index_xml(base_url, sections=None):
+    """Yield the sitemap index, one <sitemap> per section page."""
+    sections = sections if sections is not None else get_sections()
+    yield XML_HEAD
+    yield f'<sitemapindex xmlns="{SITEMAP_NS}">\n'
+    for name, sitemap in sections.items():
+        for page in sitemap.paginator.page_range:
+            yield f'  <sitemap><loc>{escape(base_url + section_path(name, page))}</loc></sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def iter_section_xml(sitemap, page, base_url):
+    """Yield one page of a section's <urlset>, row by row."""
+    yield XML_HEAD
+    yield f'<urlset xmlns="{SITEMAP_NS}">\n'
+    for obj in sitemap.page_items(page):
+        lastmod = sitemap.lastmod(obj)
+        yield (
+            f'  <url><loc>{escape(base_url + sitemap.location(obj))}</loc>'
+            + (f'<lastmod>{lastmod:%Y-%m-%d}</lastmod>' if lastmod else '')
+            + f'<changefreq>{sitemap.changefreq}</changefreq>'
+            f'<priority>{sitemap.priority}</priority></url>\n'
+        )
+    yield '</urlset>\n'
+
+
+def _cache():
+    return caches[getattr(settings, 'SITEMAP_CACHE_ALIAS', 'default')]
+
+
+def _state(request):
+    """(version, latest updated_at) as of this request: two aggregate queries, read once."""
+    if not hasattr(request, '_sitemap_state'):
+        parts, stamps = [], []
+        for model in (Issue, JournalIssue):
+            state = model.objects.aggregate(latest=Max('updated_at'), total=Count('pk'))
+            latest = state['latest'].timestamp() if state['latest'] else 0
+            parts.append(f"{latest}.{state['total']}")
+            stamps.append(latest)
+        request._sitemap_state = ('-'.join(parts), max(stamps))
+    return request._sitemap_state
+
+
+def version(request):
+    """What the sitemaps list: changes with every save and every deletion."""
+    return _state(request)[0]
+
+
+def last_modified(request):
+    """The latest updated_at, as a POSIX timestamp (0 with nothing listed)."""
+    return _state(request)[1]
+
+
+def etag(request, section='index'):
+    return f"{section}-{request.GET.get('p', '1')}-{version(request)}"
+
 
+def cached_xml(request, key, render):
+    """
+    The cached body for `key`, or `render()` streamed through to the client
+    and stored once the last chunk has gone out.
+    """
+    cache = _cache()
+    key = f'sitemap:{version(request)}:{key}'
+    body = cache.get(key)
+    if body is not None:
+        yield body
+        return
+    parts = []
+    for chunk in render():
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(parts), timeout=getattr(settings, 'SITEMAP_CACHE_TIMEOUT', 86400))
@@ -1,3 +1,322 @@
-from django.test import TestCase
+import datetime
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import archive, scholar_schedule, view_counter
+from .models import Issue, JournalIssue
+from .scholar_sync import FakeScholarBackend, ScholarSync, TokenBucket, lookup
+from .search import get_backend, search_articles
+from .views import SEARCH_PAGE_SIZE
+
+
+def make_issue(title='Spring'):
+    return Issue.objects.create(
+        title=title, volume='1', issue_number='1', publication_date=datetime.date(2024, 5, 1),
+    )
+
+
+def make_article(issue, title='Article', description='', authors='Axmedova Aziza'):
+    return JournalIssue.objects.create(
+        issue=issue, title=title, description=description, volume='1', issue_number='1',
+        authors=authors, publication_date=datetime.date(2024, 5, 2),
+    )
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class SearchTests(TestCase):
+    def test_title_matches_rank_above_description_matches(self):
+        issue = make_issue()
+        in_description = make_article(issue, 'Grammar notes', '<p>A study of <b>poetry</b> &amp; prose</p>')
+        in_title = make_article(issue, 'Poetry of the steppe')
+        self.assertEqual(list(search_articles('poetry')[:10]), [in_title, in_description])
+
+    def test_markup_and_operators_are_not_searchable(self):
+        make_article(make_issue(), 'Prose', '<p class="lead">x &amp; y</p>')
+        self.assertEqual(search_articles('lead').count(), 0)
+        self.assertEqual(search_articles('"*').count(), 0)
+
+    def test_results_are_paginated(self):
+        issue = make_issue()
+        for n in range(SEARCH_PAGE_SIZE + 5):
+            make_article(issue, f'Poetry number {n}')
+        response = self.client.get('/en/issue/search/?q=poet')
+        self.assertEqual(response.context['results_count'], SEARCH_PAGE_SIZE + 5)
+        self.assertEqual(len(response.context['articles']), SEARCH_PAGE_SIZE)
+        response = self.client.get('/en/issue/search/?q=poet&page=2')
+        self.assertEqual(len(response.context['articles']), 5)
+
+    def test_index_follows_saves_and_deletes(self):
+        issue = make_issue('Spring')
+        article = make_article(issue, 'Grammar')
+        self.assertEqual(search_articles('spring').count(), 1)
+
+        article.title = 'Phonetics'
+        article.save()
+        self.assertEqual(search_articles('grammar').count(), 0)
+        self.assertEqual(search_articles('phonetics').count(), 1)
+
+        issue.title = 'Autumn'
+        issue.save()
+        self.assertEqual(search_articles('spring').count(), 0)
+        self.assertEqual(search_articles('autumn').count(), 1)
+
+        article.delete()
+        self.assertEqual(search_articles('phonetics').count(), 0)
+
+    def test_saves_that_skip_indexed_fields_do_not_reindex(self):
+        article = make_article(make_issue(), 'Grammar')
+        backend = get_backend()
+        with self.assertNumQueries(1):
+            article.views = 5
+            article.save(update_fields=['views'])
+        self.assertEqual(backend.count(['grammar']), 1)
+
+
+class RacingCache:
+    """
+    A cache proxy that holds two flushes running at once in step: both read
+    the dirty log before either records it consumed, and both read the
+    counters before either decrements them. A flush running alone waits
+    briefly, then carries on.
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+        self.log_read = threading.Barrier(2, timeout=0.5)
+        self.counts_read = threading.Barrier(2, timeout=0.5)
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def set(self, key, *args, **kwargs):
+        if key == view_counter.DIRTY_DONE_KEY:
+            self._wait(self.log_read)
+        return self._cache.set(key, *args, **kwargs)
+
+    def decr(self, *args, **kwargs):
+        self._wait(self.counts_read)
+        return self._cache.decr(*args, **kwargs)
+
+    @staticmethod
+    def _wait(barrier):
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+
+
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        view_counter._store = None
+        self.addCleanup(setattr, view_counter, '_store', None)
+
+    @override_settings(VIEW_COUNT_STORE='cache', VIEW_COUNT_FLUSH_INTERVAL=1000)
+    def test_cache_flush_visits_only_viewed_articles(self):
+        issue = make_issue()
+        articles = [make_article(issue, f'Article {n}') for n in range(30)]
+        cache.add(view_counter.FLUSH_LOCK_KEY, 1)
+        for article in articles[:2]:
+            for _ in range(3):
+                view_counter.record_view(article.pk)
+        # One UPDATE: both articles gained the same amount.
+        with self.assertNumQueries(1):
+            self.assertEqual(view_counter.flush(), 6)
+        self.assertEqual(sorted(JournalIssue.objects.values_list('views', flat=True))[-2:], [3, 3])
+
+        view_counter.record_view(articles[0].pk)
+        self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(view_counter.flush(), 0)
+        articles[0].refresh_from_db()
+        self.assertEqual(articles[0].views, 4)
+
+    @override_settings(VIEW_COUNT_STORE='cache', VIEW_COUNT_FLUSH_INTERVAL=1000)
+    def test_overlapping_flushes_write_each_view_once(self):
+        cache.add(view_counter.FLUSH_LOCK_KEY, 1)
+        for _ in range(3):
+            view_counter.record_view(7)
+        store, racing, written = view_counter.get_store(), RacingCache(cache), []
+
+        def flush():
+            written.append(store.flush())
+
+        # A request-triggered flush and `flush_view_counts` at the same time.
+        with mock.patch.object(view_counter.CacheStore, 'cache', property(lambda store: racing)), \
+                mock.patch.object(view_counter, 'write_increments', lambda increments: sum(increments.values())):
+            threads = [threading.Thread(target=flush) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sorted(written), [0, 3])
+        self.assertEqual(view_counter.pending_views(7), 0)
+        self.assertIsNone(cache.get(view_counter.FLUSHING_KEY))
+
+    @override_settings(VIEW_COUNT_STORE='memory', VIEW_COUNT_FLUSH_THRESHOLD=3)
+    def test_page_counts_views_flushed_by_its_own_request(self):
+        article = make_article(make_issue())
+        shown = [
+            self.client.get(f'/en/issue/article/{article.pk}/').context['article'].views
+            for _ in range(4)
+        ]
+        self.assertEqual(shown, [1, 2, 3, 4])
+        article.refresh_from_db()
+        self.assertEqual(article.views, 3)
+        self.assertEqual(view_counter.flush(), 1)
+
+
+@override_settings(SITEMAP_ROOT='')
+class SitemapTests(TestCase):
+    def get(self, etag=None, **headers):
+        if etag:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        response = self.client.get('/sitemap-articles-en.xml', **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body.decode()
+
+    def test_version_follows_the_database_not_the_cache(self):
+        issue = make_issue()
+        kept, deleted = make_article(issue, 'Kept'), make_article(issue, 'Deleted')
+        response, body = self.get()
+        etag = response['ETag']
+        self.assertIn(f'/en/issue/article/{deleted.pk}/', body)
+        self.assertEqual(self.get(etag)[0].status_code, 304)
+
+        # A deletion changes no updated_at, only the row count.
+        last_modified = response['Last-Modified']
+        JournalIssue.objects.filter(pk=deleted.pk).delete()
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=last_modified)[0].status_code, 200)
+        response, body = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(f'/en/issue/article/{deleted.pk}/', body)
+
+        # A change made without signals, e.g. by another process.
+        etag = response['ETag']
+        JournalIssue.objects.filter(pk=kept.pk).update(updated_at=timezone.now())
+        self.assertEqual(self.get(etag)[0].status_code, 200)
+
+
+class ArchiveTests(TestCase):
+    def test_archive_follows_changes_made_by_other_processes(self):
+        cache.clear()
+        issue = make_issue('Spring')
+        self.assertEqual(archive.get_archive('en')['years'][2024][0]['title'], 'Spring')
+        # Neither change sends a signal this process could act on.
+        Issue.objects.filter(pk=issue.pk).update(title_en='Autumn', updated_at=timezone.now())
+        self.assertEqual(archive.get_archive('en')['years'][2024][0]['title'], 'Autumn')
+        Issue.objects.filter(pk=issue.pk).delete()
+        self.assertEqual(archive.get_archive('en')['years'], {})
+
+
+class FakeClock:
+    """A monotonic clock that only moves when something sleeps on it."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ScholarSyncTests(TestCase):
+    def sync(self, backend, **options):
+        clock = FakeClock()
+        sync = ScholarSync(backend=backend, workers=1, rate=1, burst=1, **options)
+        sync.bucket = TokenBucket(1, 1, clock=clock, sleep=clock.sleep)
+        return sync, clock
+
+    def test_token_bucket_paces_calls(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=3, clock=clock, sleep=clock.sleep)
+        for _ in range(7):
+            bucket.acquire()
+        # The burst goes out at once, then one call every half second.
+        self.assertEqual(clock.now, 2.0)
+        bucket.pause(30)
+        bucket.acquire()
+        self.assertEqual(clock.now, 32.5)
+
+    def test_repeated_blocking_backs_off_then_aborts(self):
+        article = make_article(make_issue())
+        sync, clock = self.sync(FakeScholarBackend(block_rate=1.0), max_retries=2, backoff=10)
+        stats = sync.run([article])
+        self.assertTrue(stats.aborted)
+        self.assertEqual((stats.blocked, stats.failed), (3, 1))
+        # Exponential pauses (10 s, then 20 s, each with up to 25% jitter).
+        pauses = [seconds for seconds in clock.sleeps if seconds >= 10]
+        self.assertEqual(len(pauses), 2)
+        self.assertTrue(10 <= pauses[0] <= 12.5 and 20 <= pauses[1] <= 25)
+        article.refresh_from_db()
+        self.assertIsNone(article.last_scholar_sync)
+
+    def test_results_are_written_in_bulk(self):
+        issue = make_issue()
+        articles = [make_article(issue, f'Article {n}') for n in range(10)]
+        backend = FakeScholarBackend()
+        expected = {article.pk: lookup(article, backend)[0] for article in articles}
+        sync, _ = self.sync(FakeScholarBackend(), batch_size=5)
+        with CaptureQueriesContext(connection) as queries:
+            stats = sync.run(articles)
+        self.assertEqual(stats.done, 10)
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual(dict(JournalIssue.objects.values_list('pk', 'citation_count')), expected)
+        self.assertFalse(JournalIssue.objects.filter(last_scholar_sync__isnull=True).exists())
+
+
+@override_settings(SCHOLAR_MIN_INTERVAL=3, SCHOLAR_MAX_INTERVAL=180, SCHOLAR_DAILY_BUDGET=200)
+class ScholarScheduleTests(TestCase):
+    def setUp(self):
+        self.issue = make_issue()
+        self.now = timezone.now()
+
+    def article(self, title, synced_days_ago=None, published=datetime.date(2024, 5, 2), **fields):
+        article = make_article(self.issue, title)
+        if synced_days_ago is not None:
+            fields['last_scholar_sync'] = self.now - timedelta(days=synced_days_ago)
+        JournalIssue.objects.filter(pk=article.pk).update(publication_date=published, **fields)
+        article.refresh_from_db()
+        return article
+
+    def test_plan_puts_never_synced_first_then_the_most_overdue(self):
+        older = self.article('Never synced, older', published=datetime.date(2023, 1, 1))
+        newer = self.article('Never synced, newer', published=datetime.date(2025, 1, 1))
+        # Due every 12 days: 1 + 12 citations/yr + log20(401 views) = 15.
+        cited = self.article('Much cited', synced_days_ago=21, citation_velocity=12, views=400)
+        # Due every 90 days: 1 + log20(20 views) = 2.
+        read = self.article('Read a little', synced_days_ago=120, views=19)
+        self.article('Dormant', synced_days_ago=90)
+        self.article('Just synced', synced_days_ago=1)
+
+        planned = scholar_schedule.plan(now=self.now)
+        self.assertEqual([article for _, article in planned], [newer, older, cited, read])
+        self.assertAlmostEqual(planned[2][0], 21 / 12, places=2)
+        self.assertEqual([article for _, article in scholar_schedule.plan(budget=3, now=self.now)],
+                         [newer, older, cited])
+
+    @override_settings(SCHOLAR_DAILY_BUDGET=3)
+    def test_failed_lookups_use_up_the_daily_budget(self):
+        articles = [self.article(f'Article {n}') for n in range(3)]
+        self.article('Synced this morning', synced_days_ago=0.25)
+        self.assertEqual(scholar_schedule.remaining_budget(), 2)
+
+        blocked = FakeScholarBackend(block_rate=1.0)
+        for article in articles[:2]:
+            sync = ScholarSync(backend=blocked, workers=1, rate=1000, burst=1, max_retries=0)
+            self.assertEqual(sync.run([article]).failed, 1)
+        self.assertEqual(blocked.calls, 2)
+        self.assertEqual(scholar_schedule.remaining_budget(), 0)
+        self.assertEqual(scholar_schedule.plan(), [])
+        # Failed articles stay due for when the budget comes back.
+        self.assertEqual(len(scholar_schedule.plan(budget=10)), 3)
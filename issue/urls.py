@@ -5,6 +5,7 @@ urlpatterns = [
     path('current/', views.current_issue, name='current_issue'),
     path('<int:pk>/', views.item_issue, name='item_issue'),
     path('all/', views.all_issues, name='all_issues'),
+    path('all/data/', views.all_issues_data, name='all_issues_data'),
     path('search/', views.search, name='search'),
     path('article/<int:pk>/', views.article_detail, name='article_detail'),
 ]
@@ -0,0 +1,255 @@
+"""
+Buffered article view counts.
+
+Bumping `views` with an UPDATE on every page view serialises writers on
+SQLite and costs two round trips per request. Views are instead accumulated
+and written in batches, one UPDATE per distinct increment:
+
+* 'memory' (default): a per-process buffer, flushed by the process itself
+  once VIEW_COUNT_FLUSH_INTERVAL seconds or VIEW_COUNT_FLUSH_THRESHOLD views
+  have gone by, and once more at interpreter exit so a graceful worker
+  shutdown loses nothing.
+* 'cache': counters in the Django cache VIEW_COUNT_CACHE_ALIAS, shared by all
+  workers. Whichever request first finds the interval elapsed flushes, and
+  `manage.py flush_view_counts` can do the same from cron. A flush only
+  visits the articles viewed since the last one, not the whole catalogue.
+* 'direct': the old immediate UPDATE, for setups that want exact counts.
+"""
+
+import atexit
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from .models import JournalIssue
+
+CACHE_PREFIX = 'view_count:'
+FLUSH_LOCK_KEY = 'view_count:flush_lock'
+# Held while a flush runs, so a request and the cron command never flush at
+# once. It expires by itself if its holder dies mid-flush.
+FLUSHING_KEY = 'view_count:flushing'
+FLUSHING_TIMEOUT = 5 * 60
+# Dirty articles are logged in numbered slots: DIRTY_SEQ_KEY hands out slot
+# numbers, DIRTY_DONE_KEY is the last slot a flush has consumed.
+DIRTY_SLOT_PREFIX = 'view_count:dirty:'
+DIRTY_SEQ_KEY = 'view_count:dirty_seq'
+DIRTY_DONE_KEY = 'view_count:dirty_done'
+DIRTY_GAP_KEY = 'view_count:dirty_gap'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def write_increments(increments):
+    """Apply {pk: n} to the database, one UPDATE per distinct n."""
+    by_amount = defaultdict(list)
+    for pk, amount in increments.items():
+        if amount > 0:
+            by_amount[amount].append(pk)
+    for amount, pks in by_amount.items():
+        JournalIssue.objects.filter(pk__in=pks).update(views=F('views') + amount)
+    return sum(increments.values())
+
+
+class DirectStore:
+    name = 'direct'
+
+    def record(self, pk):
+        JournalIssue.objects.filter(pk=pk).update(views=F('views') + 1)
+        return True
+
+    def pending(self, pk):
+        return 0
+
+    def flush(self):
+        return 0
+
+
+class MemoryStore:
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._total = 0
+        self._last_flush = time.monotonic()
+        atexit.register(self._flush_at_exit)
+
+    def record(self, pk):
+        with self._lock:
+            self._counts[pk] += 1
+            self._total += 1
+            due = (
+                self._total >= _setting('VIEW_COUNT_FLUSH_THRESHOLD', 200)
+                or time.monotonic() - self._last_flush >= _setting('VIEW_COUNT_FLUSH_INTERVAL', 60)
+            )
+        if due:
+            self.flush()
+        return due
+
+    def pending(self, pk):
+        with self._lock:
+            return self._counts.get(pk, 0)
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+            self._total = 0
+            self._last_flush = time.monotonic()
+        if not counts:
+            return 0
+        try:
+            return write_increments(counts)
+        except Exception:
+            # Database unavailable: keep the views for the next flush rather
+            # than dropping them.
+            with self._lock:
+                for pk, amount in counts.items():
+                    self._counts[pk] += amount
+                    self._total += amount
+            raise
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception as exc:
+            # Nothing is left to retry with; say what was lost instead of a traceback.
+            with self._lock:
+                lost = self._total
+            if lost:
+                sys.stderr.write(f"view_counter: {lost} buffered view(s) not saved at exit: {exc}\n")
+
+
+class CacheStore:
+    name = 'cache'
+
+    @property
+    def cache(self):
+        return caches[_setting('VIEW_COUNT_CACHE_ALIAS', 'default')]
+
+    def record(self, pk):
+        cache = self.cache
+        if _incr(cache, f'{CACHE_PREFIX}{pk}') == 1:
+            # First view since the article's last flush.
+            self._mark_dirty(cache, pk)
+        # The lock expires after one interval, so at most one request per
+        # interval, across all workers, pays for the flush.
+        if cache.add(FLUSH_LOCK_KEY, 1, timeout=_setting('VIEW_COUNT_FLUSH_INTERVAL', 60)):
+            self.flush()
+            return True
+        return False
+
+    def pending(self, pk):
+        return self.cache.get(f'{CACHE_PREFIX}{pk}', 0)
+
+    @staticmethod
+    def _mark_dirty(cache, pk):
+        # A slot per mark rather than one shared list, which could not be
+        # appended to atomically on every cache backend; incr() can.
+        cache.set(f'{DIRTY_SLOT_PREFIX}{_incr(cache, DIRTY_SEQ_KEY)}', pk, timeout=None)
+
+    def _dirty_pks(self, cache):
+        """Take the articles marked dirty since the last flush off the log."""
+        done = cache.get(DIRTY_DONE_KEY, 0)
+        last = cache.get(DIRTY_SEQ_KEY, 0)
+        if last < done:
+            # The sequence was evicted and started over.
+            done = 0
+        slots = [f'{DIRTY_SLOT_PREFIX}{n}' for n in range(done + 1, last + 1)]
+        found = {}
+        for start in range(0, len(slots), 1000):
+            found.update(cache.get_many(slots[start:start + 1000]))
+        # A slot can be numbered but not written yet by the request marking
+        # it; stop before it and give it until the next flush. A slot still
+        # missing then was evicted and is skipped.
+        gap = cache.get(DIRTY_GAP_KEY)
+        for offset, key in enumerate(slots):
+            number = done + 1 + offset
+            if key not in found and number != gap:
+                cache.set(DIRTY_GAP_KEY, number, timeout=None)
+                slots = slots[:offset]
+                break
+        cache.set(DIRTY_DONE_KEY, done + len(slots), timeout=None)
+        cache.delete_many(slots)
+        return {found[key] for key in slots if key in found}
+
+    def flush(self):
+        """
+        Move the counters of the articles viewed since the last flush into
+        the database. decr() subtracts only what was read, so views recorded
+        meanwhile stay, and their article is marked dirty again. Two flushes
+        never overlap: the second finds FLUSHING_KEY taken and writes nothing.
+        """
+        cache = self.cache
+        if not cache.add(FLUSHING_KEY, 1, timeout=FLUSHING_TIMEOUT):
+            return 0
+        try:
+            return self._flush(cache)
+        finally:
+            cache.delete(FLUSHING_KEY)
+
+    def _flush(self, cache):
+        pks = list(self._dirty_pks(cache))
+        increments = {}
+        for start in range(0, len(pks), 1000):
+            keys = [f'{CACHE_PREFIX}{pk}' for pk in pks[start:start + 1000]]
+            for key, amount in cache.get_many(keys).items():
+                if not amount:
+                    continue
+                pk = int(key[len(CACHE_PREFIX):])
+                try:
+                    left = cache.decr(key, amount)
+                except ValueError:
+                    # Evicted since get_many; what was read is still owed.
+                    left = 0
+                if left:
+                    self._mark_dirty(cache, pk)
+                increments[pk] = amount
+        return write_increments(increments)
+
+
+def _incr(cache, key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+STORES = {'direct': DirectStore, 'memory': MemoryStore, 'cache': CacheStore}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    name = _setting('VIEW_COUNT_STORE', 'memory') or 'memory'
+    with _store_lock:
+        if _store is None or _store.name != name:
+            if _store is not None:
+                _store.flush()
+            _store = STORES[name]()
+        return _store
+
+
+def record_view(pk):
+    """Count a view of `pk`. Returns True if it reached the database, buffered views and all."""
+    return get_store().record(pk)
+
+
+def pending_views(pk):
+    """Views recorded for `pk` that have not reached the database yet."""
+    return get_store().pending(pk)
+
+
+def flush():
+    """Write buffered views to the database. Returns how many were written."""
+    return get_store().flush()
@@ -1,16 +1,29 @@
 from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
-from django.urls import reverse
-from django.utils import timezone, translation
+from django.utils.http import http_date
+from django.views.decorators.http import condition
+from django.utils import timezone
 import json
+from pathlib import Path
 
 from django.utils.datetime_safe import datetime
-from django.db.models import F, Q
 
+from core.page_cache import cache_public_page
+from core.url_map import language_paths
 from crossref.services import split_authors
 from issue.models import Issue, JournalIssue
+from issue.search import search_articles
+from issue import sitemaps
+from issue.archive import get_archive, latest_year
+from issue.sitemaps import get_sections, iter_index_xml, iter_section_xml, section_filename
+from issue.view_counter import pending_views, record_view
 
+SEARCH_PAGE_SIZE = 20
 
+
+@cache_public_page(Issue, JournalIssue)
 def current_issue(request):
     """Display the current/latest journal issue with articles."""
     # Get the most recent published issue
@@ -31,6 +44,7 @@ def current_issue(request):
     return render(request, 'current_issue.html', context)
 
 
+@cache_public_page(Issue, JournalIssue)
 def item_issue(request, pk):
     """Display the current/latest journal issue with articles."""
     # Get the most recent published issue
@@ -51,94 +65,66 @@ def item_issue(request, pk):
 
 
 def all_issues(request):
-    """Display all journal issues with their articles organized by year and decade."""
-    # Get all issues ordered by publication date (newest first)
-    issues = Issue.objects.all().order_by('publication_date')
-
-    # Organize issues by year and decade for the JavaScript frontend
-    issues_by_year = {}
-    decades_dict = {}
-
-    for issue in issues:
-        year = issue.publication_date.year
-        decade = f"{(year // 10) * 10}s"
-
-        # Track years by decade for UI navigation
-        if decade not in decades_dict:
-            decades_dict[decade] = []
-        if year not in decades_dict[decade]:
-            decades_dict[decade].append(year)
-
-        # Group issues by year
-        if year not in issues_by_year:
-            issues_by_year[year] = []
-
-        # Format date as "Month Year"
-        formatted_date = issue.publication_date.strftime('%B %Y')
-
-        # Generate the URL for this issue using Django's reverse
-        issue_url = reverse('item_issue', kwargs={'pk': issue.pk})
-
-        issue_data = {
-            'volume': issue.volume,
-            'issue': issue.issue_number,
-            'date': formatted_date,
-            'title': issue.title or "",
-            'id': issue.id,
-            'url': issue_url,
-            'description': issue.description or "",
-            'cover_image': issue.cover_image.url if issue.cover_image else None
-        }
-        issues_by_year[year].append(issue_data)
-
-    # Sort years within each decade
-    for decade in decades_dict:
-        decades_dict[decade] = sorted(decades_dict[decade], reverse=True)
+    """Display all journal issues organized by year and decade."""
+    archive = get_archive()
+    # Only the newest year ships inline; the page fetches other years from
+    # all_issues_data when they are selected.
+    year = latest_year(archive)
+    inline = {year: archive['years'][year]} if year else {}
 
     context = {
-        'issues_data': json.dumps(issues_by_year),
-        'decades_data': json.dumps(decades_dict),
+        'issues_data': json.dumps(inline),
+        'decades_data': json.dumps(archive['decades']),
         'current_year': datetime.now().year
     }
 
     return render(request, 'all_issues.html', context)
 
 
+def all_issues_data(request):
+    """
+    JSON slice of the archive: ?year=2024 for one year's issues, ?decade=2020s
+    for every year in a decade, neither for the decade/year navigation.
+    """
+    archive = get_archive()
+    if 'year' in request.GET:
+        try:
+            year = int(request.GET['year'])
+        except ValueError:
+            return JsonResponse({'error': 'year must be a number'}, status=400)
+        return JsonResponse({'year': year, 'issues': archive['years'].get(year, [])})
+    if 'decade' in request.GET:
+        decade = request.GET['decade']
+        years = archive['decades'].get(decade, [])
+        return JsonResponse({'decade': decade, 'years': {year: archive['years'][year] for year in years}})
+    return JsonResponse({'decades': archive['decades']})
+
+
 def search(request):
-    """Search articles across all text fields (all languages)."""
+    """Search articles across all text fields (all languages), best match first."""
     query = (request.GET.get('q') or '').strip()
-    results = JournalIssue.objects.none()
+    page_obj = None
 
     if query:
-        # Search every translatable column (uz/en/ru) plus the non-translated fields.
-        lookups = Q()
-        for field in (
-            'title', 'title_uz', 'title_en', 'title_ru',
-            'description', 'description_uz', 'description_en', 'description_ru',
-            'authors', 'volume', 'issue_number',
-            'issue__title', 'issue__title_uz', 'issue__title_en', 'issue__title_ru',
-        ):
-            lookups |= Q(**{f'{field}__icontains': query})
-        results = (
-            JournalIssue.objects.filter(lookups)
-            .select_related('issue')
-            .distinct()
-            .order_by('-publication_date')
-        )
+        paginator = Paginator(search_articles(query), SEARCH_PAGE_SIZE)
+        page_obj = paginator.get_page(request.GET.get('page'))
 
     context = {
         'query': query,
-        'articles': results,
-        'results_count': results.count() if query else 0,
+        'articles': page_obj.object_list if page_obj else [],
+        'page_obj': page_obj,
+        'results_count': page_obj.paginator.count if page_obj else 0,
     }
     return render(request, 'search.html', context)
 
 
 def article_detail(request, pk):
     article = get_object_or_404(JournalIssue, pk=pk)
-    # Increment views atomically
-    JournalIssue.objects.filter(pk=pk).update(views=F('views') + 1)
-    article.refresh_from_db(fields=['views'])
+    # Buffered, not written per hit; show the total including unflushed views.
+    # A flush triggered by this view has moved the buffer into the row.
+    if record_view(article.pk):
+        article.refresh_from_db(fields=['views'])
+    article.views += pending_views(article.pk)
     authors_list = [a.strip() for a in (article.authors or '').replace(';', ',').split(',') if a.strip()]
     # Google Scholar parses one citation_author tag per author and understands
     # "Surname, Given". Without the comma it guesses, and guesses wrong on
@@ -151,10 +137,10 @@ def article_detail(request, pk):
     # default-language one from all of them, so search engines — and Google
     # Scholar in particular — see one article rather than three near-duplicates.
     # It is also the URL registered with Crossref, so the DOI agrees with it.
-    language_urls = {}
-    for code, _ in settings.LANGUAGES:
-        with translation.override(code):
-            language_urls[code] = request.build_absolute_uri(article.get_absolute_url())
+    language_urls = {
+        code: request.build_absolute_uri(path)
+        for code, path in language_paths('article_detail', pk=article.pk).items()
+    }
     absolute_url = language_urls.get(settings.LANGUAGE_CODE) or request.build_absolute_uri(
         article.get_absolute_url()
     )
@@ -167,3 +153,58 @@ def article_detail(request, pk):
         'alternate_urls': sorted(language_urls.items()),
     }
     return render(request, 'article_detail.html', context)
+
+
+def _static_sitemap(filename):
+    """A file written by generate_sitemaps, if there is one."""
+    root = getattr(settings, 'SITEMAP_ROOT', '')
+    path = Path(root) / filename if root else None
+    if path is not None and path.is_file():
+        return FileResponse(path.open('rb'), content_type='application/xml')
+    return None
+
+
+def _sitemap_response(request, body):
+    response = StreamingHttpResponse(body, content_type='application/xml')
+    # Informational only: @condition is given no last_modified_func, so
+    # If-Modified-Since alone never yields a 304 (see issue.sitemaps).
+    if sitemaps.last_modified(request):
+        response['Last-Modified'] = http_date(sitemaps.last_modified(request))
+    return response
+
+
+@condition(etag_func=sitemaps.etag)
+def sitemap_index(request):
+    """sitemap.xml: an index pointing at every per-language section page."""
+    static = _static_sitemap('sitemap.xml')
+    if static is not None:
+        return static
+    base_url = f"{request.scheme}://{request.get_host()}"
+    body = sitemaps.cached_xml(request, f'{base_url}:index', lambda: iter_index_xml(base_url))
+    return _sitemap_response(request, body)
+
+
+@condition(etag_func=sitemaps.etag)
+def sitemap_section(request, section):
+    """One page (?p=N) of one section, streamed row by row."""
+    sections = get_sections()
+    if section not in sections:
+        raise Http404("No such sitemap section.")
+    try:
+        page = int(request.GET.get('p', 1))
+    except ValueError:
+        raise Http404("Invalid sitemap page.")
+
+    static = _static_sitemap(section_filename(section, page))
+    if static is not None:
+        return static
+
+    sitemap = sections[section]
+    # Page 1 always exists (possibly empty); skip the COUNT for it.
+    if page < 1 or (page > 1 and page > sitemap.paginator.num_pages):
+        raise Http404("No such sitemap page.")
+    base_url = f"{request.scheme}://{request.get_host()}"
+    body = sitemaps.cached_xml(
+        request, f'{base_url}:{section}:{page}', lambda: iter_section_xml(sitemap, page, base_url),
+    )
+    return _sitemap_response(request, body)
@@ -1,7 +1,11 @@
 from django.shortcuts import render
+
+from core.page_cache import cache_public_page
+
 from .models import Subscribe
 
 
+@cache_public_page(Subscribe)
 def index(request):
     """
     Display subscribe page with dynamic content from Subscribe model.